@@ -1,30 +1,33 @@
 
 # app/soap.py
 from gettext import install
+import hashlib
+import json
 import os
 import logging
+import time
 import importlib
 from datetime import datetime, timedelta, timezone
+import anyio
 from dotenv import load_dotenv
 from fastapi import HTTPException
 import pip
 import pydantic
 from zeep.helpers import serialize_object
 from zeep.exceptions import Fault
-from app.utils import get_soap_client
+from app.utils import get_async_soap_service, get_soap_service
 from datetime import UTC
 from pydantic_settings import BaseSettings
 from app.config import settings
-
-from zeep import Client, Settings, Transport
-from zeep.exceptions import Fault
-
-
-
-# soap.py
-from requests import Session
-from zeep import Client, Settings as ZeepSettings
-from zeep.transports import Transport
+from app.auth.quote_token import redeem_quote, revoke_quotes
+from app.cache import TTLCache
+from app.singleflight import coalesced
+from app.tariff_engine import charged_minutes, get_tariff_engine
+from app.sessions import is_session_fault, session_manager
+from app.bulkheads import CASHPOINT, run_in_bulkhead
+from app.plate_index import plate_index
+from app.pm_store import credentials_hash, pm_store
+from app.logging_pipeline import configure_logging, log_payload
 
 
 logger = logging.getLogger(__name__)
@@ -36,12 +39,131 @@ load_dotenv()
 # ---------------------------------------------------------------------
 # Logger setup
 # ---------------------------------------------------------------------
+# Records go through the shared queue pipeline (app/logging_pipeline.py);
+# full SOAP responses are sampled via log_payload instead of logged each time.
+configure_logging()
 logger = logging.getLogger("app.soap")
-logger.setLevel(logging.INFO)
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s"))
-    logger.addHandler(handler)
+
+# ---------------------------------------------------------------------
+# TCC session handling
+# ---------------------------------------------------------------------
+# Operations bound to a TCC run inside the shared Designa session kept by
+# app.sessions.session_manager. If Designa reports the session as gone, the
+# TCC is logged in again (once, for all concurrent callers) and a read is
+# retried a single time. Writes (replay=False) are not replayed: the fault
+# is raised after the re-login, as Designa may have applied the first call.
+def _with_session(tcc_num: int, call, replay: bool = True):
+    started = time.time()
+    try:
+        return call()
+    except Fault as f:
+        if not is_session_fault(f):
+            raise
+        logger.warning("Designa session for TCC %s is invalid, logging in again: %s", tcc_num, f)
+        session_manager.relogin(tcc_num, stale_since=started)
+        if not replay:
+            raise
+        return call()
+
+
+async def _with_session_async(tcc_num: int, call, replay: bool = True):
+    started = time.time()
+    try:
+        return await call()
+    except Fault as f:
+        if not is_session_fault(f):
+            raise
+        logger.warning("Designa session for TCC %s is invalid, logging in again: %s", tcc_num, f)
+        await run_in_bulkhead(CASHPOINT, session_manager.relogin, tcc_num, stale_since=started)
+        if not replay:
+            raise
+        return await call()
+
+
+# ---------------------------------------------------------------------
+# Amount-due cache
+# ---------------------------------------------------------------------
+# Pay stations poll getAmountDue while the customer stands at the machine,
+# so results are kept for a few seconds per (TccNum, CardNumber). Any
+# successful setRebate / setCardSettlement / setCleared for the card drops
+# its entries immediately, but only in the worker that made the write, so
+# the cache serves lookups only: the settlement due check always reads
+# Designa (_fetch_amount_due). Entries are (amount, read_at): read_at is the
+# time.time() taken before the upstream read, so a signed quote issued from
+# a cached (or coalesced) value is still revoked by any write made after
+# that read, in any worker. AMOUNT_DUE_CACHE_TTL_SECONDS=0 disables it.
+_amount_due_cache = TTLCache(
+    max_size=int(os.getenv("AMOUNT_DUE_CACHE_MAX_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("AMOUNT_DUE_CACHE_TTL_SECONDS", "5")),
+)
+
+
+def invalidate_amount_due(card_number: str):
+    """Drops every cached amount due (and outstanding signed quote) for the card."""
+    _amount_due_cache.invalidate_where(lambda key: key[1] == card_number)
+    revoke_quotes(card_number)
+
+
+async def invalidate_amount_due_async(card_number: str):
+    """invalidate_amount_due for the event loop: the quote ledger write runs in a worker thread."""
+    _amount_due_cache.invalidate_where(lambda key: key[1] == card_number)
+    await anyio.to_thread.run_sync(revoke_quotes, card_number)
+
+
+def amount_due_cache_stats() -> dict:
+    return _amount_due_cache.stats()
+
+
+# ---------------------------------------------------------------------
+# Customer cache
+# ---------------------------------------------------------------------
+# Customer master data rarely changes, so GetCustomer results are kept per
+# (PersonID, credentials) together with a content hash that the customers
+# router serves as ETag. The credentials are part of the key so a cached
+# record is only returned to callers Designa already accepted for it.
+# CUSTOMER_CACHE_TTL_SECONDS=0 disables it.
+_customer_cache = TTLCache(
+    max_size=int(os.getenv("CUSTOMER_CACHE_MAX_SIZE", "5000")),
+    ttl_seconds=float(os.getenv("CUSTOMER_CACHE_TTL_SECONDS", "300")),
+)
+
+
+def _customer_cache_key(user: str, pwd: str, person_id: int):
+    return person_id, credentials_hash(user, pwd)
+
+
+def customer_etag(customer_data: dict) -> str:
+    """Stable strong ETag for a customer record (hash of its canonical JSON)."""
+    canonical = json.dumps(customer_data, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def cached_customer_etag(user: str, pwd: str, person_id: int):
+    """ETag of the cached record, or None when it is not cached."""
+    entry = _customer_cache.get(_customer_cache_key(user, pwd, person_id))
+    return entry[1] if entry is not None else None
+
+
+def get_customer_with_etag(user: str, pwd: str, person_id: int) -> tuple:
+    """Returns (customer_data, etag), calling GetCustomer only on a cache miss."""
+    key = _customer_cache_key(user, pwd, person_id)
+    entry = _customer_cache.get(key)
+    if entry is not None:
+        return entry
+    generation = _customer_cache.generation
+    customer_data = get_customer(user, pwd, person_id)
+    entry = (customer_data, customer_etag(customer_data))
+    _customer_cache.set(key, entry, generation)
+    return entry
+
+
+def invalidate_customer(person_id: int):
+    """Drops every cached record for the person."""
+    _customer_cache.invalidate_where(lambda key: key[0] == person_id)
+
+
+def customer_cache_stats() -> dict:
+    return _customer_cache.stats()
 
 
 
@@ -68,23 +190,25 @@ def login(tcc_num: int, user_id: str = None, password: str = None) -> int:
         if not user or not pwd:
             raise ValueError("Missing DESIGNA_USER or DESIGNA_PASSWORD.")
 
-        # Prepare SOAP client
-        client = get_soap_client("DESIGNA_WSDL_CASHPOINT_URL")
+        # Shared SOAP service proxy
+        service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
 
-        logger.info(f"Calling login for TccNum={tcc_num}, UserId={user}")
-        response = client.service.login(TccNum=tcc_num, UserId=user, pwd=pwd)
+        logger.info("Calling login", extra={"TccNum": tcc_num, "UserId": user})
+        response = service.login(TccNum=tcc_num, UserId=user, pwd=pwd)
 
         # Convert response to Python type (usually an int)
         result = serialize_object(response)
-        logger.info(f"login response: {result}")
+        log_payload(logger, "login response", result)
 
         return result
 
     except Fault as f:
-        logger.error(f"SOAP Fault in login: {f}")
+        logger.error("SOAP Fault in login: %s", f)
         raise RuntimeError("Failed to log in to DESIGNA SOAP service") from f
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in login: {e}")
+        logger.exception("Unexpected error in login: %s", e)
         raise
 
 
@@ -103,16 +227,16 @@ def logoff(tcc_num: int) -> bool:
         bool: True/False depending on the result from DESIGNA SOAP service.
     """
     try:
-        client = get_soap_client("DESIGNA_WSDL_CASHPOINT_URL")
+        service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
 
-        logger.info(f"Calling deprecated for TccNum={tcc_num}")
-        # response = client.service.deprecated(TccNum=tcc_num)
-        response = client.service.logoff(TccNum=tcc_num)
+        logger.info("Calling deprecated", extra={"TccNum": tcc_num})
+        # response = service.deprecated(TccNum=tcc_num)
+        response = service.logoff(TccNum=tcc_num)
 
 
         # Convert response to Python type
         result = serialize_object(response)
-        logger.info(f"deprecated response: {result}")
+        log_payload(logger, "deprecated response", result)
         # Ensure result is boolean
         if isinstance(result, bool):
             return result
@@ -123,59 +247,85 @@ def logoff(tcc_num: int) -> bool:
             raise RuntimeError(f"Unexpected SOAP response type: {type(result)}")
 
     except Fault as f:
-        logger.error(f"SOAP Fault in deprecated: {f}")
+        logger.error("SOAP Fault in deprecated: %s", f)
         raise RuntimeError("Failed to call DESIGNA deprecated SOAP operation") from f
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in deprecated: {e}")
+        logger.exception("Unexpected error in deprecated: %s", e)
         raise RuntimeError("Error occurred during deprecated SOAP call") from e
 
 
-def get_amount_due(tcc_num: int, card_number: str) -> str:
-    """Calls DESIGNA SOAP operation getAmountDue."""
+def _fetch_amount_due(tcc_num: int, card_number: str) -> str:
+    """getAmountDue straight from Designa: no cache, no coalescing (settlement due check)."""
     try:
-        client = get_soap_client("DESIGNA_WSDL_CASHPOINT_URL")
-        logger.info(f"Calling getAmountDue for CardNumber={card_number}, TccNum={tcc_num}")
+        service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+        logger.info("Calling getAmountDue", extra={"CardNumber": card_number, "TccNum": tcc_num})
         
-        response = client.service.getAmountDue(TccNum=tcc_num, CardNumber=card_number)
+        response = _with_session(tcc_num, lambda: service.getAmountDue(TccNum=tcc_num, CardNumber=card_number))
         result = serialize_object(response)
         
-        logger.info(f"getAmountDue raw response: {result}")
+        log_payload(logger, "getAmountDue response", result)
 
         # Check for null or error-like results
         if not result or (isinstance(result, dict)):
             raise RuntimeError(f"Invalid SOAP result: {result}")
 
         return result
-    
-        if isinstance(result, str) and "Error occured" in result:
-            raise ValueError(f"Ticket not found or cannot calculate fee: {result}")
-
-        return result
 
     except Fault as f:
-        logger.error(f"SOAP Fault in get_amount_due: {f}")
+        logger.error("SOAP Fault in get_amount_due: %s", f)
         raise RuntimeError(f"SOAP Fault: {f}") from f
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in get_amount_due: {e}")
+        logger.exception("Unexpected error in get_amount_due: %s", e)
         raise RuntimeError(f"Error occurred during getAmountDue: {e}") from e
 
 
+@coalesced("getAmountDue")
+def read_amount_due(tcc_num: int, card_number: str) -> tuple:
+    """
+    getAmountDue through the per-worker cache: (amount due, read_at).
+
+    ``read_at`` is the time.time() taken before the upstream read the amount
+    came from (the cache entry's, or the coalescing leader's), which is what
+    a signed quote for it must be stamped with.
+    """
+    cache_key = (tcc_num, card_number)
+    cached = _amount_due_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = _amount_due_cache.generation
+    read_at = time.time()
+    entry = (_fetch_amount_due(tcc_num, card_number), read_at)
+    _amount_due_cache.set(cache_key, entry, generation)
+    return entry
+
+
+def get_amount_due(tcc_num: int, card_number: str) -> str:
+    """Calls DESIGNA SOAP operation getAmountDue (cached per worker for lookups)."""
+    return read_amount_due(tcc_num, card_number)[0]
+
+
 # ---------------------------------------------------------------------
 # set_rebate
 # ---------------------------------------------------------------------
 def set_rebate(card_number: str, discount_type: int, discount_value: int, discount_account: int) -> int:
     """Calls DESIGNA SOAP operation setRebate."""
     try:
-        client = get_soap_client("DESIGNA_WSDL_CASHPOINT_URL")
+        service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
         user = settings.DESIGNA_USER
         pwd = settings.DESIGNA_PASSWORD
 
-        logger.info(
-            f"Calling setRebate for CardNumber={card_number}, "
-            f"DiscountType={discount_type}, Value={discount_value}, Account={discount_account}"
-        )
+        logger.info("Calling setRebate", extra={
+            "CardNumber": card_number,
+            "DiscountType": discount_type,
+            "Value": discount_value,
+            "Account": discount_account,
+        })
 
-        response = client.service.setRebate(
+        response = service.setRebate(
             UserID=user,
             UserPWD=pwd,
             CardNumber=card_number,
@@ -185,13 +335,16 @@ def set_rebate(card_number: str, discount_type: int, discount_value: int, discou
         )
 
         result = serialize_object(response)
-        logger.info(f"setRebate response: {result}")
+        log_payload(logger, "setRebate response", result)
+        invalidate_amount_due(card_number)
         return result
     except Fault as f:
-        logger.error(f"SOAP Fault in set_rebate: {f}")
+        logger.error("SOAP Fault in set_rebate: %s", f)
         raise RuntimeError("Failed to apply rebate") from f
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in set_rebate: {e}")
+        logger.exception("Unexpected error in set_rebate: %s", e)
         raise
 
 # ---------------------------------------------------------------------
@@ -231,16 +384,28 @@ def set_rebate(card_number: str, discount_type: int, discount_value: int, discou
 
 
 
-def set_card_settlement(tcc_num: int, card_number: str, amount_paid: float) -> dict:
-    """Performs card settlement only if outstanding dues exist."""
+def set_card_settlement(tcc_num: int, card_number: str, amount_paid: float, quote: str = None) -> dict:
+    """
+    Performs card settlement only if outstanding dues exist.
+
+    A valid signed quote from the ticket lookup (app.auth.quote_token) stands
+    in for the getAmountDue re-check; without one the due is fetched fresh
+    from Designa (never from the amount-due cache).
+    """
     try:
         user = settings.DESIGNA_USER
         pwd = settings.DESIGNA_PASSWORD
-        client = get_soap_client("DESIGNA_WSDL_CASHPOINT_URL")
+        service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
 
-        # Step 1: Fetch outstanding due
-        amount_due_raw = get_amount_due(tcc_num, card_number)
-        logger.info(f"[Payment Check] getAmountDue -> Card={card_number}, RawDue={amount_due_raw}")
+        # Step 1: Fetch outstanding due (unless the lookup's signed quote is still valid)
+        amount_due_raw = redeem_quote(quote, card_number, tcc_num) if quote else None
+        if amount_due_raw is not None:
+            logger.info("[Payment Check] signed quote", extra={"Card": card_number, "RawDue": amount_due_raw})
+        else:
+            # Always a fresh read: the per-worker cache may not have seen a
+            # settlement made through another worker
+            amount_due_raw = _fetch_amount_due(tcc_num, card_number)
+            logger.info("[Payment Check] getAmountDue", extra={"Card": card_number, "RawDue": amount_due_raw})
 
         try:
             amount_due = float(amount_due_raw)
@@ -269,22 +434,25 @@ def set_card_settlement(tcc_num: int, card_number: str, amount_paid: float) -> d
 
         # Step 3: Proceed with settlement
         settlement_time = datetime.now(UTC).isoformat()
-        logger.info(
-            f"[Settlement] Calling setCardSettlement for Card={card_number}, "
-            f"TCC={tcc_num}, AmountPaid={amount_paid}, Time={settlement_time}"
-        )
-
-        response = client.service.setCardSettlement(
+        logger.info("[Settlement] Calling setCardSettlement", extra={
+            "Card": card_number,
+            "TCC": tcc_num,
+            "AmountPaid": amount_paid,
+            "Time": settlement_time,
+        })
+
+        response = _with_session(tcc_num, lambda: service.setCardSettlement(
             UserID=user,
             UserPWD=pwd,
             TccNum=tcc_num,
             CardNumber=card_number,
             SettlementTime=settlement_time,
             AmountPaid=amount_paid,
-        )
+        ), replay=False)
 
         result = serialize_object(response)
-        logger.info(f"[Settlement] setCardSettlement response: {result}")
+        log_payload(logger, "[Settlement] setCardSettlement response", result)
+        invalidate_amount_due(card_number)
 
         return {
             "message": "Payment processed successfully.",
@@ -293,14 +461,14 @@ def set_card_settlement(tcc_num: int, card_number: str, amount_paid: float) -> d
         }
 
     except Fault as f:
-        logger.error(f"[SOAP Fault] set_card_settlement: {f}")
+        logger.error("[SOAP Fault] set_card_settlement: %s", f)
         raise HTTPException(status_code=502, detail="SOAP Fault during setCardSettlement")
     except HTTPException:
         # Already a clean client error, just re-raise it
         raise
 
     except Exception as e:
-        logger.exception(f"[Error] Unexpected issue in set_card_settlement: {e}")
+        logger.exception("[Error] Unexpected issue in set_card_settlement: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
 # ---------------------------------------------------------------------
 # set_cleared
@@ -310,37 +478,80 @@ def set_cleared(tcc_num: int, card_number: str, user_id: str = None, password: s
     try:
         user = user_id or settings.DESIGNA_USER
         pwd = password or settings.DESIGNA_PASSWORD
-        client = get_soap_client("DESIGNA_WSDL_CASHPOINT_URL")
+        service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
 
-        logger.info(f"Calling setCleared for CardNumber={card_number}, TccNum={tcc_num}")
-        response = client.service.setCleared(
+        logger.info("Calling setCleared", extra={"CardNumber": card_number, "TccNum": tcc_num})
+        response = _with_session(tcc_num, lambda: service.setCleared(
             UserID=user,
             UserPWD=pwd,
             TccNum=tcc_num,
             CardNumber=card_number,
-        )
+        ), replay=False)
         result = serialize_object(response)
         if not result or ("Error" in str(result)):
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid or failed setCleared response: {result}"
             )
-        logger.info(f"setCleared response: {result}")
+        log_payload(logger, "setCleared response", result)
+        invalidate_amount_due(card_number)
         return result
     except Fault as f:
-        logger.error(f"[SOAP Fault] setCleared: {f}")
+        logger.error("[SOAP Fault] setCleared: %s", f)
         raise HTTPException(status_code=502, detail=f"SOAP Fault during setCleared: {f}")
     except HTTPException:
         raise  # pass through clean errors
     except Exception as e:
-        logger.exception(f"[Unexpected Error] setCleared: {e}")
+        logger.exception("[Unexpected Error] setCleared: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal error during setCleared: {e}")
 
 
+# ---------------------------------------------------------------------
+# calc_tariff quote memoization
+# ---------------------------------------------------------------------
+# A calcTariff result depends on the tariff identifiers, when the stay
+# starts (weekday + time-of-day band) and how long it lasts. Designa
+# charges per started minute (see app.tariff_engine.charged_minutes), and
+# tariff steps fall on whole minutes, so quotes are memoized on (carpark,
+# card type, tariff, weekday, band, charged minutes): two stays share an
+# entry only when they are charged for the same minutes and therefore can
+# never sit on different sides of a step boundary. Call
+# flush_tariff_cache() (POST /manual-tickets/tariff-cache/flush) after
+# tariffs are changed in Designa.
+TARIFF_BAND_MINUTES = int(os.getenv("TARIFF_CACHE_BAND_MINUTES", "60"))
+
+_tariff_cache = TTLCache(
+    max_size=int(os.getenv("TARIFF_CACHE_MAX_SIZE", "5000")),
+    ttl_seconds=float(os.getenv("TARIFF_CACHE_MAX_AGE_SECONDS", "3600")),
+)
+
+
+def _tariff_cache_key(carpark_nr, card_type, tariff_id, time_entry: datetime, time_exit: datetime):
+    minute_of_day = time_entry.hour * 60 + time_entry.minute
+    return (
+        carpark_nr,
+        card_type,
+        tariff_id,
+        time_entry.utcoffset(),
+        time_entry.weekday(),
+        minute_of_day // TARIFF_BAND_MINUTES,
+        charged_minutes((time_exit - time_entry).total_seconds()),
+    )
+
+
+def flush_tariff_cache():
+    """Drops every memoized calcTariff quote (call after a tariff change)."""
+    _tariff_cache.clear()
+
+
+def tariff_cache_stats() -> dict:
+    return _tariff_cache.stats()
+
+
 # ---------------------------------------------------------------------
 # Function: calc_tariff
 # ---------------------------------------------------------------------
-def calc_tariff(
+def _calc_tariff_soap(
     carpark_nr: int,
     card_type: int,
     tariff_id: int,
@@ -361,6 +572,12 @@ def calc_tariff(
         dict: Tariff calculation details (AmountDue, GracePeriod, etc.)
     """
     try:
+        cache_key = _tariff_cache_key(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+        cached = _tariff_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        generation = _tariff_cache.generation
+
         # Load credentials
         user_id = os.getenv("DESIGNA_USER")
         user_pwd = os.getenv("DESIGNA_PASSWORD")
@@ -368,20 +585,23 @@ def calc_tariff(
         if not user_id or not user_pwd:
             raise ValueError("Missing DESIGNA_USER or DESIGNA_PASSWORD in environment.")
 
-        # Prepare SOAP client
-        client = get_soap_client("DESIGNA_WSDL_CASHPOINT_URL")
+        # Shared SOAP service proxy
+        service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
 
         # Ensure ISO format for datetime
         time_entry_iso = time_entry.isoformat()
         time_exit_iso = time_exit.isoformat()
 
-        logger.info(
-            f"Calling calcTariff for CarparkNr={carpark_nr}, CardType={card_type}, "
-            f"TariffId={tariff_id}, TimeEntry={time_entry_iso}, TimeExit={time_exit_iso}"
-        )
+        logger.info("Calling calcTariff", extra={
+            "CarparkNr": carpark_nr,
+            "CardType": card_type,
+            "TariffId": tariff_id,
+            "TimeEntry": time_entry_iso,
+            "TimeExit": time_exit_iso,
+        })
 
         # Call SOAP operation
-        response = client.service.calcTariff(
+        response = service.calcTariff(
             UserID=user_id,
             UserPWD=user_pwd,
             CarparkNr=carpark_nr,
@@ -392,37 +612,84 @@ def calc_tariff(
         )
 
         result = serialize_object(response)
-        logger.info(f"calcTariff response: {result}")
+        log_payload(logger, "calcTariff response", result)
+        _tariff_cache.set(cache_key, result, generation)
         return result
 
     except Fault as f:
-        logger.error(f"SOAP Fault in calc_tariff: {f}")
+        logger.error("SOAP Fault in calc_tariff: %s", f)
         raise RuntimeError("Failed to calculate tariff") from f
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in calc_tariff: {e}")
+        logger.exception("Unexpected error in calc_tariff: %s", e)
         raise
 
 
+def _local_tariff_quote(carpark_nr, card_type, tariff_id, time_entry, time_exit):
+    """Returns (engine, local quote) or (engine, None) when the tariff is not configured locally."""
+    engine = get_tariff_engine()
+    if engine is None:
+        return None, None
+    return engine, engine.quote(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+
+
+def calc_tariff(
+    carpark_nr: int,
+    card_type: int,
+    tariff_id: int,
+    time_entry: datetime,
+    time_exit: datetime,
+) -> dict:
+    """
+    Prices a stay, locally when possible and via calcTariff otherwise.
+
+    Tariffs present in TARIFF_TABLE_PATH are priced by app.tariff_engine.
+    A TARIFF_SHADOW_SAMPLE_RATE share of those quotes is also priced over
+    SOAP; on a mismatch the divergence is logged and the SOAP result is
+    returned instead.
+    """
+    engine, local = _local_tariff_quote(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+    if local is None:
+        return _calc_tariff_soap(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+    if not engine.should_shadow():
+        return local
+
+    try:
+        soap_result = _calc_tariff_soap(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+    except Exception as e:
+        logger.warning("Shadow calcTariff failed, keeping local quote: %s", e)
+        return local
+
+    context = f"CarparkNr={carpark_nr}, CardType={card_type}, TariffId={tariff_id}, {time_entry} -> {time_exit}"
+    return local if engine.matches(local, soap_result, context) else soap_result
+
+
 
 
+@coalesced("getCardByCarrier")
 def get_card_by_carrier(user: str, pwd: str, card_carrier_nr: str):
     """
     Calls DESIGNA SOAP API: getCardByCarrier
     """
     try:
-        client = get_soap_client("DESIGNA_WSDL_SERVICE_OPERATION_URL")
-        response = client.service.getCardByCarrier(
+        service = get_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+        response = service.getCardByCarrier(
             user=user,
             pwd=pwd,
             cardCarrierNr=card_carrier_nr
         )
+        plate_index.record_carrier_result(card_carrier_nr, response)
         return response
     except Fault as fault:
         raise RuntimeError(f"SOAP Fault: {fault}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise RuntimeError(f"Unexpected error calling SOAP: {e}")
     
 
+@coalesced("GetCustomer")
 def get_customer(user: str, pwd: str, person_id: int):
     """
     Calls DESIGNA SOAP API: getCustomer
@@ -436,12 +703,12 @@ def get_customer(user: str, pwd: str, person_id: int):
         dict: Customer details including name, address, and details list
     """
     try:
-        client = get_soap_client("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+        service = get_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
 
-        logger.info(f"Calling getCustomer for PersonID={person_id}")
+        logger.info("Calling getCustomer", extra={"PersonID": person_id})
 
         # Call the SOAP method
-        response = client.service.GetCustomer(
+        response = service.GetCustomer(
             user=user,
             pwd=pwd,
             personId=person_id
@@ -449,7 +716,7 @@ def get_customer(user: str, pwd: str, person_id: int):
 
         # Convert SOAP response to a serializable Python object
         result = serialize_object(response)
-        logger.info(f"getCustomer raw SOAP response: {result}")
+        log_payload(logger, "getCustomer response", result)
 
         if not result:
             raise RuntimeError("Empty SOAP response received from getCustomer.")
@@ -465,15 +732,18 @@ def get_customer(user: str, pwd: str, person_id: int):
         return customer_data
 
     except Fault as fault:
-        logger.error(f"SOAP Fault in get_customer: {fault}")
+        logger.error("SOAP Fault in get_customer: %s", fault)
         raise RuntimeError(f"SOAP Fault calling getCustomer: {fault}") from fault
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in get_customer: {e}")
+        logger.exception("Unexpected error in get_customer: %s", e)
         raise RuntimeError(f"Unexpected error calling getCustomer: {e}")
 
 # ---------------------------------------------------------------------
 # get_pm_string
 # ---------------------------------------------------------------------
+@coalesced("getPMString")
 def get_pm_string(user: str, pwd: str, short_card_nr: str) -> str:
     """
     Calls DESIGNA SOAP API: getPMString
@@ -485,33 +755,42 @@ def get_pm_string(user: str, pwd: str, short_card_nr: str) -> str:
         str: PM string result from DESIGNA SOAP
     """
     try:
-        client = get_soap_client("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+        credentials = credentials_hash(user, pwd)
+        cached = pm_store.get(short_card_nr, credentials)
+        if cached is not None:
+            return cached
+
+        service = get_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
 
-        logger.info(f"Calling getPMString for ShortCardNr={short_card_nr}")
+        logger.info("Calling getPMString", extra={"ShortCardNr": short_card_nr})
 
         # NOTE: SOAP operation name is case-sensitive
-        response = client.service.getPMString(
+        response = service.getPMString(
             user=user,
             pwd=pwd,
             shortCardNr=short_card_nr
         )
 
         result = serialize_object(response)
-        logger.info(f"getPMString SOAP response: {result}")
+        log_payload(logger, "getPMString response", result)
 
         if not result:
             raise RuntimeError("Empty response from getPMString")
 
+        pm_store.put(short_card_nr, credentials, result)
         return result
 
     except Fault as fault:
-        logger.error(f"SOAP Fault in get_pm_string: {fault}")
+        logger.error("SOAP Fault in get_pm_string: %s", fault)
         raise RuntimeError(f"SOAP Fault calling getPMString: {fault}") from fault
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in get_pm_string: {e}")
+        logger.exception("Unexpected error in get_pm_string: %s", e)
         raise RuntimeError(f"Unexpected error calling getPMString: {e}")
     
 
+@coalesced("getPMString.short")
 def get_Short_Card_Nr(short_card_nr: str) -> str:
     """
     Calls DESIGNA SOAP API: getPMString
@@ -523,67 +802,570 @@ def get_Short_Card_Nr(short_card_nr: str) -> str:
         str: PM string result from DESIGNA SOAP
     """
     try:
-        client = get_soap_client("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+        # Called without user / pwd: keyed apart from every credentialed caller
+        credentials = credentials_hash(None, None)
+        cached = pm_store.get(short_card_nr, credentials)
+        if cached is not None:
+            return cached
+
+        service = get_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
 
-        logger.info(f"Calling getPMString for ShortCardNr={short_card_nr}")
+        logger.info("Calling getPMString", extra={"ShortCardNr": short_card_nr})
 
         # NOTE: SOAP operation name is case-sensitive
-        response = client.service.getPMString(
+        response = service.getPMString(
             shortCardNr=short_card_nr
         )
 
         result = serialize_object(response)
-        logger.info(f"getPMString SOAP response: {result}")
+        log_payload(logger, "getPMString response", result)
 
         if not result:
             raise RuntimeError("Empty response from getPMString")
 
+        pm_store.put(short_card_nr, credentials, result)
         return result
 
     except Fault as fault:
-        logger.error(f"SOAP Fault in get_pm_string: {fault}")
+        logger.error("SOAP Fault in get_pm_string: %s", fault)
         raise RuntimeError(f"SOAP Fault calling getPMString: {fault}") from fault
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in get_pm_string: {e}")
+        logger.exception("Unexpected error in get_pm_string: %s", e)
         raise RuntimeError(f"Unexpected error calling getPMString: {e}")
 
 
+@coalesced("GetCardInfo")
 def get_card_info(tcc_num: int, card_number: str):
-    wsdl_url = os.getenv("DESIGNA_WSDL_CASHPOINT_URL")
-    if not wsdl_url:
-        raise RuntimeError("WSDL URL not configured in environment")
+    service = get_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
 
-    # Prepare a requests Session to control SSL verification
-    session = Session()
-    verify_ssl = os.getenv("DESIGNA_SSL_VERIFY", "True").lower() in ("true", "1", "yes")
-    session.verify = verify_ssl   # True or False based on .env
+    logger.info("Calling getCardInfo", extra={"TccNum": tcc_num, "CardNumber": card_number})
 
-    transport = Transport(session=session, timeout=30)
+    try:
+        response = _with_session(tcc_num, lambda: service.GetCardInfo(
+            UserID=os.getenv("DESIGNA_USER"),
+            UserPWD=os.getenv("DESIGNA_PASSWORD"),
+            TccNum=tcc_num,
+            CardNumber=card_number
+        ))
+    except Fault as fault:
+        logger.error("SOAP Fault in get_card_info: %s", fault)
+        raise RuntimeError(f"SOAP Fault calling getCardInfo: {fault}") from fault
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in get_card_info: %s", e)
+        raise RuntimeError(f"Unexpected error calling getCardInfo: {e}")
 
-    client = Client(
-        wsdl=wsdl_url,
-        transport=transport,
-        settings=ZeepSettings(strict=False)
-    )
+    result = serialize_object(response)
+    log_payload(logger, "getCardInfo response", result)
+
+    if result is None:
+        raise RuntimeError("Empty response from getCardInfo")
+
+    return result
+
+
+# ---------------------------------------------------------------------
+# Async variants
+# ---------------------------------------------------------------------
+# Awaitable twins of the functions above for the ``async def`` routers.
+# They go through the shared httpx pool (app.utils.get_async_soap_service)
+# so a slow Designa call never blocks the worker's event loop. Validation
+# and error mapping are kept identical to the blocking versions.
+
+async def login_async(tcc_num: int, user_id: str = None, password: str = None) -> int:
+    """Awaitable version of login."""
+    try:
+        user = user_id or settings.DESIGNA_USER
+        pwd = password or settings.DESIGNA_PASSWORD
+
+        if not user or not pwd:
+            raise ValueError("Missing DESIGNA_USER or DESIGNA_PASSWORD.")
+
+        service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
 
-    logger.info(f"Calling getCardInfo for TccNum={tcc_num}, CardNumber={card_number}")
+        logger.info("Calling login", extra={"TccNum": tcc_num, "UserId": user})
+        response = await service.login(TccNum=tcc_num, UserId=user, pwd=pwd)
 
+        result = serialize_object(response)
+        log_payload(logger, "login response", result)
+
+        return result
+
+    except Fault as f:
+        logger.error("SOAP Fault in login: %s", f)
+        raise RuntimeError("Failed to log in to DESIGNA SOAP service") from f
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in login: %s", e)
+        raise
+
+
+async def logoff_async(tcc_num: int) -> bool:
+    """Awaitable version of logoff."""
     try:
-        response = client.service.GetCardInfo(
+        service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+
+        logger.info("Calling deprecated", extra={"TccNum": tcc_num})
+        response = await service.logoff(TccNum=tcc_num)
+
+        result = serialize_object(response)
+        log_payload(logger, "deprecated response", result)
+        if isinstance(result, bool):
+            return result
+        elif isinstance(result, str):
+            return result.lower() == "true"
+        else:
+            raise RuntimeError(f"Unexpected SOAP response type: {type(result)}")
+
+    except Fault as f:
+        logger.error("SOAP Fault in deprecated: %s", f)
+        raise RuntimeError("Failed to call DESIGNA deprecated SOAP operation") from f
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in deprecated: %s", e)
+        raise RuntimeError("Error occurred during deprecated SOAP call") from e
+
+
+async def _fetch_amount_due_async(tcc_num: int, card_number: str) -> str:
+    """Awaitable version of _fetch_amount_due."""
+    try:
+        service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+        logger.info("Calling getAmountDue", extra={"CardNumber": card_number, "TccNum": tcc_num})
+
+        response = await _with_session_async(tcc_num, lambda: service.getAmountDue(TccNum=tcc_num, CardNumber=card_number))
+        result = serialize_object(response)
+
+        log_payload(logger, "getAmountDue response", result)
+
+        if not result or (isinstance(result, dict)):
+            raise RuntimeError(f"Invalid SOAP result: {result}")
+
+        return result
+
+    except Fault as f:
+        logger.error("SOAP Fault in get_amount_due: %s", f)
+        raise RuntimeError(f"SOAP Fault: {f}") from f
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in get_amount_due: %s", e)
+        raise RuntimeError(f"Error occurred during getAmountDue: {e}") from e
+
+
+@coalesced("getAmountDue")
+async def read_amount_due_async(tcc_num: int, card_number: str) -> tuple:
+    """Awaitable version of read_amount_due."""
+    cache_key = (tcc_num, card_number)
+    cached = _amount_due_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = _amount_due_cache.generation
+    read_at = time.time()
+    entry = (await _fetch_amount_due_async(tcc_num, card_number), read_at)
+    _amount_due_cache.set(cache_key, entry, generation)
+    return entry
+
+
+async def get_amount_due_async(tcc_num: int, card_number: str) -> str:
+    """Awaitable version of get_amount_due."""
+    return (await read_amount_due_async(tcc_num, card_number))[0]
+
+
+async def set_rebate_async(card_number: str, discount_type: int, discount_value: int, discount_account: int) -> int:
+    """Awaitable version of set_rebate."""
+    try:
+        service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+
+        logger.info("Calling setRebate", extra={
+            "CardNumber": card_number,
+            "DiscountType": discount_type,
+            "Value": discount_value,
+            "Account": discount_account,
+        })
+
+        response = await service.setRebate(
+            UserID=settings.DESIGNA_USER,
+            UserPWD=settings.DESIGNA_PASSWORD,
+            CardNumber=card_number,
+            DiscountType=discount_type,
+            DiscountValue=discount_value,
+            DiscountAccount=discount_account,
+        )
+
+        result = serialize_object(response)
+        log_payload(logger, "setRebate response", result)
+        await invalidate_amount_due_async(card_number)
+        return result
+    except Fault as f:
+        logger.error("SOAP Fault in set_rebate: %s", f)
+        raise RuntimeError("Failed to apply rebate") from f
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in set_rebate: %s", e)
+        raise
+
+
+async def set_card_settlement_async(tcc_num: int, card_number: str, amount_paid: float, quote: str = None) -> dict:
+    """Awaitable version of set_card_settlement (same due check and HTTP errors)."""
+    try:
+        service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+
+        # Step 1: Fetch outstanding due (unless the lookup's signed quote is still valid)
+        # The ledger is SQLite (BEGIN IMMEDIATE, busy timeout): keep it off the event loop
+        amount_due_raw = await anyio.to_thread.run_sync(redeem_quote, quote, card_number, tcc_num) if quote else None
+        if amount_due_raw is not None:
+            logger.info("[Payment Check] signed quote", extra={"Card": card_number, "RawDue": amount_due_raw})
+        else:
+            amount_due_raw = await _fetch_amount_due_async(tcc_num, card_number)
+            logger.info("[Payment Check] getAmountDue", extra={"Card": card_number, "RawDue": amount_due_raw})
+
+        try:
+            amount_due = float(amount_due_raw)
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=400,
+                detail="Unable to determine outstanding due for this ticket. Please verify the ticket number or TCC."
+            )
+
+        # Step 2: Validate payment logic
+        if amount_due <= 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No outstanding due for card {card_number}. Payment not required."
+            )
+
+        if amount_paid > amount_due:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Amount paid ({amount_paid}) exceeds outstanding due ({amount_due})."
+            )
+
+        # Step 3: Proceed with settlement
+        settlement_time = datetime.now(UTC).isoformat()
+        logger.info("[Settlement] Calling setCardSettlement", extra={
+            "Card": card_number,
+            "TCC": tcc_num,
+            "AmountPaid": amount_paid,
+            "Time": settlement_time,
+        })
+
+        response = await _with_session_async(tcc_num, lambda: service.setCardSettlement(
+            UserID=settings.DESIGNA_USER,
+            UserPWD=settings.DESIGNA_PASSWORD,
+            TccNum=tcc_num,
+            CardNumber=card_number,
+            SettlementTime=settlement_time,
+            AmountPaid=amount_paid,
+        ), replay=False)
+
+        result = serialize_object(response)
+        log_payload(logger, "[Settlement] setCardSettlement response", result)
+        await invalidate_amount_due_async(card_number)
+
+        return {
+            "message": "Payment processed successfully.",
+            "amount_due_before_payment": amount_due,
+            "soap_response": result,
+        }
+
+    except Fault as f:
+        logger.error("[SOAP Fault] set_card_settlement: %s", f)
+        raise HTTPException(status_code=502, detail="SOAP Fault during setCardSettlement")
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.exception("[Error] Unexpected issue in set_card_settlement: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal error: {e}")
+
+
+async def set_cleared_async(tcc_num: int, card_number: str, user_id: str = None, password: str = None) -> str:
+    """Awaitable version of set_cleared."""
+    try:
+        service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+
+        logger.info("Calling setCleared", extra={"CardNumber": card_number, "TccNum": tcc_num})
+        response = await _with_session_async(tcc_num, lambda: service.setCleared(
+            UserID=user_id or settings.DESIGNA_USER,
+            UserPWD=password or settings.DESIGNA_PASSWORD,
+            TccNum=tcc_num,
+            CardNumber=card_number,
+        ), replay=False)
+        result = serialize_object(response)
+        if not result or ("Error" in str(result)):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid or failed setCleared response: {result}"
+            )
+        log_payload(logger, "setCleared response", result)
+        await invalidate_amount_due_async(card_number)
+        return result
+    except Fault as f:
+        logger.error("[SOAP Fault] setCleared: %s", f)
+        raise HTTPException(status_code=502, detail=f"SOAP Fault during setCleared: {f}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("[Unexpected Error] setCleared: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal error during setCleared: {e}")
+
+
+async def _calc_tariff_soap_async(
+    carpark_nr: int,
+    card_type: int,
+    tariff_id: int,
+    time_entry: datetime,
+    time_exit: datetime,
+) -> dict:
+    """Awaitable version of _calc_tariff_soap."""
+    try:
+        cache_key = _tariff_cache_key(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+        cached = _tariff_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        generation = _tariff_cache.generation
+
+        user_id = os.getenv("DESIGNA_USER")
+        user_pwd = os.getenv("DESIGNA_PASSWORD")
+
+        if not user_id or not user_pwd:
+            raise ValueError("Missing DESIGNA_USER or DESIGNA_PASSWORD in environment.")
+
+        service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+
+        time_entry_iso = time_entry.isoformat()
+        time_exit_iso = time_exit.isoformat()
+
+        logger.info("Calling calcTariff", extra={
+            "CarparkNr": carpark_nr,
+            "CardType": card_type,
+            "TariffId": tariff_id,
+            "TimeEntry": time_entry_iso,
+            "TimeExit": time_exit_iso,
+        })
+
+        response = await service.calcTariff(
+            UserID=user_id,
+            UserPWD=user_pwd,
+            CarparkNr=carpark_nr,
+            CardType=card_type,
+            TariffId=tariff_id,
+            TimeEntry=time_entry_iso,
+            TimeExit=time_exit_iso,
+        )
+
+        result = serialize_object(response)
+        log_payload(logger, "calcTariff response", result)
+        _tariff_cache.set(cache_key, result, generation)
+        return result
+
+    except Fault as f:
+        logger.error("SOAP Fault in calc_tariff: %s", f)
+        raise RuntimeError("Failed to calculate tariff") from f
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in calc_tariff: %s", e)
+        raise
+
+
+async def calc_tariff_async(
+    carpark_nr: int,
+    card_type: int,
+    tariff_id: int,
+    time_entry: datetime,
+    time_exit: datetime,
+) -> dict:
+    """Awaitable version of calc_tariff (local engine first, sampled SOAP shadow check)."""
+    engine, local = _local_tariff_quote(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+    if local is None:
+        return await _calc_tariff_soap_async(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+    return await shadow_check_async(engine, local, carpark_nr, card_type, tariff_id, time_entry, time_exit)
+
+
+async def shadow_check_async(engine, local: dict, carpark_nr: int, card_type: int, tariff_id: int,
+                             time_entry: datetime, time_exit: datetime) -> dict:
+    """
+    Sampled SOAP shadow check of a local quote: returns the local quote, or
+    the calcTariff result when they disagree. Shared by calc_tariff_async
+    and the batch quotes priced by TariffEngine.quote_many.
+    """
+    if not engine.should_shadow():
+        return local
+
+    try:
+        soap_result = await _calc_tariff_soap_async(carpark_nr, card_type, tariff_id, time_entry, time_exit)
+    except Exception as e:
+        logger.warning("Shadow calcTariff failed, keeping local quote: %s", e)
+        return local
+
+    context = f"CarparkNr={carpark_nr}, CardType={card_type}, TariffId={tariff_id}, {time_entry} -> {time_exit}"
+    return local if engine.matches(local, soap_result, context) else soap_result
+
+
+@coalesced("getCardByCarrier")
+async def get_card_by_carrier_async(user: str, pwd: str, card_carrier_nr: str):
+    """Awaitable version of get_card_by_carrier."""
+    try:
+        service = await get_async_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+        response = await service.getCardByCarrier(
+            user=user,
+            pwd=pwd,
+            cardCarrierNr=card_carrier_nr
+        )
+        plate_index.record_carrier_result(card_carrier_nr, response)
+        return response
+    except Fault as fault:
+        raise RuntimeError(f"SOAP Fault: {fault}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Unexpected error calling SOAP: {e}")
+
+
+@coalesced("GetCustomer")
+async def get_customer_async(user: str, pwd: str, person_id: int):
+    """Awaitable version of get_customer."""
+    try:
+        service = await get_async_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+
+        logger.info("Calling getCustomer", extra={"PersonID": person_id})
+
+        response = await service.GetCustomer(
+            user=user,
+            pwd=pwd,
+            personId=person_id
+        )
+
+        result = serialize_object(response)
+        log_payload(logger, "getCustomer response", result)
+
+        if not result:
+            raise RuntimeError("Empty SOAP response received from getCustomer.")
+
+        return {
+            "FirstName": result.get("FirstName"),
+            "LastName": result.get("LastName"),
+            "Address": result.get("Address", {}),
+            "Details": result.get("Details", [])
+        }
+
+    except Fault as fault:
+        logger.error("SOAP Fault in get_customer: %s", fault)
+        raise RuntimeError(f"SOAP Fault calling getCustomer: {fault}") from fault
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in get_customer: %s", e)
+        raise RuntimeError(f"Unexpected error calling getCustomer: {e}")
+
+
+@coalesced("getPMString")
+async def get_pm_string_async(user: str, pwd: str, short_card_nr: str) -> str:
+    """Awaitable version of get_pm_string."""
+    try:
+        credentials = credentials_hash(user, pwd)
+        cached = pm_store.get(short_card_nr, credentials)
+        if cached is not None:
+            return cached
+
+        service = await get_async_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+
+        logger.info("Calling getPMString", extra={"ShortCardNr": short_card_nr})
+
+        response = await service.getPMString(
+            user=user,
+            pwd=pwd,
+            shortCardNr=short_card_nr
+        )
+
+        result = serialize_object(response)
+        log_payload(logger, "getPMString response", result)
+
+        if not result:
+            raise RuntimeError("Empty response from getPMString")
+
+        pm_store.put(short_card_nr, credentials, result)
+        return result
+
+    except Fault as fault:
+        logger.error("SOAP Fault in get_pm_string: %s", fault)
+        raise RuntimeError(f"SOAP Fault calling getPMString: {fault}") from fault
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in get_pm_string: %s", e)
+        raise RuntimeError(f"Unexpected error calling getPMString: {e}")
+
+
+@coalesced("getPMString.short")
+async def get_Short_Card_Nr_async(short_card_nr: str) -> str:
+    """Awaitable version of get_Short_Card_Nr."""
+    try:
+        # Called without user / pwd: keyed apart from every credentialed caller
+        credentials = credentials_hash(None, None)
+        cached = pm_store.get(short_card_nr, credentials)
+        if cached is not None:
+            return cached
+
+        service = await get_async_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+
+        logger.info("Calling getPMString", extra={"ShortCardNr": short_card_nr})
+
+        response = await service.getPMString(
+            shortCardNr=short_card_nr
+        )
+
+        result = serialize_object(response)
+        log_payload(logger, "getPMString response", result)
+
+        if not result:
+            raise RuntimeError("Empty response from getPMString")
+
+        pm_store.put(short_card_nr, credentials, result)
+        return result
+
+    except Fault as fault:
+        logger.error("SOAP Fault in get_pm_string: %s", fault)
+        raise RuntimeError(f"SOAP Fault calling getPMString: {fault}") from fault
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in get_pm_string: %s", e)
+        raise RuntimeError(f"Unexpected error calling getPMString: {e}")
+
+
+@coalesced("GetCardInfo")
+async def get_card_info_async(tcc_num: int, card_number: str):
+    """Awaitable version of get_card_info."""
+    service = await get_async_soap_service("DESIGNA_WSDL_CASHPOINT_URL")
+
+    logger.info("Calling getCardInfo", extra={"TccNum": tcc_num, "CardNumber": card_number})
+
+    try:
+        response = await _with_session_async(tcc_num, lambda: service.GetCardInfo(
             UserID=os.getenv("DESIGNA_USER"),
             UserPWD=os.getenv("DESIGNA_PASSWORD"),
             TccNum=tcc_num,
             CardNumber=card_number
-        )
+        ))
     except Fault as fault:
-        logger.error(f"SOAP Fault in get_card_info: {fault}")
+        logger.error("SOAP Fault in get_card_info: %s", fault)
         raise RuntimeError(f"SOAP Fault calling getCardInfo: {fault}") from fault
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception(f"Unexpected error in get_card_info: {e}")
+        logger.exception("Unexpected error in get_card_info: %s", e)
         raise RuntimeError(f"Unexpected error calling getCardInfo: {e}")
 
     result = serialize_object(response)
-    logger.info(f"getCardInfo SOAP response: {result}")
+    log_payload(logger, "getCardInfo response", result)
 
     if result is None:
         raise RuntimeError("Empty response from getCardInfo")
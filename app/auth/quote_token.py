@@ -0,0 +1,214 @@
+# app/auth/quote_token.py
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger("app.quote_token")
+
+# Short-lived, HMAC-signed amount-due quotes issued by GET /tickets/{card_number}.
+# A settlement that presents a valid quote for the same card and TCC can skip
+# its own getAmountDue re-check. Each quote can be redeemed once, and a write
+# to the card (rebate / settlement / clear) through any worker revokes every
+# quote read before it; both are kept in a SQLite file all workers share.
+QUOTE_TTL_SECONDS = int(os.getenv("QUOTE_TTL_SECONDS", "30"))
+_QUOTE_SECRET = (os.getenv("QUOTE_SECRET_KEY") or settings.SECRET_KEY).encode("utf-8")
+
+
+class QuoteLedger:
+    """
+    Card writes and redeemed quote nonces, shared by every gunicorn worker
+    on the host through one SQLite file (WAL mode).
+
+    Unlike the PM string store this is not a cache: when the file cannot be
+    read or written a quote is treated as invalid, so the settlement falls
+    back to a fresh getAmountDue. The file is opened on first use, not on
+    import. ``path=":memory:"`` keeps it in-process (single worker only).
+    """
+
+    PRUNE_INTERVAL_SECONDS = 60
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pruned_at = 0.0
+        self.redeemed = 0
+        self.replayed = 0
+        self.revoked = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS card_writes ("
+                " card_number TEXT PRIMARY KEY,"
+                " written_at REAL NOT NULL"
+                ")"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS redeemed_quotes ("
+                " nonce TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL"
+                ")"
+            )
+            self._connection = connection
+        return self._connection
+
+    def _prune(self, connection: sqlite3.Connection, now: float):
+        if now - self._pruned_at < self.PRUNE_INTERVAL_SECONDS:
+            return
+        self._pruned_at = now
+        connection.execute("DELETE FROM redeemed_quotes WHERE expires_at < ?", (now,))
+        # A write older than any unexpired quote can no longer revoke one
+        connection.execute("DELETE FROM card_writes WHERE written_at < ?", (now - self.ttl_seconds - 60,))
+
+    def record_write(self, card_number: str):
+        now = time.time()
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO card_writes (card_number, written_at) VALUES (?, ?)",
+                    (card_number, now),
+                )
+                self._prune(connection, now)
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                logger.error("Could not record card write for %s: %s", card_number, e)
+
+    def redeem(self, nonce: str, card_number: str, read_at: float, expires_at: float) -> bool:
+        """
+        Marks the quote as used. False if it was used before, if the card
+        was written to since its amount was read, or if the ledger failed.
+        """
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = connection.execute(
+                        "SELECT written_at FROM card_writes WHERE card_number = ?", (card_number,)
+                    ).fetchone()
+                    if row is not None and row[0] >= read_at:
+                        self.revoked += 1
+                        connection.execute("ROLLBACK")
+                        return False
+                    connection.execute(
+                        "INSERT INTO redeemed_quotes (nonce, expires_at) VALUES (?, ?)", (nonce, expires_at)
+                    )
+                except sqlite3.IntegrityError:
+                    self.replayed += 1
+                    connection.execute("ROLLBACK")
+                    return False
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+                self.redeemed += 1
+                self._prune(connection, time.time())
+                return True
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                logger.error("Quote ledger unavailable, ignoring quote for %s: %s", card_number, e)
+                return False
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "redeemed": self.redeemed,
+            "replayed": self.replayed,
+            "revoked": self.revoked,
+            "errors": self.errors,
+        }
+
+
+quote_ledger = QuoteLedger(
+    path=os.getenv("QUOTE_STORE_PATH", ".quote_store/quotes.sqlite3") or ":memory:",
+    ttl_seconds=QUOTE_TTL_SECONDS,
+)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(_QUOTE_SECRET, payload, hashlib.sha256).digest()
+
+
+def create_quote(card_number: str, tcc_num: int, amount_due, read_at: float) -> tuple:
+    """
+    Returns (token, expires_at) for an amount read from getAmountDue.
+
+    ``read_at`` is the time.time() taken before the upstream getAmountDue
+    the amount came from (see Soap.read_amount_due); a card write at or
+    after it revokes the quote.
+    """
+    expires_at = int(time.time()) + QUOTE_TTL_SECONDS
+    payload = json.dumps(
+        {"c": card_number, "t": tcc_num, "a": str(amount_due), "iat": read_at, "exp": expires_at,
+         "n": secrets.token_urlsafe(16)},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload))}", expires_at
+
+
+def verify_quote(token: str, card_number: str, tcc_num: int):
+    """
+    Returns the token's claims if it is authentic, unexpired and issued for
+    this card and TCC; otherwise None. Does not consume it (see redeem_quote).
+    """
+    try:
+        payload_part, signature_part = token.split(".", 1)
+        payload = _b64decode(payload_part)
+        if not hmac.compare_digest(_sign(payload), _b64decode(signature_part)):
+            return None
+        claims = json.loads(payload)
+    except (ValueError, TypeError):
+        return None
+
+    if not isinstance(claims, dict) or not isinstance(claims.get("n"), str):
+        return None
+    if claims.get("c") != card_number or claims.get("t") != tcc_num:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+
+def redeem_quote(token: str, card_number: str, tcc_num: int):
+    """
+    Returns the quoted amount due (as returned by getAmountDue) and marks the
+    quote as used, or None if it is invalid, revoked or was redeemed before.
+    A redeemed quote stays used even if the settlement then fails.
+    """
+    claims = verify_quote(token, card_number, tcc_num)
+    if claims is None:
+        return None
+    if not quote_ledger.redeem(claims["n"], card_number, claims.get("iat", 0), claims["exp"]):
+        return None
+    return claims.get("a")
+
+
+def revoke_quotes(card_number: str):
+    """Invalidates outstanding quotes for a card (in every worker) after a write changed its amount due."""
+    quote_ledger.record_write(card_number)
@@ -0,0 +1,169 @@
+# app/bulkheads.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+load_dotenv()
+
+# ---------------------------------------------------------------------
+# Bulkhead names (one per upstream)
+# ---------------------------------------------------------------------
+CASHPOINT = "cashpoint"
+SERVICE_OPERATION = "service_operation"
+HIT = "hit"
+
+# name -> (workers env key, default workers, max queue env key)
+_BULKHEAD_CONFIG = {
+    CASHPOINT: ("BULKHEAD_CASHPOINT_WORKERS", 20, "BULKHEAD_CASHPOINT_MAX_QUEUE"),
+    SERVICE_OPERATION: ("BULKHEAD_SERVICE_OPERATION_WORKERS", 10, "BULKHEAD_SERVICE_OPERATION_MAX_QUEUE"),
+    HIT: ("BULKHEAD_HIT_WORKERS", 20, "BULKHEAD_HIT_MAX_QUEUE"),
+}
+
+
+class Bulkhead:
+    """
+    An isolated, separately sized pool for calls to one upstream.
+
+    Blocking calls run on the bulkhead's own ThreadPoolExecutor via ``run``;
+    natively async calls (Windcave HIT) hold one of ``max_workers`` slots via
+    ``slot``. Either way a stall on one upstream can only exhaust its own pool.
+    When ``max_queue`` > 0, callers beyond that many waiters get an immediate
+    503 instead of queueing behind a stuck backend.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}")
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _admit(self):
+        with self._lock:
+            if self.max_queue and self._queued >= self.max_queue:
+                self._rejected += 1
+                raise HTTPException(status_code=503, detail=f"Upstream '{self.name}' is saturated, try again shortly")
+            self._queued += 1
+
+    def _start(self):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+
+    def _finish(self):
+        with self._lock:
+            self._active -= 1
+            self._completed += 1
+
+    def _tracked(self, fn, args, kwargs):
+        self._start()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._finish()
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs a blocking callable on this bulkhead's threads and awaits its result."""
+        self._admit()
+        try:
+            future = self._executor.submit(self._tracked, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future):
+        # A request cancelled before its call started never reaches _start
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one concurrency slot for the duration of an async upstream call."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        self._admit()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+        self._start()
+        try:
+            yield
+        finally:
+            self._finish()
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_bulkheads: dict = {}
+_bulkheads_lock = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """Returns the process-wide bulkhead for an upstream, sized from the environment."""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is not None:
+        return bulkhead
+
+    with _bulkheads_lock:
+        bulkhead = _bulkheads.get(name)
+        if bulkhead is None:
+            workers_key, default_workers, queue_key = _BULKHEAD_CONFIG[name]
+            bulkhead = Bulkhead(
+                name,
+                max_workers=int(os.getenv(workers_key, str(default_workers))),
+                max_queue=int(os.getenv(queue_key, "0")),
+            )
+            _bulkheads[name] = bulkhead
+        return bulkhead
+
+
+async def run_in_bulkhead(name: str, fn, *args, **kwargs):
+    """Shorthand for ``await get_bulkhead(name).run(fn, *args, **kwargs)``."""
+    return await get_bulkhead(name).run(fn, *args, **kwargs)
+
+
+async def hit_bulkhead_slot():
+    """Router dependency that keeps each /hit/* request inside the HIT bulkhead."""
+    async with get_bulkhead(HIT).slot():
+        yield
+
+
+def bulkhead_stats() -> dict:
+    return {name: get_bulkhead(name).stats() for name in _BULKHEAD_CONFIG}
+
+
+def shutdown_bulkheads():
+    with _bulkheads_lock:
+        for bulkhead in _bulkheads.values():
+            bulkhead.shutdown()
+        _bulkheads.clear()
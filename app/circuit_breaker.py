@@ -0,0 +1,232 @@
+# app/circuit_breaker.py
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from zeep.exceptions import Fault
+
+load_dotenv()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(HTTPException):
+    """Raised instead of calling a backend whose breaker is open (served as 503)."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"DESIGNA backend '{name}' is unavailable (circuit open), retry in {int(retry_after) + 1}s",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+
+def is_breaker_failure(error: Exception) -> bool:
+    """
+    Transport errors, timeouts and unparsable responses count against the
+    backend; SOAP Faults are business answers (unknown card, ...) and do not,
+    nor does a caller cancelling its own request.
+    """
+    return not isinstance(error, (Fault, HTTPException, asyncio.CancelledError))
+
+
+class CircuitBreaker:
+    """
+    Error-rate / slow-call-rate circuit breaker for one DESIGNA backend.
+
+    Outcomes of the last ``window_size`` calls are kept. Once at least
+    ``min_calls`` are recorded and either the failure rate or the share of
+    calls slower than ``slow_call_seconds`` reaches its threshold, the
+    breaker opens and every call fails immediately for ``open_seconds``.
+    It then lets ``half_open_probes`` trial calls through: if they all
+    succeed it closes, if any fails it opens again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_call_rate: float = 0.5,
+        open_seconds: float = 15.0,
+        half_open_probes: int = 2,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def before_call(self):
+        """Admits the call or raises CircuitOpenError."""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 1)
+                self._probes_in_flight += 1
+
+    def release(self):
+        """
+        Neutral outcome (the caller cancelled the call): frees a half-open
+        probe slot without counting the probe as a success or a failure.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def record(self, duration: float, failed: bool):
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if failed or slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+
+            if self.state == OPEN:
+                # A call admitted before the breaker opened finished late
+                return
+
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, s in self._outcomes if s)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._open()
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            retry_after = None
+            if self.state == OPEN:
+                retry_after = max(round(self.open_seconds - (time.monotonic() - self._opened_at), 1), 0)
+            return {
+                "state": self.state,
+                "window_calls": calls,
+                "window_failures": sum(1 for f, _ in self._outcomes if f),
+                "window_slow_calls": sum(1 for _, s in self._outcomes if s),
+                "retry_after_seconds": retry_after,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+# ---------------------------------------------------------------------
+# One breaker per backend, keyed by WSDL environment variable key
+# ---------------------------------------------------------------------
+_BACKEND_NAMES = {
+    "DESIGNA_WSDL_CASHPOINT_URL": "cashpoint",
+    "DESIGNA_WSDL_SERVICE_OPERATION_URL": "service_operation",
+}
+_breakers: dict = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(wsdl_env_key: str) -> CircuitBreaker:
+    breaker = _breakers.get(wsdl_env_key)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        breaker = _breakers.get(wsdl_env_key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                _BACKEND_NAMES.get(wsdl_env_key, wsdl_env_key),
+                window_size=int(os.getenv("BREAKER_WINDOW_SIZE", "20")),
+                min_calls=int(os.getenv("BREAKER_MIN_CALLS", "10")),
+                failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+                slow_call_seconds=float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "5")),
+                slow_call_rate=float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.5")),
+                open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "15")),
+                half_open_probes=int(os.getenv("BREAKER_HALF_OPEN_PROBES", "2")),
+            )
+            _breakers[wsdl_env_key] = breaker
+        return breaker
+
+
+def breaker_stats() -> dict:
+    return {breaker.name: breaker.stats() for breaker in (get_breaker(key) for key in _BACKEND_NAMES)}
+
+
+class GuardedService:
+    """
+    Wraps a zeep service proxy so every operation goes through a breaker.
+    Works for both the blocking and the async proxy.
+    """
+
+    def __init__(self, service, breaker: CircuitBreaker, is_async: bool = False):
+        self._service = service
+        self._breaker = breaker
+        self._is_async = is_async
+
+    def __getattr__(self, operation_name):
+        operation = getattr(self._service, operation_name)
+        breaker = self._breaker
+
+        if self._is_async:
+            async def guarded_async(*args, **kwargs):
+                breaker.before_call()
+                started = time.monotonic()
+                try:
+                    result = await operation(*args, **kwargs)
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                except BaseException as e:
+                    breaker.record(time.monotonic() - started, failed=is_breaker_failure(e))
+                    raise
+                breaker.record(time.monotonic() - started, failed=False)
+                return result
+            return guarded_async
+
+        def guarded(*args, **kwargs):
+            breaker.before_call()
+            started = time.monotonic()
+            try:
+                result = operation(*args, **kwargs)
+            except BaseException as e:
+                breaker.record(time.monotonic() - started, failed=is_breaker_failure(e))
+                raise
+            breaker.record(time.monotonic() - started, failed=False)
+            return result
+        return guarded
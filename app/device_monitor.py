@@ -0,0 +1,192 @@
+# app/device_monitor.py
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from zeep.helpers import serialize_object
+
+from app.utils import get_async_soap_service
+
+load_dotenv()
+
+logger = logging.getLogger("app.device_monitor")
+
+STATE = "state"
+COUNTERS = "counters"
+
+_OPERATIONS = {
+    STATE: "getServiceOperationState",
+    COUNTERS: "getCarParkCounterExt",
+}
+
+# Field names that identify one device / counter row in the SOAP answers
+_ID_FIELDS = ("DeviceNr", "DeviceNo", "DeviceId", "CounterNr", "CounterNo", "CarParkNr", "Id", "Nr")
+
+
+def _find_rows(data):
+    """Returns the first list found in a serialized SOAP answer (the device / counter rows)."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for value in data.values():
+            rows = _find_rows(value)
+            if rows is not None:
+                return rows
+    return None
+
+
+def _row_key(row, index: int) -> str:
+    if isinstance(row, dict):
+        id_parts = [f"{field}={row[field]}" for field in _ID_FIELDS if row.get(field) is not None]
+        if id_parts:
+            return ",".join(id_parts)
+    return str(index)
+
+
+def index_rows(data) -> dict:
+    """Maps each device / counter row to a stable key so snapshots can be diffed row by row."""
+    rows = _find_rows(data)
+    if rows is None:
+        return {"_": data}
+    return {_row_key(row, i): row for i, row in enumerate(rows)}
+
+
+class DeviceMonitor:
+    """
+    Polls getServiceOperationState and getCarParkCounterExt on a fixed
+    interval and keeps the latest snapshot of each in memory.
+
+    REST endpoints read the snapshot instead of calling DESIGNA, and every
+    subscriber of the event stream gets only the rows that changed, so the
+    upstream load is one call per operation per interval regardless of how
+    many dashboards are open.
+    """
+
+    def __init__(self, interval_seconds: float, max_staleness_seconds: float, queue_size: int = 100):
+        self.interval_seconds = interval_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.queue_size = queue_size
+        self._snapshots = {}
+        self._rows = {}
+        self._updated_at = {}
+        self._subscribers = set()
+        self._listeners = {}
+        self.version = 0
+        self.polls = 0
+        self.poll_errors = 0
+        self.last_error = None
+
+    @property
+    def running(self) -> bool:
+        return self.interval_seconds > 0
+
+    def on_snapshot(self, kind: str, callback):
+        """Registers ``callback(data, timestamp)`` to run after every successful poll of ``kind``."""
+        self._listeners.setdefault(kind, []).append(callback)
+
+    def snapshot(self, kind: str):
+        """Returns (data, as_of) of the latest poll, or None when missing or too old."""
+        updated_at = self._updated_at.get(kind)
+        if updated_at is None or time.time() - updated_at > self.max_staleness_seconds:
+            return None
+        return self._snapshots[kind], datetime.fromtimestamp(updated_at, timezone.utc).isoformat()
+
+    def _full_event(self, kind: str) -> dict:
+        return {"type": kind, "version": self.version, "full": True, "changed": self._rows.get(kind, {}), "removed": []}
+
+    def _publish(self, event: dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and resend full snapshots
+                while not queue.empty():
+                    queue.get_nowait()
+                for kind in self._rows:
+                    queue.put_nowait(self._full_event(kind))
+
+    def _apply(self, kind: str, data):
+        rows = index_rows(data)
+        previous = self._rows.get(kind, {})
+        changed = {key: row for key, row in rows.items() if previous.get(key) != row}
+        removed = [key for key in previous if key not in rows]
+
+        self._snapshots[kind] = data
+        self._rows[kind] = rows
+        self._updated_at[kind] = time.time()
+        for callback in self._listeners.get(kind, []):
+            try:
+                callback(data, self._updated_at[kind])
+            except Exception as e:
+                logger.error("Snapshot listener for %s failed: %s", kind, e, extra={"Kind": kind})
+        if changed or removed:
+            self.version += 1
+            self._publish({"type": kind, "version": self.version, "full": False, "changed": changed, "removed": removed})
+
+    async def poll_once(self):
+        service = await get_async_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+        for kind, operation_name in _OPERATIONS.items():
+            self.polls += 1
+            try:
+                response = await getattr(service, operation_name)()
+                self._apply(kind, jsonable_encoder(serialize_object(response)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.poll_errors += 1
+                self.last_error = str(e)
+                logger.error("Polling %s failed: %s", operation_name, e, extra={"Operation": operation_name})
+
+    async def run(self):
+        """Poll loop; runs for the lifetime of the worker (started from the FastAPI lifespan)."""
+        while True:
+            started = time.monotonic()
+            await self.poll_once()
+            await asyncio.sleep(max(self.interval_seconds - (time.monotonic() - started), 0))
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        for kind in self._rows:
+            queue.put_nowait(self._full_event(kind))
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def events(self, keepalive_seconds: float = 15.0):
+        """Server-Sent Events: full snapshots first, then only changed rows."""
+        queue = self.subscribe()
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\nid: {event['version']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "version": self.version,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "last_error": self.last_error,
+            "subscribers": len(self._subscribers),
+            "age_seconds": {kind: round(time.time() - ts, 1) for kind, ts in self._updated_at.items()},
+        }
+
+
+device_monitor = DeviceMonitor(
+    interval_seconds=float(os.getenv("DEVICE_POLL_INTERVAL_SECONDS", "5")),
+    max_staleness_seconds=float(os.getenv("DEVICE_POLL_MAX_STALENESS_SECONDS", "30")),
+    queue_size=int(os.getenv("DEVICE_STREAM_QUEUE_SIZE", "100")),
+)
@@ -0,0 +1,384 @@
+# app/hedging.py
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+from app.circuit_breaker import is_breaker_failure
+
+load_dotenv()
+
+logger = logging.getLogger("app.hedging")
+
+# Read-only operations: sending one twice is harmless. Writes
+# (setCardSettlement, setRebate, setCleared, login, ...) are never
+# hedged or retried and are passed straight through.
+IDEMPOTENT_OPERATIONS = frozenset({
+    "getAmountDue",
+    "GetCardInfo",
+    "getPMString",
+    "GetCustomer",
+    "getCardByCarrier",
+    "calcTariff",
+})
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes")
+
+
+class RetryBudget:
+    """
+    Global budget shared by every retry and hedge.
+
+    Each first attempt deposits ``ratio`` tokens (up to ``max_tokens``) and
+    ``min_per_second`` tokens trickle in over time; a retry or hedge spends
+    one. When the backend is failing across the board the budget drains and
+    extra attempts stop, so they can add at most ~``ratio`` to the load.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.spent = 0
+        self.denied = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._refilled_at) * self.min_per_second)
+        self._refilled_at = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.spent += 1
+                return True
+            self.denied += 1
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {"tokens": round(self._tokens, 2), "spent": self.spent, "denied": self.denied}
+
+
+class LatencyTracker:
+    """Recent latencies of one operation; the hedge delay is a percentile of them."""
+
+    def __init__(self, window_size: int, percentile: float, min_samples: int, min_delay: float):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._samples = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None until enough samples exist."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(int(len(ordered) * self.percentile / 100.0), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "retries": self.retries,
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            }
+
+
+retry_budget = RetryBudget(
+    ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.1")),
+    min_per_second=float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1")),
+    max_tokens=float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "20")),
+)
+
+_trackers: dict = {}
+_trackers_lock = threading.Lock()
+_hedge_pools: dict = {}
+
+
+def _get_tracker(operation_name: str) -> LatencyTracker:
+    with _trackers_lock:
+        tracker = _trackers.get(operation_name)
+        if tracker is None:
+            tracker = LatencyTracker(
+                window_size=int(os.getenv("HEDGE_WINDOW_SIZE", "200")),
+                percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+                min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+                min_delay=int(os.getenv("HEDGE_MIN_DELAY_MS", "50")) / 1000.0,
+            )
+            _trackers[operation_name] = tracker
+        return tracker
+
+
+class HedgePool:
+    """
+    Threads for the hedged calls of one backend's blocking callers (first
+    attempt and hedge). When all of them are busy (e.g. the backend is
+    stalled) calls run unhedged instead of queueing, so hedging never adds
+    waiting on top of a bulkhead.
+    """
+
+    def __init__(self, backend: str, max_workers: int):
+        self.backend = backend
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{backend}")
+        self._lock = threading.Lock()
+        self._active = 0
+        self.skipped = 0
+
+    def try_submit(self, fn, *args):
+        """Returns a Future, or None when every hedge thread is busy."""
+        with self._lock:
+            if self._active >= self.max_workers:
+                self.skipped += 1
+                return None
+            self._active += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._active -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"max_workers": self.max_workers, "active": self._active, "skipped": self.skipped}
+
+
+def _get_hedge_pool(backend: str) -> HedgePool:
+    with _trackers_lock:
+        pool = _hedge_pools.get(backend)
+        if pool is None:
+            pool = HedgePool(backend, max_workers=int(os.getenv("HEDGE_MAX_WORKERS", "20")))
+            _hedge_pools[backend] = pool
+        return pool
+
+
+def shutdown_hedge_pools():
+    with _trackers_lock:
+        pools = list(_hedge_pools.values())
+        _hedge_pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def hedging_stats() -> dict:
+    with _trackers_lock:
+        trackers = dict(_trackers)
+        pools = dict(_hedge_pools)
+    return {
+        "hedging_enabled": _env_bool("HEDGE_ENABLED", "false"),
+        "max_retries": int(os.getenv("READ_RETRY_ATTEMPTS", "1")),
+        "retry_budget": retry_budget.stats(),
+        "operations": {name: tracker.stats() for name, tracker in trackers.items()},
+        "hedge_pools": {backend: pool.stats() for backend, pool in pools.items()},
+    }
+
+
+class HedgedService:
+    """
+    Wraps a (breaker-guarded) zeep service proxy. Idempotent reads get an
+    optional hedge once the first attempt passes the operation's latency
+    percentile, and up to READ_RETRY_ATTEMPTS retries on transient errors;
+    both are paid for from the global retry budget. Everything else is
+    passed through untouched.
+
+    For blocking callers a hedgeable call runs both attempts on
+    ``backend``'s HedgePool while the caller's (bulkhead) thread waits for
+    the first answer; the loser finishes in the background and is dropped.
+    Calls that are not hedged, or that find the pool busy, run on the
+    caller's thread as usual.
+    """
+
+    def __init__(self, service, backend: str, is_async: bool = False):
+        self._service = service
+        self._backend = backend
+        self._is_async = is_async
+        self.hedging = _env_bool("HEDGE_ENABLED", "false")
+        self.max_retries = int(os.getenv("READ_RETRY_ATTEMPTS", "1"))
+
+    def __getattr__(self, operation_name):
+        operation = getattr(self._service, operation_name)
+        if operation_name not in IDEMPOTENT_OPERATIONS:
+            return operation
+        tracker = _get_tracker(operation_name)
+
+        if self._is_async:
+            async def hedged_async(*args, **kwargs):
+                return await self._call_async(operation_name, operation, tracker, args, kwargs)
+            return hedged_async
+
+        def hedged(*args, **kwargs):
+            return self._call(operation_name, operation, tracker, args, kwargs)
+        return hedged
+
+    def _should_retry(self, operation_name, tracker, attempt, error) -> bool:
+        if attempt >= self.max_retries or not is_breaker_failure(error):
+            return False
+        if not retry_budget.try_spend():
+            logger.warning("Retry budget exhausted, not retrying %s: %s", operation_name, error,
+                           extra={"Operation": operation_name})
+            return False
+        tracker.count("retries")
+        logger.warning("Retrying %s after transient error: %s", operation_name, error, extra={"Operation": operation_name})
+        return True
+
+    # -----------------------------------------------------------------
+    # Blocking callers
+    # -----------------------------------------------------------------
+    def _call(self, operation_name, operation, tracker, args, kwargs):
+        tracker.count("calls")
+        retry_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(operation, tracker, args, kwargs)
+            except Exception as e:
+                if not self._should_retry(operation_name, tracker, attempt, e):
+                    raise
+                attempt += 1
+
+    def _timed(self, operation, args, kwargs):
+        started = time.monotonic()
+        result = operation(*args, **kwargs)
+        return result, time.monotonic() - started
+
+    def _attempt(self, operation, tracker, args, kwargs):
+        delay = tracker.hedge_delay() if self.hedging else None
+        pool = _get_hedge_pool(self._backend) if delay is not None else None
+        primary = pool.try_submit(self._timed, operation, args, kwargs) if pool is not None else None
+        if primary is None:
+            # Not hedged (or every hedge thread is busy): run on the caller's thread
+            result, elapsed = self._timed(operation, args, kwargs)
+            tracker.record(elapsed)
+            return result
+
+        pending = {primary}
+        try:
+            done, _ = wait(pending, timeout=delay)
+            hedge = None
+            if not done and retry_budget.try_spend():
+                hedge = pool.try_submit(self._timed, operation, args, kwargs)
+                if hedge is not None:
+                    tracker.count("hedges")
+                    pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge:
+                            tracker.count("hedge_wins")
+                        result, elapsed = future.result()
+                        tracker.record(elapsed)
+                        return result
+                    error = future.exception()
+                    if not is_breaker_failure(error):
+                        # A SOAP Fault is Designa's answer; the other attempt would get the same
+                        raise error
+            raise error
+        finally:
+            # A losing attempt already running finishes in the background; its answer is dropped
+            for future in pending:
+                future.cancel()
+
+    # -----------------------------------------------------------------
+    # Event-loop callers
+    # -----------------------------------------------------------------
+    async def _call_async(self, operation_name, operation, tracker, args, kwargs):
+        tracker.count("calls")
+        retry_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt_async(operation, tracker, args, kwargs)
+            except Exception as e:
+                if not self._should_retry(operation_name, tracker, attempt, e):
+                    raise
+                attempt += 1
+
+    async def _timed_async(self, operation, args, kwargs):
+        started = time.monotonic()
+        result = await operation(*args, **kwargs)
+        return result, time.monotonic() - started
+
+    async def _attempt_async(self, operation, tracker, args, kwargs):
+        delay = tracker.hedge_delay() if self.hedging else None
+        if delay is None:
+            result, elapsed = await self._timed_async(operation, args, kwargs)
+            tracker.record(elapsed)
+            return result
+
+        primary = asyncio.ensure_future(self._timed_async(operation, args, kwargs))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not retry_budget.try_spend():
+                result, elapsed = await primary
+                tracker.record(elapsed)
+                return result
+
+            tracker.count("hedges")
+            hedge = asyncio.ensure_future(self._timed_async(operation, args, kwargs))
+            pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            tracker.count("hedge_wins")
+                        result, elapsed = task.result()
+                        tracker.record(elapsed)
+                        return result
+                    error = task.exception()
+                    if not is_breaker_failure(error):
+                        raise error
+            raise error
+        finally:
+            # The losing attempt is cancelled (also when the caller goes away)
+            for task in pending:
+                task.cancel()
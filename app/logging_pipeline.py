@@ -0,0 +1,171 @@
+# app/logging_pipeline.py
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    ``time [LEVEL] logger - message key=value ...`` (LOG_FORMAT=text) or one
+    JSON object per line (LOG_FORMAT=json). Fields passed with ``extra=``
+    are emitted as structured fields.
+    """
+
+    def __init__(self, fmt: str = "text"):
+        super().__init__("%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+        self.json = fmt == "json"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+        if self.json:
+            entry = {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                entry["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues the record as-is. The stock QueueHandler formats the message
+    in the calling thread; here %-args, payload truncation and tracebacks
+    are rendered by the listener thread, off the request path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# ---------------------------------------------------------------------
+# Payload sampling and the in-memory payload ring
+# ---------------------------------------------------------------------
+class _Truncated:
+    """Renders a payload lazily (in the listener), cut to ``limit`` characters."""
+
+    __slots__ = ("payload", "limit", "redact")
+
+    def __init__(self, payload, limit: int, redact=None):
+        self.payload = payload
+        self.limit = limit
+        self.redact = redact
+
+    def __str__(self):
+        if isinstance(self.payload, str):
+            text = self.payload
+        elif isinstance(self.payload, bytes):
+            text = self.payload.decode("utf-8", errors="replace")
+        else:
+            text = repr(self.payload)
+        if self.redact is not None:
+            text = self.redact(text)
+        if self.limit and len(text) > self.limit:
+            return f"{text[:self.limit]}... [{len(text) - self.limit} more chars]"
+        return text
+
+
+_payload_ring = deque(maxlen=int(os.getenv("LOG_PAYLOAD_RING_SIZE", "200")))
+_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+
+
+def log_payload(logger: logging.Logger, label: str, payload, redact=None, **fields):
+    """
+    Records a full request / response payload.
+
+    Every payload goes into the in-memory ring (by reference; nothing is
+    formatted here). Only a LOG_PAYLOAD_SAMPLE_RATE share is also written to
+    the log, truncated to LOG_PAYLOAD_MAX_CHARS. ``redact`` is applied to the
+    rendered text, both in the log and in ring dumps.
+    """
+    _payload_ring.append((time.time(), logger.name, label, fields, payload, redact))
+    if _PAYLOAD_SAMPLE_RATE > 0 and logger.isEnabledFor(logging.INFO):
+        if _PAYLOAD_SAMPLE_RATE >= 1 or random.random() < _PAYLOAD_SAMPLE_RATE:
+            logger.info("%s: %s", label, _Truncated(payload, _PAYLOAD_MAX_CHARS, redact), extra=fields)
+
+
+def recent_payloads(limit: int = 50, logger_name: str = None) -> list:
+    """Most recent payloads first, rendered in full (after redaction)."""
+    entries = list(_payload_ring)
+    if logger_name:
+        entries = [entry for entry in entries if entry[1].startswith(logger_name)]
+    return [
+        {
+            "time": logged_at,
+            "logger": name,
+            "label": label,
+            **fields,
+            "payload": str(_Truncated(payload, 0, redact)),
+        }
+        for logged_at, name, label, fields, payload, redact in reversed(entries[-limit:])
+    ]
+
+
+# ---------------------------------------------------------------------
+# Pipeline setup
+# ---------------------------------------------------------------------
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def configure_logging():
+    """
+    Routes every ``app.*`` logger through one queue; a single listener
+    thread formats and writes to stderr. Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        log_queue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(StructuredFormatter(os.getenv("LOG_FORMAT", "text").lower()))
+
+        app_logger = logging.getLogger("app")
+        app_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        app_logger.handlers = [_DeferredQueueHandler(log_queue)]
+        app_logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Drains the queue and stops the listener thread (FastAPI shutdown / exit)."""
+    global _listener
+    with _setup_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def logging_stats() -> dict:
+    return {
+        "payload_ring_size": len(_payload_ring),
+        "payload_ring_capacity": _payload_ring.maxlen,
+        "payload_sample_rate": _PAYLOAD_SAMPLE_RATE,
+        "payload_max_chars": _PAYLOAD_MAX_CHARS,
+    }
@@ -1,11 +1,60 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import anyio
 from fastapi import FastAPI
-from app.routers import Customers, LogOff, Login, ServiceOperation, ShortCardNr, Hit_Integration, Plates, Ticket_Details, Tickets, Manual_Tickets, Ops
+from app.routers import Customers, LogOff, Login, ServiceOperation, ShortCardNr, Hit_Integration, Plates, Ticket_Details, Tickets, Manual_Tickets, Ops, Metrics
 from dotenv import load_dotenv
 import os
 from app.routers.Login import router as login_router
 from app.routers.LogOff import router as logoff_router
 from app.Soap import login
-app = FastAPI(title="Designa Gateway API")
+from app.utils import close_async_soap_clients, get_async_soap_client
+from app.bulkheads import shutdown_bulkheads
+from app.hedging import shutdown_hedge_pools
+from app.responses import FastJSONResponse
+from app.logging_pipeline import configure_logging, stop_logging
+from app.sessions import run_session_refresher
+from app.device_monitor import COUNTERS, device_monitor
+from app.services.Hit_Services import close_hit_client, start_hit_client
+from app.services.hit_transactions import hit_engine
+from app.occupancy import occupancy_history
+
+logger = logging.getLogger("app.main")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # Parse the WSDLs for the async SOAP clients off the event loop, once per worker
+    for wsdl_env_key in ("DESIGNA_WSDL_CASHPOINT_URL", "DESIGNA_WSDL_SERVICE_OPERATION_URL"):
+        try:
+            await anyio.to_thread.run_sync(get_async_soap_client, wsdl_env_key)
+        except Exception as e:
+            # Built lazily on first use instead; the worker still starts
+            logger.warning("Could not preload async SOAP client %s: %s", wsdl_env_key, e, extra={"WsdlKey": wsdl_env_key})
+    # Keep-alive pool for the Windcave HIT endpoint
+    await start_hit_client()
+    # Log the configured TCCs in once and keep their Designa sessions warm
+    session_refresher = asyncio.create_task(run_session_refresher())
+    # One upstream poll per interval feeds every /devices reader and the occupancy history
+    device_monitor.on_snapshot(COUNTERS, occupancy_history.record)
+    device_poller = asyncio.create_task(device_monitor.run()) if device_monitor.running else None
+    yield
+    session_refresher.cancel()
+    if device_poller is not None:
+        device_poller.cancel()
+    occupancy_history.flush()
+    await close_async_soap_clients()
+    await hit_engine.shutdown()
+    await close_hit_client()
+    shutdown_bulkheads()
+    shutdown_hedge_pools()
+    stop_logging()
+
+
+app = FastAPI(title="Designa Gateway API", lifespan=lifespan, default_response_class=FastJSONResponse)
 load_dotenv()
 
 app.include_router(login_router)
@@ -19,5 +68,7 @@ app.include_router(Customers.router)
 app.include_router(ServiceOperation.router)
 app.include_router(ShortCardNr.router)
 app.include_router(Hit_Integration.router)
+app.include_router(Hit_Integration.transactions_router)
 app.include_router(Ticket_Details.router)
+app.include_router(Metrics.router)
 # app.include_router(LogOff.app.router)
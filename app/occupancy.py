@@ -0,0 +1,238 @@
+# app/occupancy.py
+import fcntl
+import glob
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.device_monitor import index_rows
+
+load_dotenv()
+
+logger = logging.getLogger("app.occupancy")
+
+
+class RingSeries:
+    """
+    Fixed-capacity (timestamp, value) ring buffer backed by numpy arrays.
+
+    With ``path`` set the buffer lives in a memory-mapped file: row 0 holds
+    (head, count), rows 1..capacity the samples, so history survives a
+    restart. Samples are appended in time order, which lets queries slice
+    and bucket them without sorting.
+    """
+
+    def __init__(self, capacity: int, path: str = None, read_only: bool = False):
+        self.capacity = capacity
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if path:
+            expected_size = (capacity + 1) * 2 * np.dtype(np.float64).itemsize
+            matches = os.path.exists(path) and os.path.getsize(path) == expected_size
+            if read_only:
+                if not matches:
+                    raise FileNotFoundError(f"No occupancy history of capacity {capacity} at {path}")
+                mode = "r"
+            else:
+                mode = "r+" if matches else "w+"
+                if mode == "w+" and os.path.exists(path):
+                    logger.warning("Discarding occupancy history %s: written with a different capacity", path)
+            self._data = np.memmap(path, dtype=np.float64, mode=mode, shape=(capacity + 1, 2))
+        else:
+            self._data = np.zeros((capacity + 1, 2), dtype=np.float64)
+        self._ts = self._data[1:, 0]
+        self._values = self._data[1:, 1]
+
+    @property
+    def count(self) -> int:
+        return int(self._data[0, 1])
+
+    def append(self, timestamp: float, value: float):
+        with self._lock:
+            head, count = int(self._data[0, 0]), int(self._data[0, 1])
+            self._ts[head] = timestamp
+            self._values[head] = value
+            self._data[0, 0] = (head + 1) % self.capacity
+            self._data[0, 1] = min(count + 1, self.capacity)
+
+    def _ordered(self):
+        """Copies of (timestamps, values), oldest first."""
+        with self._lock:
+            head, count = int(self._data[0, 0]), int(self._data[0, 1])
+            if count < self.capacity:
+                return self._ts[:count].copy(), self._values[:count].copy()
+            return np.concatenate((self._ts[head:], self._ts[:head])), np.concatenate((self._values[head:], self._values[:head]))
+
+    def downsample(self, start: float, end: float, step: float) -> dict:
+        """min / max / mean / sample count per ``step`` seconds bucket of [start, end)."""
+        ts, values = self._ordered()
+        lo, hi = np.searchsorted(ts, start, side="left"), np.searchsorted(ts, end, side="left")
+        ts, values = ts[lo:hi], values[lo:hi]
+        if ts.size == 0:
+            return {"t": [], "min": [], "max": [], "mean": [], "samples": []}
+
+        buckets = ((ts - start) // step).astype(np.int64)
+        # Data is time-ordered, so each bucket is one contiguous run
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        counts = np.diff(np.append(starts, ts.size))
+        return {
+            "t": (start + buckets[starts] * step).tolist(),
+            "min": np.minimum.reduceat(values, starts).tolist(),
+            "max": np.maximum.reduceat(values, starts).tolist(),
+            "mean": np.round(np.add.reduceat(values, starts) / counts, 3).tolist(),
+            "samples": counts.tolist(),
+        }
+
+    def flush(self):
+        if isinstance(self._data, np.memmap) and not self.read_only:
+            self._data.flush()
+
+
+class OccupancyHistory:
+    """
+    One RingSeries per counter row of getCarParkCounterExt, fed by the
+    device poller (app/device_monitor.py). A row's series key is the same
+    row key the /devices/stream events use (e.g. ``CarParkNr=1,CounterNr=2``).
+
+    With ``spill_dir`` set, the files are shared by every gunicorn worker on
+    the host, but only one of them writes: the worker holding an exclusive
+    lock on ``writer.lock``. The others skip recording and answer queries
+    from read-only mappings of the writer's files. When the writer exits,
+    the lock is released and another worker takes it over on its next poll.
+    """
+
+    WRITER_RETRY_SECONDS = 30
+
+    def __init__(self, capacity: int, value_fields: list, spill_dir: str = ""):
+        self.capacity = capacity
+        self.value_fields = value_fields
+        self.spill_dir = spill_dir
+        self._series = {}
+        self._lock = threading.Lock()
+        self._writer_lock_file = None
+        self._writer_checked_at = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _value(self, row):
+        if not isinstance(row, dict):
+            return None
+        for field in self.value_fields:
+            value = row.get(field)
+            if value is None:
+                continue
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+        return None
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.spill_dir, f"{name}.f64")
+
+    def is_writer(self) -> bool:
+        """True when this worker records samples (always, without ``spill_dir``)."""
+        if not self.spill_dir or self._writer_lock_file is not None:
+            return True
+        now = time.monotonic()
+        if self._writer_checked_at is not None and now - self._writer_checked_at < self.WRITER_RETRY_SECONDS:
+            return False
+        self._writer_checked_at = now
+        lock_file = open(os.path.join(self.spill_dir, "writer.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._writer_lock_file = lock_file
+        with self._lock:
+            # Read-only mappings are reopened writable on their next sample
+            self._series.clear()
+        logger.info("Recording occupancy history to %s (pid %s)", self.spill_dir, os.getpid())
+        return True
+
+    def _get_series(self, key: str) -> RingSeries:
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                path = None
+                if self.spill_dir:
+                    path = self._path(key)
+                    with open(path[:-len(".f64")] + ".key", "w", encoding="utf-8") as fh:
+                        fh.write(key)
+                series = RingSeries(self.capacity, path)
+                self._series[key] = series
+            return series
+
+    def _open_existing(self):
+        """Maps series files found in ``spill_dir`` (read-only unless this worker is the writer)."""
+        if not self.spill_dir:
+            return
+        read_only = not self.is_writer()
+        for key_path in glob.glob(os.path.join(self.spill_dir, "*.key")):
+            try:
+                with open(key_path, "r", encoding="utf-8") as fh:
+                    key = fh.read()
+                with self._lock:
+                    if key not in self._series:
+                        self._series[key] = RingSeries(
+                            self.capacity, key_path[:-len(".key")] + ".f64", read_only=read_only,
+                        )
+            except (OSError, ValueError) as e:
+                # The writer may still be creating it; picked up on the next query
+                logger.debug("Skipping occupancy history %s: %s", key_path, e)
+
+    def record(self, data, timestamp: float = None):
+        """Appends one sample per counter row of a getCarParkCounterExt snapshot."""
+        if not self.is_writer():
+            return
+        timestamp = timestamp or time.time()
+        for key, row in index_rows(data).items():
+            value = self._value(row)
+            if value is not None:
+                self._get_series(key).append(timestamp, value)
+
+    def series_keys(self) -> dict:
+        self._open_existing()
+        with self._lock:
+            return {key: series.count for key, series in self._series.items()}
+
+    def query(self, key: str, start: float, end: float, points: int = None, step_seconds: float = None):
+        """Returns the downsampled series, or None for an unknown key."""
+        self._open_existing()
+        with self._lock:
+            series = self._series.get(key)
+        if series is None:
+            return None
+        if not step_seconds:
+            step_seconds = max(math.ceil((end - start) / max(points or 500, 1)), 1)
+        result = series.downsample(start, end, step_seconds)
+        result["step_seconds"] = step_seconds
+        return result
+
+    def flush(self):
+        with self._lock:
+            series = list(self._series.values())
+        for s in series:
+            s.flush()
+
+
+def _value_fields() -> list:
+    raw = os.getenv("OCCUPANCY_VALUE_FIELDS", "CurrentLevel,Occupied,Occupancy,Count,Value")
+    return [field.strip() for field in raw.split(",") if field.strip()]
+
+
+occupancy_history = OccupancyHistory(
+    # default: one week of samples at the default 5 s poll interval
+    capacity=int(os.getenv("OCCUPANCY_HISTORY_CAPACITY", "120960")),
+    value_fields=_value_fields(),
+    spill_dir=os.getenv("OCCUPANCY_HISTORY_DIR", ""),
+)
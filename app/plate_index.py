@@ -0,0 +1,189 @@
+# app/plate_index.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from itertools import combinations
+
+from dotenv import load_dotenv
+from zeep.helpers import serialize_object
+
+load_dotenv()
+
+# Characters LPR cameras commonly confuse, folded onto one representative
+# when looking for candidates so "B0123" finds "80I23". Plates themselves
+# are stored unfolded; folding never merges two plates.
+_LPR_CONFUSABLES = str.maketrans({"O": "0", "I": "1", "B": "8"})
+_NON_ALNUM = re.compile(r"[^A-Z0-9]")
+
+_PLATE_FIELDS = ("LicensePlate", "LicencePlate", "Plate", "PlateNr", "PlateNumber", "LPN", "LPR")
+_CARD_FIELDS = ("CardNumber", "CardNr", "CardNo", "CardID", "CardId")
+
+
+def normalize_plate(plate: str) -> str:
+    """Uppercase, separators and spaces removed: ``"ab-12 3"`` -> ``"AB123"``."""
+    return _NON_ALNUM.sub("", (plate or "").upper())
+
+
+def lpr_key(plate: str) -> str:
+    """Normalized plate with LPR look-alike characters folded (O/0, I/1, B/8)."""
+    return normalize_plate(plate).translate(_LPR_CONFUSABLES)
+
+
+def _deletes(key: str, max_distance: int) -> set:
+    """Every string obtained from ``key`` by deleting up to ``max_distance`` characters."""
+    variants = {key}
+    for distance in range(1, min(max_distance, len(key)) + 1):
+        for positions in combinations(range(len(key)), distance):
+            variants.add("".join(ch for i, ch in enumerate(key) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions)."""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+def _find_field(data, names):
+    """First value of any of ``names`` (case-insensitive) anywhere in a serialized SOAP result."""
+    lowered = {name.lower() for name in names}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key.lower() in lowered and value not in (None, ""):
+                return value
+        for value in data.values():
+            found = _find_field(value, names)
+            if found is not None:
+                return found
+    elif isinstance(data, list):
+        for item in data:
+            found = _find_field(item, names)
+            if found is not None:
+                return found
+    return None
+
+
+class PlateIndex:
+    """
+    In-memory plate -> ticket index with tolerant matching for LPR misreads.
+
+    Entries are stored under their normalized plate (``normalize_plate``),
+    so two different plates never share an entry. For tolerant lookups
+    every plate is also registered in a symmetric-delete index: its LPR key
+    (``lpr_key``, look-alike characters folded) with up to ``max_distance``
+    characters deleted. A lookup only generates the deletes of the query's
+    LPR key, so it touches a handful of buckets instead of scanning every
+    plate. Entries expire after ``ttl_seconds`` and the least recently
+    updated are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_distance: int = 1):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self._entries = OrderedDict()   # normalized plate -> entry
+        self._deletes = {}              # delete variant of an lpr key -> set of normalized plates
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _expired(self, entry, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - entry["updated_at"] > self.ttl_seconds
+
+    def _remove(self, plate: str):
+        self._entries.pop(plate, None)
+        for variant in _deletes(lpr_key(plate), self.max_distance):
+            plates = self._deletes.get(variant)
+            if plates is not None:
+                plates.discard(plate)
+                if not plates:
+                    del self._deletes[variant]
+
+    def add(self, plate: str, card_number: str = None, carrier_nr: str = None):
+        plate = normalize_plate(plate)
+        if not plate or not (card_number or carrier_nr):
+            return
+        with self._lock:
+            entry = self._entries.pop(plate, None)
+            if entry is None:
+                for variant in _deletes(lpr_key(plate), self.max_distance):
+                    self._deletes.setdefault(variant, set()).add(plate)
+                entry = {"plate": plate, "card_number": None, "carrier_nr": None}
+            if card_number:
+                entry["card_number"] = str(card_number)
+            if carrier_nr:
+                entry["carrier_nr"] = str(carrier_nr)
+            entry["updated_at"] = time.time()
+            self._entries[plate] = entry
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def record_carrier_result(self, carrier_nr: str, result):
+        """Indexes the plate / card found in a getCardByCarrier answer, if any."""
+        data = serialize_object(result)
+        plate = _find_field(data, _PLATE_FIELDS)
+        if plate:
+            self.add(str(plate), card_number=_find_field(data, _CARD_FIELDS), carrier_nr=carrier_nr)
+
+    def lookup(self, plate: str) -> list:
+        """
+        Matches for ``plate``, best first, as dicts with ``exact`` and
+        ``distance`` added. ``exact`` is only true for the indexed plate
+        itself; ``distance`` is the edit distance after folding look-alike
+        characters (0 for a look-alike-only difference).
+        """
+        plate = normalize_plate(plate)
+        key = lpr_key(plate)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for variant in _deletes(key, self.max_distance):
+                candidates |= self._deletes.get(variant, set())
+            matches = []
+            for candidate in candidates:
+                entry = self._entries[candidate]
+                if self._expired(entry, now):
+                    continue
+                distance = edit_distance(key, lpr_key(candidate))
+                if distance <= self.max_distance:
+                    matches.append(dict(entry, exact=candidate == plate, distance=distance))
+
+            if any(m["exact"] for m in matches):
+                self.exact_hits += 1
+            elif matches:
+                self.fuzzy_hits += 1
+            else:
+                self.misses += 1
+        return sorted(matches, key=lambda m: (not m["exact"], m["distance"], -m["updated_at"]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "delete_variants": len(self._deletes),
+                "max_distance": self.max_distance,
+                "lookups": self.lookups,
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+            }
+
+
+plate_index = PlateIndex(
+    max_entries=int(os.getenv("PLATE_INDEX_MAX_ENTRIES", "100000")),
+    ttl_seconds=float(os.getenv("PLATE_INDEX_TTL_SECONDS", "86400")),
+    max_distance=int(os.getenv("PLATE_INDEX_MAX_EDIT_DISTANCE", "1")),
+)
@@ -0,0 +1,126 @@
+# app/pm_store.py
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from app.cache import TTLCache
+
+load_dotenv()
+
+logger = logging.getLogger("app.pm_store")
+
+_MISSING = object()
+
+
+def credentials_hash(user, pwd) -> str:
+    """Cache key part for a Designa user / password pair (never stored in clear)."""
+    return hashlib.sha256(f"{user or ''}\0{pwd or ''}".encode("utf-8")).hexdigest()
+
+
+class PMStringStore:
+    """
+    Persistent (short card number, credentials) -> PM string mapping.
+
+    An issued card's PM string never changes, so resolved mappings are kept
+    in a SQLite file shared by every gunicorn worker on the host (WAL mode,
+    so readers never block the writer) and survive restarts. An in-process
+    LRU sits in front so repeat lookups do not touch the file at all.
+    Entries are keyed by a hash of the caller's credentials as well, so a
+    mapping is only returned to callers Designa already accepted for it.
+
+    The store is a cache: any SQLite error is logged and treated as a miss,
+    and callers fall back to SOAP. The file is opened on first use;
+    ``path=""`` keeps only the LRU.
+    """
+
+    def __init__(self, path: str, lru_size: int):
+        self.path = path
+        self._lru = TTLCache(max_size=lru_size)
+        self._local = threading.local()
+        self.store_hits = 0
+        self.store_misses = 0
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS caller_pm_strings ("
+                " short_card_nr TEXT NOT NULL,"
+                " credentials TEXT NOT NULL,"
+                " pm_string TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (short_card_nr, credentials)"
+                ")"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, short_card_nr: str, credentials: str, default=None):
+        """``credentials`` is credentials_hash() of the caller's Designa user / password."""
+        value = self._lru.get((short_card_nr, credentials), _MISSING)
+        if value is not _MISSING:
+            return value
+        if not self.path:
+            return default
+        try:
+            row = self._connection().execute(
+                "SELECT pm_string FROM caller_pm_strings WHERE short_card_nr = ? AND credentials = ?",
+                (short_card_nr, credentials),
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            self.errors += 1
+            logger.error("PM string store read failed for %s: %s", short_card_nr, e, extra={"ShortCardNr": short_card_nr})
+            return default
+        if row is None:
+            self.store_misses += 1
+            return default
+        self.store_hits += 1
+        value = json.loads(row[0])
+        self._lru.set((short_card_nr, credentials), value)
+        return value
+
+    def put(self, short_card_nr: str, credentials: str, pm_string):
+        # Designa reports some failures as a plain string; never make those permanent
+        if isinstance(pm_string, str) and "error" in pm_string.lower():
+            return
+        self._lru.set((short_card_nr, credentials), pm_string)
+        if not self.path:
+            return
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO caller_pm_strings (short_card_nr, credentials, pm_string, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                (short_card_nr, credentials, json.dumps(pm_string, default=str), time.time()),
+            )
+        except (sqlite3.Error, OSError) as e:
+            self.errors += 1
+            logger.error("PM string store write failed for %s: %s", short_card_nr, e, extra={"ShortCardNr": short_card_nr})
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "lru": self._lru.stats(),
+            "store_hits": self.store_hits,
+            "store_misses": self.store_misses,
+            "errors": self.errors,
+        }
+
+
+pm_store = PMStringStore(
+    path=os.getenv("PM_STORE_PATH", ".pm_store/pm_strings.sqlite3"),
+    lru_size=int(os.getenv("PM_STORE_LRU_SIZE", "10000")),
+)
@@ -0,0 +1,73 @@
+# app/responses.py
+import decimal
+import enum
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from zeep.helpers import serialize_object
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value):
+    """Types orjson does not know natively, encoded the way jsonable_encoder would."""
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    serialized = serialize_object(value)
+    if serialized is not value:
+        # zeep CompoundValue / list of them
+        return serialized
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class of the gateway: orjson instead of the stdlib
+    encoder. Also accepts raw SOAP-derived payloads (Decimal, datetime,
+    zeep objects) so trusted routes can return them without a
+    jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+def trusted_json(content: Any, status_code: int = 200, headers: dict = None) -> FastJSONResponse:
+    """
+    Response for payloads built from SOAP results the gateway already
+    trusts. Returning a Response skips FastAPI's response_model validation
+    and jsonable_encoder walk; orjson encodes the payload in one pass.
+    """
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
+
+
+# One TypeAdapter (validator + serializer) per response model, built on first use
+_adapters: dict = {}
+
+
+def _adapter(model) -> TypeAdapter:
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters.setdefault(model, TypeAdapter(model))
+    return adapter
+
+
+def model_json(model, content: Any, status_code: int = 200, exclude_none: bool = False, headers: dict = None):
+    """
+    Validates ``content`` against ``model`` and serializes it in pydantic-core
+    (no jsonable_encoder pass). Keep ``response_model=model`` on the route
+    for the OpenAPI schema.
+    """
+    adapter = _adapter(model)
+    body = adapter.dump_json(adapter.validate_python(content), exclude_none=exclude_none)
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import Response
 from pydantic import BaseModel
 from app.auth.jwt_bearer import JWTBearer
-from app.Soap import get_customer
+from app.Soap import cached_customer_etag, get_customer_with_etag
+from app.bulkheads import SERVICE_OPERATION, run_in_bulkhead
+from app.responses import trusted_json
 
 router = APIRouter(prefix="/customers", tags=["customers"],dependencies=[Depends(JWTBearer())])
 
@@ -10,10 +15,31 @@ class CustomerRequest(BaseModel):
     pwd: str
     personId: int
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
 @router.post("/api/getCustomer")
-def get_customer_info(req: CustomerRequest):
+async def get_customer_info(req: CustomerRequest, if_none_match: Optional[str] = Header(None)):
+    """
+    Customer master data, served from a TTL cache with an ETag.
+    A matching If-None-Match gets 304 Not Modified, without an upstream
+    call when the record is still cached.
+    """
+    cached_etag = cached_customer_etag(req.user, req.pwd, req.personId)
+    if cached_etag is not None and _etag_matches(if_none_match, cached_etag):
+        return Response(status_code=304, headers={"ETag": cached_etag})
     try:
-        result = get_customer(req.user, req.pwd, req.personId)
-        return result
+        result, etag = await run_in_bulkhead(
+            SERVICE_OPERATION, get_customer_with_etag, req.user, req.pwd, req.personId
+        )
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return trusted_json(result, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,14 +1,19 @@
 
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from app.auth.jwt_bearer import JWTBearer
-from app.services.Hit_Services import send_hit_purchase_request, send_hit_refund_request, send_hit_unmatched_refund_request, send_hit_reversal_request, send_hit_status_request, send_hit_receipt_request, send_hit_enterdata_request, send_hit_generic_request, send_hit_ui_button_request
+from app.bulkheads import hit_bulkhead_slot
+from app.responses import trusted_json
+from app.services.Hit_Services import send_hit_purchase_request, send_hit_refund_request, send_hit_unmatched_refund_request, send_hit_reversal_request, send_hit_receipt_request, send_hit_enterdata_request, send_hit_generic_request, send_hit_ui_button_request
+from app.services.hit_transactions import PENDING, PURCHASE, REFUND, UNMATCHED_REFUND, hit_engine
 
 router = APIRouter(
     prefix="/hit",
     tags=["Windcave HIT"],
-    dependencies=[Depends(JWTBearer())]
+    dependencies=[Depends(JWTBearer()), Depends(hit_bulkhead_slot)]
 )
 
 class PurchaseRequest(BaseModel):
@@ -164,8 +169,10 @@ async def do_purchase(request: PurchaseRequest):
         result = await send_hit_purchase_request(request.dict())
         return {
             "status": "success",
-            "windcave": result   # JSON parsed from XML
+            "windcave": result.to_dict()   # JSON parsed from XML
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -177,8 +184,10 @@ async def do_refund(request: RefundRequest):
         result = await send_hit_refund_request(request.dict())
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -190,8 +199,10 @@ async def do_unmatched_refund(request: UnmatchedRefundRequest):
         result = await send_hit_unmatched_refund_request(request.dict())
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -203,8 +214,10 @@ async def do_reversal(request: ReversalRequest):
         result = await send_hit_reversal_request(request.dict())
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -212,12 +225,19 @@ async def do_reversal(request: ReversalRequest):
 
 @router.post("/status")
 async def check_status(request: StatusRequest):
+    """
+    Windcave Status for a transaction. Transactions started through
+    /hit/transactions are answered from their background poller; concurrent
+    checks of the same transaction share one upstream call.
+    """
     try:
-        result = await send_hit_status_request(request.dict())
+        result = await hit_engine.status(request.dict())
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -228,8 +248,10 @@ async def get_receipt(request: ReceiptRequest):
         result = await send_hit_receipt_request(request.dict())
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -240,8 +262,10 @@ async def receipt_print(req: ReceiptPrintRequest):
         result = await send_hit_receipt_request(req.dict(), action="Print")
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -253,8 +277,10 @@ async def enter_data(req: EnterDataRequest):
         result = await send_hit_enterdata_request(req.dict())
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -268,8 +294,10 @@ async def pinpad_display(request: PinpadDisplayRequest):
         )
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -282,8 +310,10 @@ async def read_card(request: ReadCardRequest):
         )
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -297,8 +327,10 @@ async def settlement_summary(request: SettlementSummaryRequest):
         )
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -312,8 +344,10 @@ async def ping(request: PingRequest):
         )
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -324,8 +358,10 @@ async def ui_button_press(request: UIButtonRequest):
         result = await send_hit_ui_button_request(request.dict())
         return {
             "status": "success",
-            "windcave": result
+            "windcave": result.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -333,3 +369,93 @@ async def ui_button_press(request: UIButtonRequest):
 # async def send_ui_button(req: UIButtonRequest):
 #     result = await send_hit_ui_button_request(req.dict())
 #     return {"status": "success", "windcave": result}
+
+
+# ---------------------------------------------------------------------
+# Background transactions: start returns at once, the gateway polls Status
+# ---------------------------------------------------------------------
+# No bulkhead dependency on the router: long-polls and event streams only
+# wait on the engine. Only the start calls go upstream.
+transactions_router = APIRouter(
+    prefix="/hit/transactions",
+    tags=["Windcave HIT"],
+    dependencies=[Depends(JWTBearer())]
+)
+
+
+def _accepted(transaction):
+    path = f"/hit/transactions/{quote(transaction.txn_ref, safe='')}"
+    query = f"?station={quote(transaction.station, safe='')}"
+    return trusted_json(
+        {
+            "status": "accepted" if transaction.state == PENDING else "success",
+            "transaction": transaction.snapshot(),
+            # Both need the X-HIT-User / X-HIT-Key headers the transaction was started with
+            "links": {"self": f"{path}{query}", "events": f"{path}/events{query}"},
+        },
+        status_code=202 if transaction.state == PENDING else 200,
+    )
+
+
+async def _start(txn_type: str, data: dict):
+    try:
+        return _accepted(await hit_engine.start(txn_type, data))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@transactions_router.post("/purchase", status_code=202, dependencies=[Depends(hit_bulkhead_slot)])
+async def start_purchase(request: PurchaseRequest):
+    """
+    Starts a Purchase and returns a handle at once (202). Follow it with
+    GET /hit/transactions/{txnRef}?station=...&wait=N or its /events stream,
+    from any worker, sending the same HIT credentials as X-HIT-User / X-HIT-Key.
+    """
+    return await _start(PURCHASE, request.dict())
+
+
+@transactions_router.post("/refund", status_code=202, dependencies=[Depends(hit_bulkhead_slot)])
+async def start_refund(request: RefundRequest):
+    return await _start(REFUND, request.dict())
+
+
+@transactions_router.post("/refund/unmatched", status_code=202, dependencies=[Depends(hit_bulkhead_slot)])
+async def start_unmatched_refund(request: UnmatchedRefundRequest):
+    return await _start(UNMATCHED_REFUND, request.dict())
+
+
+def _follower(
+    txn_ref: str,
+    station: str = Query(..., description="Station the transaction was started on"),
+    user: str = Header(..., alias="X-HIT-User"),
+    key: str = Header(..., alias="X-HIT-Key"),
+) -> dict:
+    """The HIT credentials the transaction was started with; a worker that does not track it uses them for a Status call."""
+    return {"user": user, "key": key, "station": station, "txnRef": txn_ref}
+
+
+@transactions_router.get("/{txn_ref}")
+async def get_transaction(data: dict = Depends(_follower), wait: float = Query(0, ge=0, le=60)):
+    """
+    Current state of a background transaction. With ``wait`` > 0 this is a
+    long-poll: it answers as soon as the transaction completes, or after
+    ``wait`` seconds with the state still ``pending``.
+    """
+    transaction = await hit_engine.wait(await hit_engine.follow(data), wait)
+    return trusted_json({"status": "success", "transaction": transaction.snapshot()})
+
+
+@transactions_router.get("/{txn_ref}/events")
+async def stream_transaction(data: dict = Depends(_follower)):
+    """
+    Server-Sent Events for one transaction: the current state on connect,
+    then every change; the stream ends once the transaction completes.
+    """
+    transaction = await hit_engine.follow(data)
+    return StreamingResponse(
+        hit_engine.events(transaction),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
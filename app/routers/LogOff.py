@@ -9,6 +9,8 @@ from app.auth.jwt_bearer import JWTBearer
 from app.Soap import logoff  # the SOAP function we defined earlier
 from app.config import settings
 from app.auth.token_blacklist import blacklist_token
+from app.bulkheads import CASHPOINT, run_in_bulkhead
+from app.sessions import session_manager
 router = APIRouter(prefix="", tags=["LogOff"],dependencies=[Depends(JWTBearer())])
 # -----------------------------
 # Request/Response Models
@@ -25,7 +27,7 @@ class LogOffResponse(BaseModel):
 # LogOff Endpoint
 # -----------------------------
 @router.post("/logoff", response_model=LogOffResponse)
-def logoff_rest(req: LogOffRequest, authorization: str = Header(None)):
+async def logoff_rest(req: LogOffRequest, authorization: str = Header(None)):
     """
     Logs off a DESIGNA session for the given TCC number and optional user ID.
     Calls the logOff SOAP method.
@@ -41,11 +43,17 @@ def logoff_rest(req: LogOffRequest, authorization: str = Header(None)):
             )
 
         # ✅ 2. Call SOAP logOff
-        result = logoff(
+        result = await run_in_bulkhead(
+            CASHPOINT,
+            logoff,
             tcc_num=req.tcc_num
             
         )
 
+        if result:
+            # The upstream session is gone; the next login starts a new one
+            session_manager.drop(req.tcc_num)
+
         if authorization:
             token = authorization.replace("Bearer ", "")
             blacklist_token(token)
@@ -61,5 +69,5 @@ def logoff_rest(req: LogOffRequest, authorization: str = Header(None)):
     except HTTPException:
         raise  # rethrow HTTPException directly
     except Exception as e:
-        logging.error(f"Error occurred during logOff: {e}\n{traceback.format_exc()}")
+        logging.error("Error occurred during logOff: %s\n%s", e, traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
@@ -8,6 +8,8 @@ import traceback
 from app.Soap import login
 from app.auth.jwt_handler import create_access_token
 from app.config import settings
+from app.bulkheads import CASHPOINT, run_in_bulkhead
+from app.sessions import session_manager
 router = APIRouter(prefix="", tags=["Login"])
 class LoginRequest(BaseModel):
     tcc_num: int
@@ -21,7 +23,7 @@ class LoginResponse(BaseModel):
 
 
 @router.post("/login", response_model=LoginResponse)
-def login_rest(req: LoginRequest):
+async def login_rest(req: LoginRequest):
     """
     Login to DESIGNA system using provided TCC number, user ID, and password.
     Validates TCC number and calls the login SOAP method.
@@ -39,12 +41,20 @@ def login_rest(req: LoginRequest):
                 status_code=400,
                 detail=f"TCC {req.tcc_num} is not authorized."
             )
-        # ✅ 2. Call SOAP login
-        result_code = login(
-            tcc_num=req.tcc_num,
-            user_id=req.user_id or settings.DESIGNA_USER,
-            password=req.password or settings.DESIGNA_PASSWORD,
-        )
+        # ✅ 2. Reuse the shared TCC session for the gateway credentials;
+        #       other credentials still get their own SOAP login
+        user_id = req.user_id or settings.DESIGNA_USER
+        password = req.password or settings.DESIGNA_PASSWORD
+        if user_id == settings.DESIGNA_USER and password == settings.DESIGNA_PASSWORD:
+            result_code = await run_in_bulkhead(CASHPOINT, session_manager.ensure, req.tcc_num)
+        else:
+            result_code = await run_in_bulkhead(
+                CASHPOINT,
+                login,
+                tcc_num=req.tcc_num,
+                user_id=user_id,
+                password=password,
+            )
 
         # ✅ 3. Handle response
         if result_code == 0:
@@ -63,11 +73,11 @@ def login_rest(req: LoginRequest):
     except HTTPException:
         raise  # rethrow HTTPException directly
     except Exception as e:
-        logging.error(f"Error occurred during login: {e}\n{traceback.format_exc()}")
+        logging.error("Error occurred during login: %s\n%s", e, traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
 
 # @app.post("/login", response_model=LoginResponse)
-# def login_rest(req: LoginRequest):
+# async def login_rest(req: LoginRequest):
 #     """
 #     Login to DESIGNA system using provided TCC number, user ID, and password.
 #     Calls the login SOAP method.
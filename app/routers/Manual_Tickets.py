@@ -1,14 +1,28 @@
 
 
 # app/routers/manual_tickets.py
+import asyncio
+import json
+import logging
+import os
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
 from app.auth.jwt_bearer import JWTBearer
-from app.Soap import calc_tariff, set_card_settlement
+from app.Soap import calc_tariff_async, flush_tariff_cache, set_card_settlement_async, shadow_check_async
+from app.tariff_engine import get_tariff_engine, reload_tariff_engine
+
+logger = logging.getLogger("app.manual_tickets")
 
 router = APIRouter(prefix="/manual-tickets", tags=["Manual Tickets"],dependencies=[Depends(JWTBearer())])
 
+# Batch quotes: how many calcTariff calls run at once, and the largest accepted batch
+QUOTE_CONCURRENCY = int(os.getenv("MANUAL_QUOTE_CONCURRENCY", "10"))
+QUOTE_MAX_ITEMS = int(os.getenv("MANUAL_QUOTE_MAX_ITEMS", "1000"))
+
 # ----------------------------
 # Request Models
 # ----------------------------
@@ -21,6 +35,7 @@ class ManualTicketRequest(BaseModel):
 
 class ManualSettlementRequest(BaseModel):
     amount_paid: float
+    quote: Optional[str] = None  # signed quote from GET /tickets/{card_number}
 
 # ----------------------------
 # Endpoints
@@ -33,7 +48,7 @@ async def create_manual_ticket(request: ManualTicketRequest):
     Calls calcTariff SOAP to create manual ticket.
     """
     try:
-        result = calc_tariff(
+        result = await calc_tariff_async(
             carpark_nr=request.carpark_nr,
             card_type=request.card_type,
             tariff_id=request.tariff_id,
@@ -41,9 +56,110 @@ async def create_manual_ticket(request: ManualTicketRequest):
             time_exit=request.time_exit,
         )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch quotes (e.g. lost-ticket reconciliation after an outage)
+def _mixed_timezones(item: ManualTicketRequest) -> bool:
+    # A naive and an aware datetime cannot be subtracted
+    return (item.time_entry.tzinfo is None) != (item.time_exit.tzinfo is None)
+
+
+async def _quote_one(index: int, item: ManualTicketRequest, limiter: asyncio.Semaphore,
+                     engine=None, local: dict = None) -> dict:
+    if _mixed_timezones(item):
+        return {
+            "index": index, "status": "error", "status_code": 400,
+            "detail": "time_entry and time_exit must both have a UTC offset or both have none.",
+        }
+    async with limiter:
+        try:
+            if local is not None:
+                # Priced in the batch's vectorized pass; only the sampled shadow check goes to SOAP
+                result = await shadow_check_async(
+                    engine, local, item.carpark_nr, item.card_type, item.tariff_id, item.time_entry, item.time_exit,
+                )
+            else:
+                result = await calc_tariff_async(
+                    carpark_nr=item.carpark_nr,
+                    card_type=item.card_type,
+                    tariff_id=item.tariff_id,
+                    time_entry=item.time_entry,
+                    time_exit=item.time_exit,
+                )
+            return {"index": index, "status": "ok", "result": jsonable_encoder(result)}
+        except HTTPException as e:
+            return {"index": index, "status": "error", "status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            return {"index": index, "status": "error", "status_code": 500, "detail": str(e)}
+
+
+@router.post("/quotes")
+async def create_manual_ticket_quotes(requests: List[ManualTicketRequest], stream: bool = False):
+    """
+    Prices many stays at once. Stays on locally configured tariffs are
+    priced together, one vectorized pass per tariff (TariffEngine.quote_many);
+    the rest go to calcTariff with a bounded number of concurrent calls.
+
+    Returns ``{"results": [...]}`` in input order, one entry per item with
+    either ``result`` or an error ``detail``. With ``?stream=true`` the
+    entries are sent as NDJSON lines as soon as each one completes (use
+    ``index`` to place them).
+    """
+    if len(requests) > QUOTE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many quotes in one request ({len(requests)} > {QUOTE_MAX_ITEMS})."
+        )
+
+    engine = get_tariff_engine()
+    local = {}
+    if engine is not None:
+        priceable = [i for i, item in enumerate(requests) if not _mixed_timezones(item)]
+        try:
+            quotes = engine.quote_many([
+                (item.carpark_nr, item.card_type, item.tariff_id, item.time_entry, item.time_exit)
+                for item in (requests[i] for i in priceable)
+            ])
+        except Exception as e:
+            # Price item by item instead; a bad item then fails on its own
+            logger.warning("Vectorized tariff pricing failed, quoting items one by one: %s", e)
+        else:
+            local = {priceable[position]: quote for position, quote in quotes.items()}
+
+    limiter = asyncio.Semaphore(QUOTE_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(_quote_one(i, item, limiter, engine, local.get(i)))
+        for i, item in enumerate(requests)
+    ]
+
+    if not stream:
+        return {"results": await asyncio.gather(*tasks)}
+
+    async def ndjson_lines():
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield json.dumps(await completed) + "\n"
+        finally:
+            # Client went away: stop pricing the rest
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+# Tariff change: drop memoized calcTariff quotes and reload local tables
+@router.post("/tariff-cache/flush", response_model=dict)
+async def flush_tariff_quotes():
+    """
+    Clears the calcTariff quote cache and re-reads the local tariff table
+    after tariffs are changed in DESIGNA.
+    """
+    flush_tariff_cache()
+    reload_tariff_engine()
+    return {"message": "Tariff quote cache flushed."}
+
 # Manual ticket payment
 # @router.post("/{card_number}/settlements", response_model=dict)
 # async def manual_ticket_settlement(card_number: str, tcc_num: int, request: ManualSettlementRequest):
@@ -64,7 +180,7 @@ async def manual_ticket_settlement(card_number: str, tcc_num: int, request: Manu
     Settle manual ticket via setCardSettlement with due check.
     """
     try:
-        result = set_card_settlement(tcc_num, card_number, request.amount_paid)
+        result = await set_card_settlement_async(tcc_num, card_number, request.amount_paid, request.quote)
         return result
 
     except ValueError as ve:
@@ -73,5 +189,7 @@ async def manual_ticket_settlement(card_number: str, tcc_num: int, request: Manu
     except RuntimeError as re:
         raise HTTPException(status_code=502, detail=str(re))
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
\ No newline at end of file
@@ -0,0 +1,117 @@
+# app/routers/Metrics.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from app.auth.jwt_bearer import JWTBearer
+from app.auth.quote_token import quote_ledger
+from app.bulkheads import bulkhead_stats
+from app.circuit_breaker import breaker_stats
+from app.device_monitor import device_monitor
+from app.hedging import hedging_stats
+from app.logging_pipeline import logging_stats, recent_payloads
+from app.plate_index import plate_index
+from app.pm_store import pm_store
+from app.Soap import amount_due_cache_stats, customer_cache_stats, tariff_cache_stats
+from app.singleflight import coalescing_stats
+from app.tariff_engine import get_tariff_engine
+from app.services.hit_transactions import hit_engine
+from app.sessions import session_manager
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(JWTBearer())])
+
+
+@router.get("/bulkheads")
+def get_bulkhead_metrics():
+    """
+    Queue depth and active-thread counts of each upstream bulkhead.
+    """
+    return {"bulkheads": bulkhead_stats()}
+
+
+@router.get("/caches")
+def get_cache_metrics():
+    """
+    Size and hit/miss counters of the in-process response caches.
+    """
+    return {
+        "amount_due": amount_due_cache_stats(),
+        "calc_tariff": tariff_cache_stats(),
+        "customers": customer_cache_stats(),
+        "pm_strings": pm_store.stats(),
+        "quotes": quote_ledger.stats(),
+    }
+
+
+@router.get("/coalescing")
+def get_coalescing_metrics():
+    """
+    Per-operation counts of upstream SOAP calls saved by request coalescing.
+    """
+    return {"coalescing": coalescing_stats()}
+
+
+@router.get("/tariff-engine")
+def get_tariff_engine_metrics():
+    """
+    Local tariff engine usage and shadow-verification mismatch counts.
+    """
+    engine = get_tariff_engine()
+    return {"tariff_engine": engine.stats() if engine else None}
+
+
+@router.get("/sessions")
+def get_session_metrics():
+    """
+    Designa TCC sessions held by this worker and time until their refresh.
+    """
+    return {"designa_sessions": session_manager.stats()}
+
+
+@router.get("/breakers")
+def get_breaker_metrics():
+    """
+    Circuit breaker state and recent failure / slow-call counts per DESIGNA backend.
+    """
+    return {"breakers": breaker_stats()}
+
+
+@router.get("/hedging")
+def get_hedging_metrics():
+    """
+    Hedges, hedge wins and retries per read operation, and the shared retry budget.
+    """
+    return {"hedging": hedging_stats()}
+
+
+@router.get("/device-poller")
+def get_device_poller_metrics():
+    """
+    Device state / counter poller health and number of stream subscribers.
+    """
+    return {"device_poller": device_monitor.stats()}
+
+
+@router.get("/plate-index")
+def get_plate_index_metrics():
+    """
+    Size of the local plate index and its exact / fuzzy hit counts.
+    """
+    return {"plate_index": plate_index.stats()}
+
+
+@router.get("/payloads")
+def get_recent_payloads(limit: int = Query(50, ge=1, le=1000), logger: Optional[str] = None):
+    """
+    Dumps the most recent full SOAP / HIT payloads kept in memory (newest
+    first), e.g. ``?logger=app.hit``. Credentials in HIT bodies are masked.
+    """
+    return {"logging": logging_stats(), "payloads": recent_payloads(limit, logger)}
+
+
+@router.get("/hit-transactions")
+def get_hit_transaction_metrics():
+    """
+    Background HIT transactions: pending / completed counts, Status polls
+    and /hit/status reads answered from the pollers.
+    """
+    return {"hit_transactions": hit_engine.stats()}
@@ -1,38 +1,115 @@
 
 # app/routers/ops.py
-from fastapi import APIRouter, Depends, HTTPException
+import time
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.auth.jwt_bearer import JWTBearer
-from app.Soap import get_soap_client
+from app.Soap import get_soap_service
+from app.bulkheads import SERVICE_OPERATION, run_in_bulkhead
 from app.config import settings
+from app.device_monitor import COUNTERS, STATE, device_monitor
+from app.occupancy import occupancy_history
+from app.responses import trusted_json
 
 router = APIRouter(prefix="/devices", tags=["Operations"],dependencies=[Depends(JWTBearer())])
 
+
+def _service_operation_state():
+    service = get_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+    return service.getServiceOperationState()
+
+
+def _car_park_counters():
+    service = get_soap_service("DESIGNA_WSDL_SERVICE_OPERATION_URL")
+    return service.getCarParkCounterExt()
+
 # -----------------------------
 # Ops Endpoints
 # -----------------------------
 @router.get("/state")
-def get_devices_state():
+async def get_devices_state():
     """
-    Calls DESIGNA SOAP getServiceOperationState.
+    Latest getServiceOperationState snapshot from the background poller;
+    calls DESIGNA directly when polling is off or the snapshot is stale.
     """
+    snapshot = device_monitor.snapshot(STATE)
+    if snapshot is not None:
+        data, as_of = snapshot
+        return trusted_json({"state": data, "as_of": as_of})
     try:
-        client = get_soap_client("DESIGNA_WSDL_SERVICE_OPERATION_URL")
-        response = client.service.getServiceOperationState()
-        return {"state": response}
+        response = await run_in_bulkhead(SERVICE_OPERATION, _service_operation_state)
+        return trusted_json({"state": response})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/counters")
-def get_counters():
+async def get_counters():
     """
-    Calls DESIGNA SOAP getCarParkCounterExt.
+    Latest getCarParkCounterExt snapshot from the background poller;
+    calls DESIGNA directly when polling is off or the snapshot is stale.
     """
+    snapshot = device_monitor.snapshot(COUNTERS)
+    if snapshot is not None:
+        data, as_of = snapshot
+        return trusted_json({"counters": data, "as_of": as_of})
     try:
-        client = get_soap_client("DESIGNA_WSDL_SERVICE_OPERATION_URL")
-        response = client.service.getCarParkCounterExt()
-        return {"counters": response}
+        response = await run_in_bulkhead(SERVICE_OPERATION, _car_park_counters)
+        return trusted_json({"counters": response})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/counters/history")
+def list_counter_history():
+    """
+    Counter series recorded from the poller, with the number of samples held for each.
+    """
+    return {"series": occupancy_history.series_keys()}
+
+
+@router.get("/counters/history/query")
+def query_counter_history(
+    series: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(500, ge=1, le=10000),
+    step_seconds: Optional[int] = Query(None, ge=1),
+):
+    """
+    Min / max / mean of one counter series per time bucket, as parallel arrays
+    (``t`` is the bucket start in epoch seconds). The window defaults to the
+    last 24 h; the bucket size is ``step_seconds`` or window / ``points``.
+    """
+    end_ts = end.timestamp() if end else time.time()
+    start_ts = start.timestamp() if start else end_ts - 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    result = occupancy_history.query(series, start_ts, end_ts, points=points, step_seconds=step_seconds)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No history for counter series '{series}'")
+    return trusted_json({"series": series, "start": start_ts, "end": end_ts, **result})
+
+
+@router.get("/stream")
+async def stream_devices():
+    """
+    Server-Sent Events stream of device state and car park counters.
+
+    Sends the full current snapshot of each on connect (``full: true``),
+    then only the rows that changed between polls.
+    """
+    if not device_monitor.running:
+        raise HTTPException(status_code=503, detail="Device polling is disabled (DEVICE_POLL_INTERVAL_SECONDS=0)")
+    return StreamingResponse(
+        device_monitor.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
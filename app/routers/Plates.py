@@ -1,9 +1,13 @@
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends, FastAPI, HTTPException
 from pydantic import BaseModel
 
 from app.auth.jwt_bearer import JWTBearer
 from app.Soap import get_card_by_carrier
+from app.bulkheads import SERVICE_OPERATION, run_in_bulkhead
+from app.plate_index import plate_index
 
 # app = FastAPI(title="DESIGNA REST Wrapper")
 
@@ -20,10 +24,15 @@ class CardCarrierRequest(BaseModel):
     pwd: str
     cardCarrierNr: str
 
+class PlateIndexEntry(BaseModel):
+    plate: str
+    card_number: Optional[str] = None
+    carrier_nr: Optional[str] = None
+
 @router.post("/api/getCardByCarrier")
-def get_card_info(req: CardCarrierRequest):
+async def get_card_info(req: CardCarrierRequest):
     try:
-        result = get_card_by_carrier(req.user, req.pwd, req.cardCarrierNr)
+        result = await run_in_bulkhead(SERVICE_OPERATION, get_card_by_carrier, req.user, req.pwd, req.cardCarrierNr)
 
         # Convert SOAP object to dict for JSON output
         if hasattr(result, "__dict__"):
@@ -33,5 +42,28 @@ def get_card_info(req: CardCarrierRequest):
 
         return result_dict
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search")
+def search_plate(plate: str):
+    """
+    Looks a plate up in the local plate index, tolerating common LPR misreads
+    (O/0, I/1, B/8 and one dropped, extra, swapped or wrong character).
+    No SOAP call is made.
+    """
+    return {"plate": plate, "matches": plate_index.lookup(plate)}
+
+
+@router.post("/index")
+def index_plate(entry: PlateIndexEntry):
+    """
+    Registers a plate -> card / carrier mapping (e.g. from an LPR entry event).
+    """
+    if not entry.card_number and not entry.carrier_nr:
+        raise HTTPException(status_code=400, detail="card_number or carrier_nr is required")
+    plate_index.add(entry.plate, card_number=entry.card_number, carrier_nr=entry.carrier_nr)
+    return {"result": "indexed"}
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from app.auth.jwt_bearer import JWTBearer
 from app.Soap import get_pm_string
+from app.bulkheads import SERVICE_OPERATION, run_in_bulkhead
 
 router = APIRouter(
     prefix="/service",
@@ -16,12 +17,14 @@ class PMStringRequest(BaseModel):
     shortCardNr: str
 
 @router.post("/api/getPMString")
-def fetch_pm_string(req: PMStringRequest):
+async def fetch_pm_string(req: PMStringRequest):
     """
     Fetch PM string from DESIGNA SOAP API.
     """
     try:
-        result = get_pm_string(req.user, req.pwd, req.shortCardNr)
+        result = await run_in_bulkhead(SERVICE_OPERATION, get_pm_string, req.user, req.pwd, req.shortCardNr)
         return {"pmString": result}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
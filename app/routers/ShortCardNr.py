@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from app.auth.jwt_bearer import JWTBearer
 from app.Soap import get_Short_Card_Nr
+from app.bulkheads import SERVICE_OPERATION, run_in_bulkhead
 
 router = APIRouter(
     prefix="/service",
@@ -14,12 +15,14 @@ class ShortCardNrRequest(BaseModel):
     shortCardNr: str
 
 @router.post("/api/shortcardnr")
-def fetch_shortcard_nr(req: ShortCardNrRequest):
+async def fetch_shortcard_nr(req: ShortCardNrRequest):
     """
     Fetch short card number from DESIGNA SOAP API.
     """
     try:
-        result = get_Short_Card_Nr(req.shortCardNr)
+        result = await run_in_bulkhead(SERVICE_OPERATION, get_Short_Card_Nr, req.shortCardNr)
         return {"shortCardNr": result}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
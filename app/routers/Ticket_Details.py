@@ -5,6 +5,8 @@ from pydantic import BaseModel
 from app.config import settings        # import your settings
 from app.Soap import get_card_info   # your SOAP helper
 from app.auth.jwt_bearer import JWTBearer
+from app.bulkheads import CASHPOINT, run_in_bulkhead
+from app.responses import trusted_json
 
 router = APIRouter(
     prefix="/service",
@@ -17,14 +19,18 @@ class CardInfoRequest(BaseModel):
     CardNumber: str
 
 @router.post("/api/cardinfo")
-def fetch_shortcard_nr(req: CardInfoRequest):
+async def fetch_shortcard_nr(req: CardInfoRequest):
     try:
-        result = get_card_info(
+        result = await run_in_bulkhead(
+            CASHPOINT,
+            get_card_info,
             # user_id=settings.DESIGNA_USER,
             # user_pwd=settings.DESIGNA_PASSWORD,
             tcc_num=req.TccNum,
             card_number=req.CardNumber
         )
-        return {"cardInfo": result}
+        return trusted_json({"cardInfo": result})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,20 +1,31 @@
 
 # app/routers/tickets.py
+import asyncio
 import os
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from app.auth.jwt_bearer import JWTBearer
-from app.Soap import get_amount_due, set_rebate, set_card_settlement, set_cleared
+from app.auth.quote_token import create_quote
+from app.plate_index import plate_index
+from app.responses import model_json
+from app.Soap import get_amount_due_async, read_amount_due_async, set_rebate_async, set_card_settlement_async, set_cleared_async
 
 router = APIRouter(prefix="/tickets", tags=["Tickets"],dependencies=[Depends(JWTBearer())])
 
+# Bulk lookup: concurrent getAmountDue calls per request, and the largest accepted list
+BULK_AMOUNT_DUE_CONCURRENCY = int(os.getenv("BULK_AMOUNT_DUE_CONCURRENCY", "20"))
+BULK_AMOUNT_DUE_MAX_CARDS = int(os.getenv("BULK_AMOUNT_DUE_MAX_CARDS", "1000"))
+
 # ----------------------------
 # Response Models
 # ----------------------------
 class AmountDueResponse(BaseModel):
     card_number: str
     amount_due: str
+    quote: Optional[str] = None            # signed; pass back on /settlements to skip the re-check
+    quote_expires_at: Optional[int] = None
+    matched_plate: Optional[str] = None    # set by /by-plate when the index resolved the plate
 
 class RebateRequest(BaseModel):
     discount_type: int
@@ -23,6 +34,20 @@ class RebateRequest(BaseModel):
 
 class SettlementRequest(BaseModel):
     amount_paid: float
+    quote: Optional[str] = None
+
+class BulkAmountDueRequest(BaseModel):
+    tcc_num: int
+    card_numbers: List[str]
+
+class BulkAmountDueItem(BaseModel):
+    status_code: int
+    amount_due: Optional[str] = None
+    detail: Optional[str] = None
+
+class BulkAmountDueResponse(BaseModel):
+    tcc_num: int
+    results: Dict[str, BulkAmountDueItem]
 
 class GenericResponse(BaseModel):
     result: str
@@ -36,30 +61,109 @@ class GenericResponse(BaseModel):
 
 # 1️⃣ Home / Lookup
 @router.get("/{card_number}", response_model=AmountDueResponse)
-async def ticket_lookup(card_number: str, tcc_num: int = int(os.getenv("DESIGNA_TCC_ENTRY", "0"))):
+async def ticket_lookup(card_number: str, tcc_num: int = int(os.getenv("DESIGNA_TCC_ENTRY", "0")), plate: Optional[str] = None):
     """
     Lookup ticket by card_number.
     Calls getAmountDue SOAP method.
+    When the caller knows the plate, it is added to the local plate index.
     """
     try:
-        result = get_amount_due(tcc_num, card_number)
-        return {"card_number": card_number, "amount_due": str(result)}
+        # The quote carries the time of the upstream read (cached or shared), so
+        # a write since then, through any worker, revokes it
+        result, read_at = await read_amount_due_async(tcc_num, card_number)
+        if plate:
+            plate_index.add(plate, card_number=card_number)
+        quote, quote_expires_at = create_quote(card_number, tcc_num, result, read_at)
+        return model_json(AmountDueResponse, {
+            "card_number": card_number,
+            "amount_due": str(result),
+            "quote": quote,
+            "quote_expires_at": quote_expires_at,
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 1️⃣b Bulk Lookup (reconciler / lane supervisor sweeps)
+async def _lookup_one(tcc_num: int, card_number: str, limiter: asyncio.Semaphore) -> dict:
+    async with limiter:
+        try:
+            result = await get_amount_due_async(tcc_num, card_number)
+            return {"status_code": 200, "amount_due": str(result)}
+        except HTTPException as e:
+            return {"status_code": e.status_code, "detail": str(e.detail)}
+        except RuntimeError as e:
+            return {"status_code": 502, "detail": str(e)}
+        except Exception as e:
+            return {"status_code": 500, "detail": str(e)}
+
+
+@router.post("/amount-due", response_model=BulkAmountDueResponse, response_model_exclude_none=True)
+async def bulk_amount_due(request: BulkAmountDueRequest):
+    """
+    Looks up the amount due for many cards in one request.
+    Fans out getAmountDue with at most BULK_AMOUNT_DUE_CONCURRENCY calls in flight
+    and returns a per-card map with a status code for each card.
+    """
+    card_numbers = list(dict.fromkeys(request.card_numbers))
+    if len(card_numbers) > BULK_AMOUNT_DUE_MAX_CARDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many cards in one request ({len(card_numbers)} > {BULK_AMOUNT_DUE_MAX_CARDS})."
+        )
+
+    limiter = asyncio.Semaphore(BULK_AMOUNT_DUE_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_lookup_one(request.tcc_num, card_number, limiter) for card_number in card_numbers)
+    )
+    return model_json(
+        BulkAmountDueResponse,
+        {"tcc_num": request.tcc_num, "results": dict(zip(card_numbers, results))},
+        exclude_none=True,
+    )
+
 # 2️⃣ Plate Search
 @router.get("/by-plate/{plate}", response_model=AmountDueResponse)
 async def ticket_by_plate(plate: str, tcc_num: int):
     """
     Lookup ticket by license plate.
-    Calls getAmountDue or LPR query.
-    Currently maps plate → card_number via SOAP (simplified).
+    The plate is resolved to a card number through the local plate index;
+    only getAmountDue goes to SOAP. Only an exact match is resolved: near
+    matches (LPR look-alikes, one character off) are returned as
+    ``candidates`` with a 409 and no quote, so the caller can confirm the
+    vehicle. Plates the index does not know are passed on as card numbers,
+    as before.
     """
+    matches = [m for m in plate_index.lookup(plate) if m["card_number"]]
+    if matches and matches[0]["exact"]:
+        card_number, matched_plate = matches[0]["card_number"], matches[0]["plate"]
+    elif matches:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": f"Plate {plate} is not indexed; similar plates found",
+                "candidates": [
+                    {"plate": m["plate"], "card_number": m["card_number"], "distance": m["distance"]}
+                    for m in matches
+                ],
+            },
+        )
+    else:
+        card_number, matched_plate = plate, None
+
     try:
-        # Here, ideally you would map plate → card_number
-        # For now, we assume plate = card_number
-        result = get_amount_due(tcc_num, plate)
-        return {"card_number": plate, "amount_due": result}
+        result, read_at = await read_amount_due_async(tcc_num, card_number)
+        quote, quote_expires_at = create_quote(card_number, tcc_num, result, read_at)
+        return model_json(AmountDueResponse, {
+            "card_number": card_number,
+            "amount_due": str(result),
+            "quote": quote,
+            "quote_expires_at": quote_expires_at,
+            "matched_plate": matched_plate,
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -70,13 +174,15 @@ async def ticket_rebate(card_number: str, request: RebateRequest):
     Apply discount rules via setRebate SOAP call.
     """
     try:
-        result = set_rebate(
+        result = await set_rebate_async(
             card_number,
             request.discount_type,
             request.discount_value,
             request.discount_account,
         )
         return {"result": str(result)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -101,7 +207,7 @@ async def ticket_settlement(card_number: str, tcc_num: int, request: SettlementR
     Complete payment via setCardSettlement SOAP call with due validation.
     """
     try:
-        result = set_card_settlement(tcc_num, card_number, request.amount_paid)
+        result = await set_card_settlement_async(tcc_num, card_number, request.amount_paid, request.quote)
         return result
 
     except ValueError as ve:
@@ -112,6 +218,8 @@ async def ticket_settlement(card_number: str, tcc_num: int, request: SettlementR
         # SOAP fault or communication failure
         raise HTTPException(status_code=502, detail=str(re))
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
 
@@ -122,7 +230,9 @@ async def ticket_clear(card_number: str, tcc_num: int, user_id: str = None, pass
     Mark ticket cleared via setCleared SOAP call.
     """
     try:
-        result = set_cleared(tcc_num, card_number, user_id, password)
+        result = await set_cleared_async(tcc_num, card_number, user_id, password)
         return {"message": "Ticket cleared successfully","result": str(result)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,396 +1,173 @@
-from pydoc import html
+import logging
+import os
+import re
 import httpx
-import xml.etree.ElementTree as ET
+from dotenv import load_dotenv
 
-WINCAVE_HIT_ENDPOINT = "https://windcave-hit-mock-api-bmf2drabc5esfub6.eastus-01.azurewebsites.net/hit/pos.aspx"
+from app.logging_pipeline import log_payload
+from app.services.hit_codec import TEMPLATES, HitResult, build_generic, parse_response
 
-def optional_tag(tag, value):
-    return f"<{tag}>{value}</{tag}>" if value else ""
+load_dotenv()
 
-async def send_hit_purchase_request(data: dict):
-    """
-    Builds XML, sends request to Windcave HIT mock endpoint,
-    parses XML response, and returns JSON.
-    """
-
-    # Build the HIT XML request
-    # xml_body = f"""
-    # <Scr action="doScrHIT" user="{data['user']}" key="{data['key']}">
-    #     <Amount>{data['amount']}</Amount>
-    #     <Cur>{data['currency']}</Cur>
-    #     <TxnType>Purchase</TxnType>
-    #     <Station>{data['station']}</Station>
-    #     <TxnRef>{data['txnRef']}</TxnRef>
-    #     <DeviceId>{data['deviceId']}</DeviceId>
-    #     <PosName>{data['posName']}</PosName>
-    #     <PosVersion>{data['posVersion']}</PosVersion>
-    #     <VendorId>{data['vendorId']}</VendorId>
-    #     <MRef>{data['mref']}</MRef>
-    # </Scr>
-    # """.strip()
-
-    xml_body = f"""
-<Scr action="doScrHIT" user="{html.escape(data['user'])}" key="{html.escape(data['key'])}">
-    <Amount>{data['amount']}</Amount>
-    <Cur>{html.escape(data['currency'])}</Cur>
-    <TxnType>Purchase</TxnType>
-    <Station>{html.escape(data['station'])}</Station>
-    <TxnRef>{html.escape(data['txnRef'])}</TxnRef>
-    <DeviceId>{html.escape(data['deviceId'])}</DeviceId>
-    {optional_tag("PosName", data.get("posName"))}
-    {optional_tag("PosVersion", data.get("posVersion"))}
-    {optional_tag("VendorId", data.get("vendorId"))}
-    {optional_tag("MRef", data.get("mref"))}
-</Scr>
-""".strip()
-
-
-    headers = {
-        "Content-Type": "application/xml"
-    }
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            WINCAVE_HIT_ENDPOINT,
-            data=xml_body,
-            headers=headers
-        )
-
-    # Parse the XML response from Windcave mock
-    root = ET.fromstring(response.text)
-
-    # Convert XML to JSON-like dict
-    parsed = {child.tag: child.text for child in root}
-    parsed["TxnType"] = "Purchase"
-    return parsed
-
-
-
-
-async def send_hit_refund_request(data: dict):
-    xml_body = f"""
-<Scr action="doScrHIT" user="{html.escape(data['user'])}" key="{html.escape(data['key'])}">
-    <Amount>{data['amount']}</Amount>
-    <Cur>{html.escape(data['currency'])}</Cur>
-    <TxnType>Refund</TxnType>
-    <Station>{html.escape(data['station'])}</Station>
-    <TxnRef>{html.escape(data['txnRef'])}</TxnRef>
-    <DpsTxnRef>{html.escape(data['dpsTxnRef'])}</DpsTxnRef>
-    <DeviceId>{html.escape(data['deviceId'])}</DeviceId>
-    <PosName>{html.escape(data['posName'])}</PosName>
-    <VendorId>{html.escape(data['vendorId'])}</VendorId>
-    <MRef>{html.escape(data['mref'])}</MRef>
-</Scr>
-""".strip()
-
-    print("===== XML SENT TO WINCAVE =====")
-    print(xml_body)
-    print("================================")
-
-    headers = {"Content-Type": "application/xml"}
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            WINCAVE_HIT_ENDPOINT,
-            data=xml_body,
-            headers=headers
-        )
-
-    print("===== RAW RESPONSE =====")
-    print(response.text)
-    print("========================")
-
-    # Parse
-    root = ET.fromstring(response.text)
-    parsed = {child.tag: child.text for child in root}
-
-    # Add TxnType manually
-    parsed["TxnType"] = "Refund"
-    parsed["DpsTxnRef"] = data["dpsTxnRef"]
-    parsed["DeviceId"] = data["deviceId"]
-    parsed["Station"] = data["station"]
-
-    return parsed
-
-
-
-
-async def send_hit_unmatched_refund_request(data: dict):
-
-    xml_body = f"""
-<Scr action="doScrHIT" user="{data['user']}" key="{data['key']}">
-    <Amount>{data['amount']}</Amount>
-    <Cur>{data['currency']}</Cur>
-    <TxnType>Refund</TxnType>
-    <Station>{data['station']}</Station>
-    <TxnRef>{data['txnRef']}</TxnRef>
-    <DeviceId>{data['deviceId']}</DeviceId>
-    <PosName>{data['posName']}</PosName>
-    <VendorId>{data['vendorId']}</VendorId>
-    <MRef>{data['mref']}</MRef>
-</Scr>
-""".strip()
-
-    print("===== XML SENT TO WINCAVE =====")
-    print(xml_body)
-    print("================================")
-
-    headers = {"Content-Type": "application/xml"}
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            WINCAVE_HIT_ENDPOINT,
-            data=xml_body,
-            headers=headers
-        )
-
-    print("===== RAW RESPONSE =====")
-    print(response.text)
-    print("========================")
-
-    root = ET.fromstring(response.text)
-    parsed = {child.tag: child.text for child in root}
-
-    # Add missing fields manually
-    parsed["TxnType"] = "Refund"
-    parsed["DeviceId"] = data["deviceId"]
-    parsed["Station"] = data["station"]
-    parsed["MRef"] = data["mref"]
-
-    return parsed
+logger = logging.getLogger("app.hit")
 
+# Windcave HIT endpoint; point HIT_ENDPOINT at benchmarks/hit_simulator.py for local load tests
+WINCAVE_HIT_ENDPOINT = os.getenv(
+    "HIT_ENDPOINT",
+    "https://windcave-hit-mock-api-bmf2drabc5esfub6.eastus-01.azurewebsites.net/hit/pos.aspx",
+)
 
+_KEY_ATTRIBUTE = re.compile(r'(\bkey=")[^"]*(")')
 
-async def send_hit_reversal_request(data: dict):
 
-    xml_body = f"""
-<Scr action="doScrHIT" user="{data['user']}" key="{data['key']}">
-    <TxnType>Reversal</TxnType>
-    <Station>{data['station']}</Station>
-    <TxnRef>{data['txnRef']}</TxnRef>
-</Scr>
-""".strip()
+def redact_credentials(xml_text: str) -> str:
+    """Masks the HIT API key in logged / dumped request bodies."""
+    return _KEY_ATTRIBUTE.sub(r"\1***\2", xml_text)
 
-    print("===== XML SENT TO WINCAVE =====")
-    print(xml_body)
-    print("================================")
 
-    headers = {"Content-Type": "application/xml"}
+# ---------------------------------------------------------------------
+# Shared connection pool
+# ---------------------------------------------------------------------
+# One keep-alive pool per worker, opened in the FastAPI lifespan, so HIT
+# calls at the pinpad reuse a warm TCP+TLS connection instead of paying a
+# handshake each time.
+_http_client = None
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            WINCAVE_HIT_ENDPOINT,
-            data=xml_body,
-            headers=headers
-        )
 
-    print("===== RAW RESPONSE =====")
-    print(response.text)
-    print("========================")
+def _hit_timeout(txn_type: str = None) -> float:
+    """Per-operation timeout: HIT_TIMEOUT_<TXNTYPE>_SECONDS, else HIT_TIMEOUT_SECONDS."""
+    default = os.getenv("HIT_TIMEOUT_SECONDS", "30")
+    if not txn_type:
+        return float(default)
+    return float(os.getenv(f"HIT_TIMEOUT_{txn_type.upper()}_SECONDS", default))
 
-    # Parse XML response
-    root = ET.fromstring(response.text)
-    parsed = {child.tag: child.text for child in root}
 
-    # Add missing fields manually
-    parsed["TxnType"] = "Reversal"
-    parsed["TxnRef"] = data["txnRef"]
-    parsed["Station"] = data["station"]
-
-    return parsed
-
-
-
-async def send_hit_status_request(data: dict):
-
-    xml_body = f"""
-<Scr action="doScrHIT" user="{data['user']}" key="{data['key']}">
-    <TxnType>Status</TxnType>
-    <Station>{data['station']}</Station>
-    <TxnRef>{data['txnRef']}</TxnRef>
-</Scr>
-""".strip()
-
-    print("===== XML SENT TO WINCAVE =====")
-    print(xml_body)
-    print("================================")
+def _build_http_client(transport: httpx.AsyncBaseTransport = None) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("HIT_MAX_CONNECTIONS", "50")),
+        max_keepalive_connections=int(os.getenv("HIT_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("HIT_KEEPALIVE_EXPIRY_SECONDS", "60")),
+    )
+    http2 = os.getenv("HIT_HTTP2", "False").strip().lower() in ("1", "true", "yes")
+    try:
+        return httpx.AsyncClient(limits=limits, timeout=_hit_timeout(), http2=http2, transport=transport)
+    except ImportError:
+        # http2=True needs the optional "h2" package (pip install httpx[http2])
+        logger.warning("HIT_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+        return httpx.AsyncClient(limits=limits, timeout=_hit_timeout(), transport=transport)
 
-    headers = {"Content-Type": "application/xml"}
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            WINCAVE_HIT_ENDPOINT,
-            data=xml_body,
-            headers=headers
-        )
+def get_hit_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _build_http_client()
+    return _http_client
 
-    print("===== RAW RESPONSE =====")
-    print(response.text)
-    print("========================")
 
-    # Parse XML response
-    root = ET.fromstring(response.text)
-    parsed = {child.tag: child.text for child in root}
+async def start_hit_client(transport: httpx.AsyncBaseTransport = None):
+    """
+    Opens the pool at startup (FastAPI lifespan). Load tests can pass a
+    transport, e.g. ``httpx.ASGITransport`` to an in-process HIT simulator,
+    before the lifespan runs; the lifespan then keeps that client.
+    """
+    global _http_client
+    if transport is not None:
+        await close_hit_client()
+        _http_client = _build_http_client(transport)
+    get_hit_client()
 
-    # Add missing fields manually
-    parsed["TxnType"] = "Status"
-    parsed["TxnRef"] = data["txnRef"]
-    parsed["Station"] = data["station"]
 
-    return parsed
+async def close_hit_client():
+    """Closes the pool and its keep-alive connections (FastAPI shutdown)."""
+    global _http_client
+    client, _http_client = _http_client, None
+    if client is not None:
+        await client.aclose()
 
 
+async def post_hit(txn_type: str, xml_body: str, headers: dict) -> httpx.Response:
+    return await get_hit_client().post(
+        WINCAVE_HIT_ENDPOINT,
+        content=xml_body,
+        headers=headers,
+        timeout=_hit_timeout(txn_type),
+    )
 
-# async def send_hit_receipt_request(data: dict, ):
 
-#     xml_body = f"""
-# <Scr action="doScrHIT" user="{data['user']}" key="{data['key']}">
-#     <TxnType>Receipt</TxnType>
-#     <Station>{data['station']}</Station>
-#     <TxnRef>{data['txnRef']}</TxnRef>
-#     <DuplicateFlag>{data.get('duplicateFlag', 0)}</DuplicateFlag>
-#     <ReceiptType>{data['receiptType']}</ReceiptType>
-# </Scr>
-# """.strip()
+_XML_HEADERS = {"Content-Type": "application/xml"}
 
-#     print("===== XML SENT TO WINCAVE =====")
-#     print(xml_body)
-#     print("================================")
 
-#     headers = {"Content-Type": "application/xml"}
+async def _exchange(txn_type: str, xml_body: str, label: str = None) -> bytes:
+    """Posts one request and returns the raw response body; both sides go to the payload log."""
+    label = label or f"HIT {txn_type}"
+    log_payload(logger, f"{label} request", xml_body, redact=redact_credentials)
+    response = await post_hit(txn_type, xml_body, _XML_HEADERS)
+    log_payload(logger, f"{label} response", response.content, redact=redact_credentials)
+    return response.content
 
-#     async with httpx.AsyncClient(timeout=30) as client:
-#         response = await client.post(
-#             WINCAVE_HIT_ENDPOINT,
-#             data=xml_body,
-#             headers=headers
-#         )
 
-#     print("===== RAW RESPONSE =====")
-#     print(response.text)
-#     print("========================")
+async def send_hit_purchase_request(data: dict) -> HitResult:
+    """
+    Builds XML, sends request to Windcave HIT mock endpoint,
+    parses the XML response into a HitResult.
+    """
+    body = await _exchange("Purchase", TEMPLATES["Purchase"].build(data))
+    return parse_response(body, "Purchase")
 
-#     # Parse XML response
-#     root = ET.fromstring(response.text)
-#     parsed = {child.tag: child.text for child in root}
 
-#     # Add missing fields manually
-#     parsed["TxnType"] = "Receipt"
-#     parsed["TxnRef"] = data["txnRef"]
-#     parsed["Station"] = data["station"]
-#     parsed["DuplicateFlag"] = str(data.get("duplicateFlag", 0))
-#     parsed["ReceiptType"] = str(data["receiptType"])
+async def send_hit_refund_request(data: dict) -> HitResult:
+    body = await _exchange("Refund", TEMPLATES["Refund"].build(data))
+    return parse_response(body, "Refund", echo={
+        "DpsTxnRef": data["dpsTxnRef"],
+        "DeviceId": data["deviceId"],
+        "Station": data["station"],
+    })
 
-#     return parsed
 
+async def send_hit_unmatched_refund_request(data: dict) -> HitResult:
+    body = await _exchange("Refund", TEMPLATES["UnmatchedRefund"].build(data), label="HIT Refund (unmatched)")
+    return parse_response(body, "Refund", echo={
+        "DeviceId": data["deviceId"],
+        "Station": data["station"],
+        "MRef": data["mref"],
+    })
 
 
-async def send_hit_receipt_request(data: dict, action: str = None):
-    # Build XML
-    xml_body = f"""
-<Scr action="doScrHIT" user="{html.escape(data['user'])}" key="{html.escape(data['key'])}">
-    <Station>{html.escape(data['station'])}</Station>
-    <TxnType>Receipt</TxnType>
-    <TxnRef>{html.escape(data['txnRef'])}</TxnRef>
-    <ReceiptType>{data['receiptType']}</ReceiptType>
-    <DuplicateFlag>{data.get('duplicateFlag',0)}</DuplicateFlag>
-"""
-    if data.get("printer"):
-        xml_body += f"    <Printer>{html.escape(data['printer'])}</Printer>\n"
+async def send_hit_reversal_request(data: dict) -> HitResult:
+    body = await _exchange("Reversal", TEMPLATES["Reversal"].build(data))
+    return parse_response(body, "Reversal", echo={"TxnRef": data["txnRef"], "Station": data["station"]})
 
-    if action:
-        xml_body += f"    <Action>{html.escape(action)}</Action>\n"
 
-    xml_body += "</Scr>"
+async def send_hit_status_request(data: dict) -> HitResult:
+    body = await _exchange("Status", TEMPLATES["Status"].build(data))
+    return parse_response(body, "Status", echo={"TxnRef": data["txnRef"], "Station": data["station"]})
 
-    print("===== XML SENT TO WINCAVE (Receipt) =====")
-    print(xml_body)
-    print("================================")
 
-    headers = {"Content-Type": "application/xml"}
+async def send_hit_receipt_request(data: dict, action: str = None) -> HitResult:
+    body = await _exchange("Receipt", TEMPLATES["Receipt"].build(data, action=action))
+    result = parse_response(body, "Receipt", strict=False)
+    if not result.parsed:
+        logger.warning("HIT Receipt response is not valid XML")
+    return result
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(WINCAVE_HIT_ENDPOINT, data=xml_body, headers=headers)
 
-    # Parse response
-    try:
-        root = ET.fromstring(response.text)
-        parsed = {child.tag: child.text for child in root}
-        parsed["TxnType"] = "Receipt"
-        return parsed
-    except ET.ParseError:
-        print("❌ XML parsing failed!")
-        return {"raw_response": response.text, "TxnType": "Receipt"}
-
-
-async def send_hit_enterdata_request(data: dict):
-    # Build XML
-    xml_body = f"""
-<Scr action="doScrHIT" user="{html.escape(data['user'])}" key="{html.escape(data['key'])}">
-    <Station>{html.escape(data['station'])}</Station>
-    <TxnType>EnterData</TxnType>
-    <CmdSeq>{data['cmdSeq']}</CmdSeq>
-    <PromptId>{data['promptId']}</PromptId>
-    <Timeout>{data['timeout']}</Timeout>
-</Scr>
-""".strip()
-
-    print("===== XML SENT TO WINCAVE (EnterData) =====")
-    print(xml_body)
-    print("================================")
-
-    headers = {"Content-Type": "application/xml"}
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(WINCAVE_HIT_ENDPOINT, data=xml_body, headers=headers)
-
-    # Parse response
-    try:
-        root = ET.fromstring(response.text)
-        parsed = {child.tag: child.text for child in root}
-        parsed["TxnType"] = "EnterData"
-        return parsed
-    except ET.ParseError:
-        print("❌ XML parsing failed!")
-        return {"raw_response": response.text, "TxnType": "EnterData"}
-    
+async def send_hit_enterdata_request(data: dict) -> HitResult:
+    body = await _exchange("EnterData", TEMPLATES["EnterData"].build(data))
+    result = parse_response(body, "EnterData", strict=False)
+    if not result.parsed:
+        logger.warning("HIT EnterData response is not valid XML")
+    return result
 
 
-async def send_hit_generic_request(txn_type: str, data: dict):
+async def send_hit_generic_request(txn_type: str, data: dict) -> HitResult:
     """
     Send generic HIT XML request for operations like PinpadDisplay, ReadCard, SettlementSummary, Ping.
     """
-    xml_body = f'<Scr action="doScrHIT" user="{html.escape(data.get("user",""))}" key="{html.escape(data.get("key",""))}">'
-    for key, value in data.items():
-        if key not in ["user", "key"]:
-            xml_body += f"<{key}>{html.escape(str(value))}</{key}>"
-    xml_body += f"<TxnType>{txn_type}</TxnType></Scr>"
-
-    print("===== XML SENT TO WINCAVE =====")
-    print(xml_body)
-    print("================================")
-
-    headers = {"Content-Type": "application/xml"}
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            WINCAVE_HIT_ENDPOINT,
-            data=xml_body,
-            headers=headers
-        )
-
-    try:
-        root = ET.fromstring(response.text)
-        parsed = {child.tag: child.text for child in root}
-    except ET.ParseError:
-        # Return raw text if XML parsing fails
-        parsed = {"raw_response": response.text}
-
-    parsed["TxnType"] = txn_type
-    return parsed
+    body = await _exchange(txn_type, build_generic(txn_type, data))
+    return parse_response(body, txn_type, strict=False)
 
 
-
-async def send_hit_ui_button_request(data: dict):
+async def send_hit_ui_button_request(data: dict) -> HitResult:
     """
     Send Windcave HIT UI button-press request.
     TxnType = UI
@@ -408,54 +185,15 @@ async def send_hit_ui_button_request(data: dict):
 
     if val not in ("YES", "NO", "CANCEL"):
         raise ValueError("Invalid button val: must be YES, NO, CANCEL")
-    
-
-    xml_body = f"""
-<Scr action="doScrHIT" user="{html.escape(data['user'])}" key="{html.escape(data['key'])}">
-    <Station>{html.escape(data['station'])}</Station>
-    <TxnType>UI</TxnType>
-    <UiType>Bn</UiType>
-    <Name>{html.escape(name)}</Name>
-    <Val>{html.escape(val)}</Val>
-    <TxnRef>{html.escape(data['txnRef'])}</TxnRef>
-</Scr>
-""".strip()
-
-    print("===== XML SENT TO WINDCAVE (UI Button) =====")
-    print(xml_body)
-    print("============================================")
-
-    headers = {"Content-Type": "application/xml"}
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        response = await client.post(
-            WINCAVE_HIT_ENDPOINT,
-            data=xml_body,
-            headers=headers
-        )
-
-    print("===== RAW RESPONSE =====")
-    print(response.text)
-    print("========================")
-
-    # Parse XML
-    try:
-        root = ET.fromstring(response.text)
-        parsed = {child.tag: child.text for child in root}
-    except ET.ParseError:
-        return {
-            "TxnType": "UI",
-            "error": "Failed to parse XML",
-            "raw_response": response.text
-        }
-
-    parsed.update({
-        "TxnType": "UI",
+
+    body = await _exchange("UI", TEMPLATES["UI"].build(data))
+    result = parse_response(body, "UI", strict=False, echo={
         "UiType": "Bn",
         "ButtonName": name,
         "ButtonValue": val,
         "Station": data["station"],
-        "TxnRef": data["txnRef"]
+        "TxnRef": data["txnRef"],
     })
-
-    return parsed
+    if not result.parsed:
+        result.error = "Failed to parse XML"
+    return result
@@ -0,0 +1,222 @@
+# app/services/hit_codec.py
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Optional
+
+# ---------------------------------------------------------------------
+# Escaping
+# ---------------------------------------------------------------------
+_NEEDS_ESCAPE = re.compile(r'[&<>"]').search
+
+
+def escape(value) -> str:
+    """XML-escapes a value for element text and double-quoted attributes."""
+    text = value if type(value) is str else str(value)
+    if _NEEDS_ESCAPE(text) is None:
+        return text
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+# ---------------------------------------------------------------------
+# Request templates
+# ---------------------------------------------------------------------
+REQUIRED = "required"      # always emitted, KeyError if missing
+OPTIONAL = "optional"      # emitted only when truthy; must follow the other elements
+CONSTANT = "constant"      # fixed text, not taken from the data
+
+_NO_DEFAULT = object()
+_TAG_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_.-]*$")
+
+
+class HitTemplate:
+    """
+    One doScrHIT request layout, prepared once.
+
+    ``elements`` is a sequence of ``(tag, source, mode)``: ``source`` is the
+    key in the request data (or the literal text for CONSTANT) and ``mode``
+    one of REQUIRED / OPTIONAL / CONSTANT; REQUIRED elements may carry a
+    default as a 4th item. Constant text and tags are joined ahead of time
+    into ``(prefix, source, default)`` parts, so a build only escapes the
+    values and joins the pieces.
+    """
+
+    def __init__(self, txn_type: str, elements):
+        self.txn_type = txn_type
+        self._parts = []        # (constant text before the value, source, default)
+        self._optional = []     # (opening tag, source, closing tag)
+        pending = ""            # constant text not yet attached to a part
+        for element in elements:
+            tag, source, mode = element[:3]
+            if not _TAG_NAME.match(tag):
+                raise ValueError(f"Invalid HIT element name: {tag!r}")
+            if mode == OPTIONAL:
+                self._optional.append((f"<{tag}>", source, f"</{tag}>"))
+                continue
+            if self._optional:
+                raise ValueError(f"{txn_type}: {tag} follows an optional element")
+            if mode == CONSTANT:
+                pending += f"<{tag}>{escape(source)}</{tag}>"
+                continue
+            default = element[3] if len(element) > 3 else _NO_DEFAULT
+            self._parts.append((pending + f"<{tag}>", source, default))
+            pending = f"</{tag}>"
+        self._closing = pending
+
+    def build(self, data: dict, **overrides) -> str:
+        values = {**data, **overrides} if overrides else data
+        out = ['<Scr action="doScrHIT" user="', escape(values["user"]), '" key="', escape(values["key"]), '">']
+        for prefix, source, default in self._parts:
+            out.append(prefix)
+            out.append(escape(values[source] if default is _NO_DEFAULT else values.get(source, default)))
+        out.append(self._closing)
+        for opening, source, closing in self._optional:
+            value = values.get(source)
+            if value:
+                out += (opening, escape(value), closing)
+        out.append("</Scr>")
+        return "".join(out)
+
+
+def build_generic(txn_type: str, data: dict) -> str:
+    """Request for operations without a fixed layout: every data field (except credentials) becomes an element."""
+    parts = [f'<Scr action="doScrHIT" user="{escape(data.get("user", ""))}" key="{escape(data.get("key", ""))}">']
+    for key, value in data.items():
+        if key in ("user", "key"):
+            continue
+        if not _TAG_NAME.match(key):
+            raise ValueError(f"Invalid HIT element name: {key!r}")
+        parts.append(f"<{key}>{escape(value)}</{key}>")
+    parts.append(f"<TxnType>{escape(txn_type)}</TxnType></Scr>")
+    return "".join(parts)
+
+
+TEMPLATES = {
+    "Purchase": HitTemplate("Purchase", [
+        ("Amount", "amount", REQUIRED),
+        ("Cur", "currency", REQUIRED),
+        ("TxnType", "Purchase", CONSTANT),
+        ("Station", "station", REQUIRED),
+        ("TxnRef", "txnRef", REQUIRED),
+        ("DeviceId", "deviceId", REQUIRED),
+        ("PosName", "posName", OPTIONAL),
+        ("PosVersion", "posVersion", OPTIONAL),
+        ("VendorId", "vendorId", OPTIONAL),
+        ("MRef", "mref", OPTIONAL),
+    ]),
+    "Refund": HitTemplate("Refund", [
+        ("Amount", "amount", REQUIRED),
+        ("Cur", "currency", REQUIRED),
+        ("TxnType", "Refund", CONSTANT),
+        ("Station", "station", REQUIRED),
+        ("TxnRef", "txnRef", REQUIRED),
+        ("DpsTxnRef", "dpsTxnRef", REQUIRED),
+        ("DeviceId", "deviceId", REQUIRED),
+        ("PosName", "posName", REQUIRED),
+        ("VendorId", "vendorId", REQUIRED),
+        ("MRef", "mref", REQUIRED),
+    ]),
+    "UnmatchedRefund": HitTemplate("Refund", [
+        ("Amount", "amount", REQUIRED),
+        ("Cur", "currency", REQUIRED),
+        ("TxnType", "Refund", CONSTANT),
+        ("Station", "station", REQUIRED),
+        ("TxnRef", "txnRef", REQUIRED),
+        ("DeviceId", "deviceId", REQUIRED),
+        ("PosName", "posName", REQUIRED),
+        ("VendorId", "vendorId", REQUIRED),
+        ("MRef", "mref", REQUIRED),
+    ]),
+    "Reversal": HitTemplate("Reversal", [
+        ("TxnType", "Reversal", CONSTANT),
+        ("Station", "station", REQUIRED),
+        ("TxnRef", "txnRef", REQUIRED),
+    ]),
+    "Status": HitTemplate("Status", [
+        ("TxnType", "Status", CONSTANT),
+        ("Station", "station", REQUIRED),
+        ("TxnRef", "txnRef", REQUIRED),
+    ]),
+    "Receipt": HitTemplate("Receipt", [
+        ("Station", "station", REQUIRED),
+        ("TxnType", "Receipt", CONSTANT),
+        ("TxnRef", "txnRef", REQUIRED),
+        ("ReceiptType", "receiptType", REQUIRED),
+        ("DuplicateFlag", "duplicateFlag", REQUIRED, 0),
+        ("Printer", "printer", OPTIONAL),
+        ("Action", "action", OPTIONAL),
+    ]),
+    "EnterData": HitTemplate("EnterData", [
+        ("Station", "station", REQUIRED),
+        ("TxnType", "EnterData", CONSTANT),
+        ("CmdSeq", "cmdSeq", REQUIRED),
+        ("PromptId", "promptId", REQUIRED),
+        ("Timeout", "timeout", REQUIRED),
+    ]),
+    "UI": HitTemplate("UI", [
+        ("Station", "station", REQUIRED),
+        ("TxnType", "UI", CONSTANT),
+        ("UiType", "Bn", CONSTANT),
+        ("Name", "name", REQUIRED),
+        ("Val", "val", REQUIRED),
+        ("TxnRef", "txnRef", REQUIRED),
+    ]),
+}
+
+
+# ---------------------------------------------------------------------
+# Responses
+# ---------------------------------------------------------------------
+@dataclass(slots=True)
+class HitResult:
+    """
+    Parsed doScrHIT response: the text of each top-level element, plus
+    request fields echoed back to the caller. ``raw`` is set instead when
+    the body was not valid XML.
+    """
+
+    txn_type: str
+    fields: dict = field(default_factory=dict)
+    echo: dict = field(default_factory=dict)
+    raw: Optional[bytes] = None
+    error: Optional[str] = None
+
+    @property
+    def parsed(self) -> bool:
+        return self.raw is None
+
+    @property
+    def complete(self) -> bool:
+        return self.fields.get("Complete") == "1"
+
+    @property
+    def txn_ref(self) -> Optional[str]:
+        return self.echo.get("TxnRef") or self.fields.get("TxnRef")
+
+    @property
+    def status_id(self) -> Optional[str]:
+        return self.fields.get("StatusId")
+
+    def to_dict(self) -> dict:
+        """The JSON shape the /hit routes return."""
+        if self.raw is not None:
+            result = {"raw_response": self.raw.decode("utf-8", errors="replace"), "TxnType": self.txn_type}
+            if self.error:
+                result["error"] = self.error
+            return result
+        return {**self.fields, "TxnType": self.txn_type, **self.echo}
+
+
+def parse_response(body: bytes, txn_type: str, echo: dict = None, strict: bool = True) -> HitResult:
+    """
+    Parses a response body straight from bytes (the XML declaration decides
+    the encoding; no decode / re-encode). With ``strict`` an invalid body
+    raises ET.ParseError, otherwise it is returned in ``HitResult.raw``.
+    """
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError:
+        if strict:
+            raise
+        return HitResult(txn_type, raw=body)
+    return HitResult(txn_type, {child.tag: child.text for child in root}, echo or {})
@@ -0,0 +1,392 @@
+# app/services/hit_transactions.py
+import asyncio
+import hmac
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.bulkheads import HIT, get_bulkhead
+from app.services.hit_codec import HitResult
+from app.services.Hit_Services import (
+    send_hit_purchase_request,
+    send_hit_refund_request,
+    send_hit_status_request,
+    send_hit_unmatched_refund_request,
+)
+from app.singleflight import coalesced
+
+load_dotenv()
+
+logger = logging.getLogger("app.hit.transactions")
+
+PENDING = "pending"
+COMPLETE = "complete"
+TIMED_OUT = "timed_out"
+
+PURCHASE = "Purchase"
+REFUND = "Refund"
+UNMATCHED_REFUND = "UnmatchedRefund"
+
+_STARTERS = {
+    PURCHASE: send_hit_purchase_request,
+    REFUND: send_hit_refund_request,
+    UNMATCHED_REFUND: send_hit_unmatched_refund_request,
+}
+
+
+@coalesced("hit_status")
+async def _shared_status(station: str, txn_ref: str, user: str, key: str) -> HitResult:
+    """Concurrent Status calls for the same transaction (and credentials) share one upstream request."""
+    return await send_hit_status_request({"user": user, "key": key, "station": station, "txnRef": txn_ref})
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class HitTransaction:
+    """One Purchase / Refund on a terminal and the latest Windcave answer for it."""
+
+    def __init__(self, txn_type: str, data: dict, poll_interval: float):
+        self.txn_type = txn_type        # None for a transaction adopted from another worker
+        self.txn_ref = data["txnRef"]
+        self.station = data["station"]
+        self._credentials = (data["user"], data["key"])
+        self.state = PENDING
+        self.result = HitResult(txn_type or "Status")   # start answer, then the latest Status answer
+        self.started_at = self.updated_at = time.time()
+        self.polled_at = None           # monotonic time of the latest Status answer
+        self.finished_at = None
+        self.interval = poll_interval   # current poll interval (grows with backoff)
+        self.polls = 0
+        self.poll_errors = 0
+        self.last_error = None
+        self.version = 0
+        self.done = asyncio.Event()
+        self.subscribers = set()
+        self.task = None
+        self.starting = False           # registered, start request not answered yet
+        self.adopted = False            # started through another worker; no poller here
+        self.deadline = None            # monotonic; adopted transactions time out at it
+
+    def owned_by(self, user: str, key: str) -> bool:
+        """True when a caller presents the HIT credentials this transaction was started with."""
+        return hmac.compare_digest(f"{user}\0{key}", "\0".join(self._credentials))
+
+    async def fetch_status(self) -> HitResult:
+        user, key = self._credentials
+        return await _shared_status(self.station, self.txn_ref, user, key)
+
+    def snapshot(self) -> dict:
+        return {
+            "txn_ref": self.txn_ref,
+            "station": self.station,
+            "txn_type": self.txn_type,
+            "state": self.state,
+            "version": self.version,
+            "polls": self.polls,
+            "started_at": _iso(self.started_at),
+            "updated_at": _iso(self.updated_at),
+            "windcave": self.result.to_dict(),
+        }
+
+
+class HitTransactionEngine:
+    """
+    Runs Windcave HIT Purchase / Refund transactions in the background.
+
+    ``start`` sends the transaction to the terminal and returns at once;
+    one task per transaction then polls Status with backoff until the
+    terminal reports completion (or POLL_TIMEOUT_SECONDS passes). Clients
+    follow it through ``wait`` (long-poll) or ``events`` (SSE) instead of
+    holding a request open or polling Windcave themselves, and /hit/status
+    calls for a tracked transaction are answered from the latest poll.
+
+    State is per worker process and only the worker that started a
+    transaction polls it. Another gunicorn worker asked to follow it adopts
+    it from a Status call made with the caller's HIT credentials, but runs
+    no poller: its copy is refreshed (one coalesced Status call per poll
+    interval) only while a client there is reading or waiting on it. So
+    every worker with active followers adds Status traffic of its own, and
+    an adopted copy times out after POLL_TIMEOUT_SECONDS from adoption.
+    """
+
+    def __init__(self, poll_interval: float, poll_backoff: float, max_poll_interval: float,
+                 timeout_seconds: float, retention_seconds: float, queue_size: int = 20):
+        self.poll_interval = poll_interval
+        self.poll_backoff = poll_backoff
+        self.max_poll_interval = max_poll_interval
+        self.timeout_seconds = timeout_seconds
+        self.retention_seconds = retention_seconds
+        self.queue_size = queue_size
+        self._transactions = {}   # txn ref -> HitTransaction
+        self.started = 0
+        self.adopted = 0
+        self.completed = 0
+        self.timed_out = 0
+        self.polls = 0
+        self.poll_errors = 0
+        self.shared_status_reads = 0
+
+    def _owned(self, data: dict):
+        """The tracked transaction for ``data``'s txnRef if the caller's station and credentials match it."""
+        transaction = self._transactions.get(data["txnRef"])
+        if transaction is not None and not (
+            transaction.station == data["station"] and transaction.owned_by(data["user"], data["key"])
+        ):
+            raise HTTPException(status_code=404, detail=f"Unknown HIT transaction {data['txnRef']}")
+        return transaction
+
+    def _prune(self):
+        now = time.monotonic()
+        for transaction in list(self._transactions.values()):
+            if transaction.adopted and transaction.state == PENDING and now >= transaction.deadline:
+                self._finish(transaction, TIMED_OUT)
+        cutoff = now - self.retention_seconds
+        for txn_ref in [ref for ref, t in self._transactions.items() if t.finished_at and t.finished_at < cutoff]:
+            del self._transactions[txn_ref]
+
+    # -----------------------------------------------------------------
+    # Lifecycle
+    # -----------------------------------------------------------------
+    async def start(self, txn_type: str, data: dict) -> HitTransaction:
+        """Sends the transaction to the terminal; polling continues in the background."""
+        self._prune()
+        existing = self._transactions.get(data["txnRef"])
+        if existing is not None and existing.state == PENDING:
+            raise HTTPException(status_code=409, detail=f"HIT transaction {data['txnRef']} is already in progress")
+
+        # Registered before the terminal is contacted, so a concurrent start
+        # with the same txnRef gets the 409 instead of a second Purchase
+        transaction = HitTransaction(txn_type, data, self.poll_interval)
+        transaction.starting = True
+        self._transactions[transaction.txn_ref] = transaction
+        try:
+            result = await _STARTERS[txn_type](data)
+        except BaseException:
+            if self._transactions.get(transaction.txn_ref) is transaction:
+                del self._transactions[transaction.txn_ref]
+            raise
+        transaction.starting = False
+        transaction.result = result
+        self.started += 1
+        self._track(transaction, result)
+        return transaction
+
+    async def follow(self, data: dict) -> HitTransaction:
+        """
+        The transaction behind GET /hit/transactions/{txnRef} and its events.
+        Unknown refs are adopted from one (coalesced) Status call.
+        """
+        self._prune()
+        transaction = self._owned(data)
+        if transaction is not None:
+            await self._refresh(transaction)
+            return transaction
+
+        async with get_bulkhead(HIT).slot():
+            result = await _shared_status(data["station"], data["txnRef"], data["user"], data["key"])
+        # A concurrent follow (sharing the same Status answer) may have adopted it meanwhile
+        transaction = self._owned(data)
+        if transaction is not None:
+            return transaction
+        transaction = HitTransaction(None, data, self.poll_interval)
+        transaction.adopted = True
+        transaction.deadline = time.monotonic() + self.timeout_seconds
+        transaction.result = result
+        transaction.polled_at = time.monotonic()
+        self._transactions[transaction.txn_ref] = transaction
+        self.adopted += 1
+        if result.complete:
+            self._finish(transaction, COMPLETE)
+        return transaction
+
+    def _track(self, transaction: HitTransaction, result: HitResult):
+        if result.complete:
+            # Answered outright (terminal busy, declined before card entry, ...)
+            self._finish(transaction, COMPLETE)
+        else:
+            transaction.task = asyncio.create_task(self._poll(transaction))
+
+    async def _refresh(self, transaction: HitTransaction):
+        """Adopted transactions have no poller: a follower finding the copy stale asks Status itself."""
+        if not transaction.adopted or transaction.state != PENDING:
+            return
+        if time.monotonic() >= transaction.deadline:
+            self._finish(transaction, TIMED_OUT)
+            return
+        if time.monotonic() - transaction.polled_at < transaction.interval:
+            return
+        try:
+            async with get_bulkhead(HIT).slot():
+                result = await transaction.fetch_status()
+        except Exception as e:
+            transaction.poll_errors += 1
+            transaction.last_error = str(e)
+            self.poll_errors += 1
+            logger.warning("HIT Status refresh failed", extra={"txn_ref": transaction.txn_ref, "error": str(e)})
+            return
+        self._apply(transaction, result)
+        transaction.interval = min(transaction.interval * self.poll_backoff, self.max_poll_interval)
+
+    async def _poll(self, transaction: HitTransaction):
+        deadline = time.monotonic() + self.timeout_seconds
+        while transaction.state == PENDING:
+            await asyncio.sleep(min(transaction.interval, max(deadline - time.monotonic(), 0)))
+            if time.monotonic() >= deadline:
+                self._finish(transaction, TIMED_OUT)
+                return
+            try:
+                async with get_bulkhead(HIT).slot():
+                    result = await transaction.fetch_status()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                transaction.poll_errors += 1
+                transaction.last_error = str(e)
+                self.poll_errors += 1
+                logger.warning("HIT Status poll failed", extra={"txn_ref": transaction.txn_ref, "error": str(e)})
+            else:
+                self._apply(transaction, result)
+            transaction.interval = min(transaction.interval * self.poll_backoff, self.max_poll_interval)
+
+    def _apply(self, transaction: HitTransaction, result: HitResult):
+        # Coalesced callers all hand in the same answer; count and publish it once
+        if transaction.state != PENDING or result is transaction.result:
+            return
+        self.polls += 1
+        transaction.polls += 1
+        transaction.polled_at = time.monotonic()
+        transaction.updated_at = time.time()
+        changed = result.fields != transaction.result.fields
+        transaction.result = result
+        if result.complete:
+            self._finish(transaction, COMPLETE)
+        elif changed:
+            # e.g. the terminal display text moved on ("PRESENT CARD" -> "PROCESSING")
+            self._publish(transaction)
+
+    def _finish(self, transaction: HitTransaction, state: str):
+        transaction.state = state
+        transaction.finished_at = time.monotonic()
+        transaction.updated_at = time.time()
+        if state == COMPLETE:
+            self.completed += 1
+        else:
+            self.timed_out += 1
+        transaction.done.set()
+        self._publish(transaction)
+        if transaction.task is not None and transaction.task is not asyncio.current_task():
+            transaction.task.cancel()
+
+    async def shutdown(self):
+        """Cancels the pollers (FastAPI shutdown)."""
+        tasks = [t.task for t in self._transactions.values() if t.task is not None and not t.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -----------------------------------------------------------------
+    # Readers
+    # -----------------------------------------------------------------
+    async def status(self, data: dict) -> HitResult:
+        """
+        /hit/status: the latest poll of a tracked transaction while it is
+        fresh, otherwise one (coalesced) Status call, which also feeds the
+        transaction.
+        """
+        try:
+            transaction = self._owned(data)
+        except HTTPException:
+            transaction = None
+        if transaction is not None and transaction.starting:
+            # Still being started: its answer is not in yet and must not be overtaken
+            transaction = None
+        if transaction is not None and transaction.state != TIMED_OUT:
+            fresh = transaction.polled_at is not None and time.monotonic() - transaction.polled_at < transaction.interval
+            if fresh or (transaction.state == COMPLETE and transaction.polled_at is not None):
+                self.shared_status_reads += 1
+                return transaction.result
+
+        result = await _shared_status(data["station"], data["txnRef"], data["user"], data["key"])
+        if transaction is not None:
+            self._apply(transaction, result)
+        return result
+
+    async def wait(self, transaction: HitTransaction, timeout: float) -> HitTransaction:
+        """Long-poll: returns once the transaction finishes or ``timeout`` passes."""
+        deadline = time.monotonic() + timeout
+        while transaction.state == PENDING:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(
+                    transaction.done.wait(),
+                    timeout=min(remaining, transaction.interval) if transaction.adopted else remaining,
+                )
+            except asyncio.TimeoutError:
+                await self._refresh(transaction)
+        return transaction
+
+    def _publish(self, transaction: HitTransaction):
+        transaction.version += 1
+        event = transaction.snapshot()
+        for queue in list(transaction.subscribers):
+            if queue.full():
+                # Slow consumer: only the latest state matters
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def events(self, transaction: HitTransaction, keepalive_seconds: float = 15.0):
+        """Server-Sent Events: the current state, then every change until the transaction finishes."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        transaction.subscribers.add(queue)
+        try:
+            event = transaction.snapshot()
+            while True:
+                yield f"event: {event['state']}\nid: {event['version']}\ndata: {json.dumps(event)}\n\n"
+                if event["state"] != PENDING:
+                    return
+                while True:
+                    timeout = min(keepalive_seconds, transaction.interval) if transaction.adopted else keepalive_seconds
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=timeout)
+                        break
+                    except asyncio.TimeoutError:
+                        # An adopted copy only moves on when a follower refreshes it
+                        await self._refresh(transaction)
+                        if queue.empty():
+                            yield ": keepalive\n\n"
+        finally:
+            transaction.subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        transactions = list(self._transactions.values())
+        return {
+            "tracked": len(transactions),
+            "pending": sum(1 for t in transactions if t.state == PENDING),
+            "subscribers": sum(len(t.subscribers) for t in transactions),
+            "started": self.started,
+            "adopted": self.adopted,
+            "completed": self.completed,
+            "timed_out": self.timed_out,
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "shared_status_reads": self.shared_status_reads,
+        }
+
+
+hit_engine = HitTransactionEngine(
+    poll_interval=float(os.getenv("POLL_INTERVAL_SECONDS", "1")),
+    poll_backoff=float(os.getenv("HIT_POLL_BACKOFF", "1.5")),
+    max_poll_interval=float(os.getenv("HIT_POLL_MAX_INTERVAL_SECONDS", "5")),
+    timeout_seconds=float(os.getenv("POLL_TIMEOUT_SECONDS", "180")),
+    retention_seconds=float(os.getenv("HIT_TXN_RETENTION_SECONDS", "900")),
+    queue_size=int(os.getenv("HIT_TXN_STREAM_QUEUE_SIZE", "20")),
+)
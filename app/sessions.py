@@ -0,0 +1,159 @@
+# app/sessions.py
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from app.config import settings
+
+load_dotenv()
+
+logger = logging.getLogger("app.sessions")
+
+
+def _configured_tccs() -> list:
+    raw = os.getenv("DESIGNA_SESSION_TCCS")
+    if raw is None:
+        raw = f"{settings.DESIGNA_TCC_ENTRY},{settings.DESIGNA_TCC_EXIT}"
+    return [int(tcc) for tcc in raw.split(",") if tcc.strip()]
+
+
+def _fault_text(text: str) -> str:
+    return text.strip().rstrip(".!").strip().lower()
+
+
+def is_session_fault(fault) -> bool:
+    """
+    True when a SOAP fault means the TCC's Designa session is gone.
+
+    The fault message must equal one of DESIGNA_SESSION_FAULT_MARKERS
+    (ignoring case and trailing punctuation); a fault that merely mentions
+    a session is not enough, since it leads to a re-login and a replayed call.
+    """
+    markers = os.getenv("DESIGNA_SESSION_FAULT_MARKERS", "not logged in,login required,session expired")
+    message = _fault_text(str(getattr(fault, "message", None) or fault))
+    return any(_fault_text(marker) == message for marker in markers.split(",") if marker.strip())
+
+
+class DesignaSessionManager:
+    """
+    Keeps one Designa login per TCC alive and shares it across all requests.
+
+    ``ensure`` logs a TCC in on first use (or once its session has expired)
+    and is a no-op afterwards; ``relogin`` forces a fresh login after a
+    session-invalid fault; ``refresh_due`` re-logs sessions that are about to
+    expire and is driven by the background task started in app.main.
+    A per-TCC lock means a login storm results in a single SOAP login.
+    """
+
+    def __init__(self, ttl_seconds: int, refresh_margin_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._sessions = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.logins = 0
+
+    def _lock_for(self, tcc_num: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(tcc_num, threading.Lock())
+
+    def _is_fresh(self, session) -> bool:
+        return session is not None and session["result_code"] == 0 and session["expires_at"] > time.time()
+
+    def _login(self, tcc_num: int) -> int:
+        from app.Soap import login  # imported late: app.Soap depends on this module
+
+        result_code = login(tcc_num)
+        now = time.time()
+        self.logins += 1
+        self._sessions[tcc_num] = {
+            "result_code": result_code,
+            "logged_in_at": now,
+            "expires_at": now + self.ttl_seconds,
+        }
+        if result_code != 0:
+            logger.warning("Designa login for TCC %s returned code %s", tcc_num, result_code,
+                           extra={"TccNum": tcc_num, "ResultCode": result_code})
+        return result_code
+
+    def ensure(self, tcc_num: int) -> int:
+        """Returns the login result code for the TCC, logging in only if needed."""
+        session = self._sessions.get(tcc_num)
+        if self._is_fresh(session):
+            return session["result_code"]
+        with self._lock_for(tcc_num):
+            session = self._sessions.get(tcc_num)
+            if self._is_fresh(session):
+                return session["result_code"]
+            return self._login(tcc_num)
+
+    def relogin(self, tcc_num: int, stale_since: float = None) -> int:
+        """
+        Forces a new login. Callers that saw a session fault pass the time of
+        their failed call so concurrent callers share a single re-login.
+        """
+        with self._lock_for(tcc_num):
+            session = self._sessions.get(tcc_num)
+            if stale_since is not None and self._is_fresh(session) and session["logged_in_at"] > stale_since:
+                return session["result_code"]
+            return self._login(tcc_num)
+
+    def drop(self, tcc_num: int):
+        """Forgets the TCC's session (after an explicit logoff)."""
+        with self._lock_for(tcc_num):
+            self._sessions.pop(tcc_num, None)
+
+    def refresh_due(self):
+        """Re-logs every session that expires within the refresh margin."""
+        deadline = time.time() + self.refresh_margin_seconds
+        for tcc_num, session in list(self._sessions.items()):
+            if session["expires_at"] <= deadline:
+                try:
+                    self.relogin(tcc_num)
+                except Exception as e:
+                    logger.error("Background Designa re-login for TCC %s failed: %s", tcc_num, e, extra={"TccNum": tcc_num})
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "logins": self.logins,
+            "sessions": {
+                str(tcc): {
+                    "result_code": session["result_code"],
+                    "expires_in_seconds": round(session["expires_at"] - now, 1),
+                }
+                for tcc, session in self._sessions.items()
+            },
+        }
+
+
+session_manager = DesignaSessionManager(
+    ttl_seconds=int(os.getenv("DESIGNA_SESSION_TTL_SECONDS", "1800")),
+    refresh_margin_seconds=int(os.getenv("DESIGNA_SESSION_REFRESH_MARGIN_SECONDS", "300")),
+)
+
+
+async def run_session_refresher():
+    """
+    Logs the configured TCCs in once, then keeps their sessions warm.
+    Runs for the lifetime of the worker (started from the FastAPI lifespan).
+    """
+    from app.bulkheads import CASHPOINT, run_in_bulkhead
+
+    interval = int(os.getenv("DESIGNA_SESSION_CHECK_INTERVAL_SECONDS", "30"))
+    for tcc_num in _configured_tccs():
+        try:
+            await run_in_bulkhead(CASHPOINT, session_manager.ensure, tcc_num)
+        except Exception as e:
+            logger.error("Initial Designa login for TCC %s failed: %s", tcc_num, e, extra={"TccNum": tcc_num})
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_bulkhead(CASHPOINT, session_manager.refresh_due)
+        except Exception as e:
+            logger.error("Designa session refresh failed: %s", e)
@@ -0,0 +1,129 @@
+# app/singleflight.py
+import asyncio
+import functools
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one upstream call.
+
+    While a call for ``key`` is in flight, every other caller with the same
+    key waits for it and receives the same result (or the same exception)
+    instead of issuing its own request. Blocking callers (worker threads)
+    and event-loop callers are tracked separately.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.upstream_calls += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        # Only touched from the event loop thread, so no lock is needed
+        # around the task map itself; the counters share the sync lock.
+        task = self._tasks.get(key)
+        with self._lock:
+            self.calls += 1
+            if task is not None:
+                self.coalesced += 1
+            else:
+                self.upstream_calls += 1
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._finish_task(key, t))
+        # shield: one caller disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finish_task(self, key, task):
+        self._tasks.pop(key, None)
+        # Mark the error as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+_flights: dict = {}
+
+
+def _get_flight(name: str) -> SingleFlight:
+    return _flights.setdefault(name, SingleFlight(name))
+
+
+def _call_key(args, kwargs):
+    return (args, tuple(sorted(kwargs.items())))
+
+
+def coalesced(name: str):
+    """Decorator: concurrent calls with identical arguments share one execution."""
+    flight = _get_flight(name)
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return await flight.do_async(_call_key(args, kwargs), fn, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return flight.do(_call_key(args, kwargs), fn, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def coalescing_stats() -> dict:
+    return {name: flight.stats() for name, flight in _flights.items()}
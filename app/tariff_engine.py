@@ -0,0 +1,216 @@
+# app/tariff_engine.py
+import json
+import logging
+import math
+import os
+import random
+import threading
+from datetime import datetime
+
+import numpy as np
+import yaml
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("app.tariff_engine")
+
+MINUTES_PER_DAY = 1440
+
+
+def charged_minutes(seconds: float) -> int:
+    """Minutes a stay is charged for: every started minute counts (same rule as price_seconds)."""
+    return math.ceil(max(seconds, 0) / 60.0)
+
+
+class TariffTable:
+    """
+    One Designa tariff (carpark, card type, tariff id) as a step table.
+
+    ``step_minutes[i]`` is the upper bound (inclusive, in minutes within one
+    24 h period) of step i and ``step_amounts[i]`` the cumulative price for a
+    stay up to that bound. Stays of ``grace_minutes`` or less are free. Each
+    completed 24 h period costs ``daily_max``; the remainder is priced on the
+    step table and capped at ``daily_max``.
+    """
+
+    def __init__(self, grace_minutes: int, steps: list, daily_max: float = None):
+        if not steps:
+            raise ValueError("Tariff table needs at least one step")
+        steps = sorted(steps, key=lambda step: step["up_to_minutes"])
+        self.grace_minutes = int(grace_minutes)
+        self.step_minutes = np.array([step["up_to_minutes"] for step in steps], dtype=np.int64)
+        self.step_amounts = np.array([step["amount"] for step in steps], dtype=np.float64)
+        self.daily_max = float(daily_max) if daily_max is not None else float(self.step_amounts[-1])
+
+    def price_seconds(self, seconds: np.ndarray) -> np.ndarray:
+        """Vectorized price for an array of stay durations in seconds."""
+        minutes = np.ceil(np.maximum(seconds, 0) / 60.0).astype(np.int64)
+        days, remainder = np.divmod(minutes, MINUTES_PER_DAY)
+
+        step_index = np.searchsorted(self.step_minutes, remainder, side="left")
+        step_index = np.minimum(step_index, len(self.step_amounts) - 1)
+        remainder_price = np.where(remainder > 0, self.step_amounts[step_index], 0.0)
+
+        price = days * self.daily_max + np.minimum(remainder_price, self.daily_max)
+        return np.where(minutes <= self.grace_minutes, 0.0, np.round(price, 2))
+
+
+class TariffEngine:
+    """
+    Local mirror of Designa's calcTariff for the tariffs in a table file.
+
+    The file (YAML or JSON) holds a ``tariffs`` list; see
+    tariffs.example.yaml for the format. Local results have the same
+    ``AmountDue`` / ``GracePeriod`` keys the SOAP result is read for.
+    """
+
+    def __init__(self, tables: dict, shadow_sample_rate: float = 0.0, tolerance: float = 0.005):
+        self.tables = tables
+        self.shadow_sample_rate = shadow_sample_rate
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self.local_quotes = 0
+        self.shadow_checks = 0
+        self.mismatches = 0
+
+    @classmethod
+    def from_file(cls, path: str, shadow_sample_rate: float = 0.0) -> "TariffEngine":
+        with open(path, "r", encoding="utf-8") as fh:
+            if path.endswith(".json"):
+                data = json.load(fh)
+            else:
+                data = yaml.safe_load(fh)
+
+        tables = {}
+        for entry in data.get("tariffs", []):
+            key = (int(entry["carpark_nr"]), int(entry["card_type"]), int(entry["tariff_id"]))
+            tables[key] = TariffTable(
+                grace_minutes=entry.get("grace_minutes", 0),
+                steps=entry["steps"],
+                daily_max=entry.get("daily_max"),
+            )
+        logger.info("Loaded %d local tariff tables from %s", len(tables), path)
+        return cls(tables, shadow_sample_rate=shadow_sample_rate)
+
+    def has_tariff(self, carpark_nr: int, card_type: int, tariff_id: int) -> bool:
+        return (carpark_nr, card_type, tariff_id) in self.tables
+
+    def quote(self, carpark_nr: int, card_type: int, tariff_id: int, time_entry: datetime, time_exit: datetime):
+        """Returns a calcTariff-shaped dict, or None when the tariff is not configured locally."""
+        table = self.tables.get((carpark_nr, card_type, tariff_id))
+        if table is None:
+            return None
+        seconds = np.array([(time_exit - time_entry).total_seconds()])
+        with self._lock:
+            self.local_quotes += 1
+        return {"AmountDue": float(table.price_seconds(seconds)[0]), "GracePeriod": table.grace_minutes}
+
+    def quote_batch(self, carpark_nr: int, card_type: int, tariff_id: int, entries, exits) -> np.ndarray:
+        """Prices many (entry, exit) pairs of one tariff in a single vectorized pass."""
+        table = self.tables[(carpark_nr, card_type, tariff_id)]
+        # Same duration arithmetic as quote(), so both agree across DST changes
+        seconds = np.fromiter(
+            ((time_exit - time_entry).total_seconds() for time_entry, time_exit in zip(entries, exits)),
+            dtype=np.float64,
+        )
+        with self._lock:
+            self.local_quotes += len(seconds)
+        return table.price_seconds(seconds)
+
+    def quote_many(self, stays) -> dict:
+        """
+        Prices the stays whose tariff is configured locally, one quote_batch
+        pass per tariff. ``stays`` is a sequence of (carpark_nr, card_type,
+        tariff_id, time_entry, time_exit); returns {position: calcTariff-shaped
+        dict}, leaving out stays that need SOAP.
+        """
+        groups = {}
+        for position, (carpark_nr, card_type, tariff_id, time_entry, time_exit) in enumerate(stays):
+            key = (carpark_nr, card_type, tariff_id)
+            if key in self.tables:
+                groups.setdefault(key, []).append((position, time_entry, time_exit))
+
+        quotes = {}
+        for key, members in groups.items():
+            amounts = self.quote_batch(*key, [m[1] for m in members], [m[2] for m in members])
+            grace_minutes = self.tables[key].grace_minutes
+            for (position, _, _), amount in zip(members, amounts.tolist()):
+                quotes[position] = {"AmountDue": amount, "GracePeriod": grace_minutes}
+        return quotes
+
+    def should_shadow(self) -> bool:
+        return self.shadow_sample_rate > 0 and random.random() < self.shadow_sample_rate
+
+    def matches(self, local: dict, soap_result, context: str) -> bool:
+        """Compares a local quote with the SOAP result and logs any divergence."""
+        soap_amount = extract_amount(soap_result)
+        with self._lock:
+            self.shadow_checks += 1
+        if soap_amount is not None and abs(soap_amount - local["AmountDue"]) <= self.tolerance:
+            return True
+        with self._lock:
+            self.mismatches += 1
+        logger.warning(
+            "Local tariff diverged from calcTariff for %s: local=%s soap=%s",
+            context, local["AmountDue"], soap_result,
+        )
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tariffs": len(self.tables),
+                "shadow_sample_rate": self.shadow_sample_rate,
+                "local_quotes": self.local_quotes,
+                "shadow_checks": self.shadow_checks,
+                "mismatches": self.mismatches,
+            }
+
+
+def extract_amount(result):
+    """Best-effort amount from a calcTariff result (dict with an amount field, or a scalar)."""
+    if isinstance(result, dict):
+        for key, value in result.items():
+            if key.lower() in ("amountdue", "amount", "fee"):
+                return extract_amount(value)
+        return None
+    try:
+        return float(result)
+    except (TypeError, ValueError):
+        return None
+
+
+_engine = None
+_engine_loaded = False
+_engine_lock = threading.Lock()
+
+
+def get_tariff_engine():
+    """Returns the engine for TARIFF_TABLE_PATH, or None when no table file is configured."""
+    global _engine, _engine_loaded
+    if _engine_loaded:
+        return _engine
+    with _engine_lock:
+        if not _engine_loaded:
+            path = os.getenv("TARIFF_TABLE_PATH", "")
+            if path:
+                try:
+                    _engine = TariffEngine.from_file(
+                        path,
+                        shadow_sample_rate=float(os.getenv("TARIFF_SHADOW_SAMPLE_RATE", "0.05")),
+                    )
+                except Exception as e:
+                    # A broken table file must not take quoting down; SOAP still works
+                    logger.error("Could not load tariff table %s: %s", path, e)
+                    _engine = None
+            _engine_loaded = True
+    return _engine
+
+
+def reload_tariff_engine():
+    """Re-reads the table file on next use (after a tariff change)."""
+    global _engine, _engine_loaded
+    with _engine_lock:
+        _engine = None
+        _engine_loaded = False
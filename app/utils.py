@@ -1,28 +1,46 @@
-
 # app/utils.py
 import os
+import threading
+import anyio
+import httpx
 import requests
-from zeep import Client, Settings
-from zeep.transports import Transport
+from zeep import AsyncClient, Client, Settings
 from dotenv import load_dotenv
+from app.circuit_breaker import GuardedService, get_breaker
+from app.hedging import HedgedService
+from app.wsdl_cache import CachedAsyncTransport, CachedTransport, get_wsdl_cache, wsdl_offline_mode
 
 # ---------------------------------------------------------------------
 # Load environment early to ensure WSDL URLs are available
 # ---------------------------------------------------------------------
 load_dotenv()
 
+# ---------------------------------------------------------------------
+# Process-wide client registry
+# ---------------------------------------------------------------------
+# Building a zeep.Client downloads and parses the whole WSDL/XSD tree, so
+# each client (and its bound service proxy) is built once per worker and
+# shared by every request. Keyed by WSDL environment variable key.
+_clients: dict = {}
+_services: dict = {}
+_async_clients: dict = {}
+_async_services: dict = {}
+_registry_lock = threading.Lock()
 
-def get_soap_client(wsdl_env_key: str):
-    """
-    Returns a Zeep SOAP client for the given WSDL environment variable key.
+# One non-blocking connection pool shared by every async SOAP client
+_async_http_client = None
 
-    Args:
-        wsdl_env_key (str): The name of the environment variable containing the WSDL URL.
-                            Example: "DESIGNA_WSDL_CASHPOINT_URL"
 
-    Returns:
-        zeep.Client: Configured SOAP client ready for service calls.
-    """
+def _ssl_verify() -> bool:
+    return os.getenv("DESIGNA_SSL_VERIFY", "True").lower() == "true"
+
+
+def _operation_timeout() -> float:
+    # Upper bound for a single SOAP operation (WSDL loading keeps its own 30 s)
+    return float(os.getenv("DESIGNA_OPERATION_TIMEOUT_SECONDS", "30"))
+
+
+def _build_soap_client(wsdl_env_key: str) -> Client:
     wsdl_url = os.getenv(wsdl_env_key)
     if not wsdl_url:
         raise ValueError(f"Missing WSDL URL for environment key: {wsdl_env_key}")
@@ -31,7 +49,7 @@ def get_soap_client(wsdl_env_key: str):
     session = requests.Session()
 
     # SSL verification toggle
-    verify_ssl = os.getenv("DESIGNA_SSL_VERIFY", "True").lower() == "true"
+    verify_ssl = _ssl_verify()
     session.verify = verify_ssl
 
     # Optional: Log insecure warning suppression
@@ -39,10 +57,168 @@ def get_soap_client(wsdl_env_key: str):
         import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    # Configure Zeep transport and settings
-    transport = Transport(session=session, timeout=30)
+    # Configure Zeep transport and settings; WSDL/XSD documents come from the
+    # shared disk cache when present (see app/wsdl_cache.py)
+    transport = CachedTransport(
+        session=session,
+        timeout=30,
+        operation_timeout=_operation_timeout(),
+        cache=get_wsdl_cache(),
+        offline=wsdl_offline_mode(),
+    )
     settings = Settings(strict=False, xml_huge_tree=True)
 
     # Create SOAP client
-    client = Client(wsdl=wsdl_url, transport=transport, settings=settings)
-    return client
+    return Client(wsdl=wsdl_url, transport=transport, settings=settings)
+
+
+def get_soap_client(wsdl_env_key: str):
+    """
+    Returns the shared Zeep SOAP client for the given WSDL environment variable key.
+
+    The client is built on first use and reused for the lifetime of the worker.
+
+    Args:
+        wsdl_env_key (str): The name of the environment variable containing the WSDL URL.
+                            Example: "DESIGNA_WSDL_CASHPOINT_URL"
+
+    Returns:
+        zeep.Client: Configured SOAP client ready for service calls.
+    """
+    client = _clients.get(wsdl_env_key)
+    if client is not None:
+        return client
+
+    with _registry_lock:
+        # Another thread may have finished the build while we waited
+        client = _clients.get(wsdl_env_key)
+        if client is None:
+            client = _build_soap_client(wsdl_env_key)
+            _clients[wsdl_env_key] = client
+            _services[wsdl_env_key] = HedgedService(
+                GuardedService(client.service, get_breaker(wsdl_env_key)), backend=wsdl_env_key
+            )
+        return client
+
+
+def get_soap_service(wsdl_env_key: str):
+    """
+    Returns the bound service proxy (``client.service``) of the shared client,
+    guarded by the backend's circuit breaker (app/circuit_breaker.py); reads
+    are additionally hedged / retried (app/hedging.py).
+
+    Args:
+        wsdl_env_key (str): The name of the environment variable containing the WSDL URL.
+
+    Returns:
+        HedgedService: Proxy whose attributes are the SOAP operations.
+    """
+    service = _services.get(wsdl_env_key)
+    if service is None:
+        get_soap_client(wsdl_env_key)
+        service = _services[wsdl_env_key]
+    return service
+
+
+def reset_soap_clients():
+    """
+    Drops every cached client, sync and async, so the next call rebuilds it
+    (e.g. after a WSDL change). The async clients' WSDL loaders are closed;
+    the shared async connection pool stays open for calls still in flight.
+    """
+    with _registry_lock:
+        _clients.clear()
+        _services.clear()
+        _drop_async_clients()
+
+
+# ---------------------------------------------------------------------
+# Async (httpx) clients for the event-loop routers
+# ---------------------------------------------------------------------
+def _get_async_http_client() -> httpx.AsyncClient:
+    global _async_http_client
+    if _async_http_client is None:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("DESIGNA_ASYNC_MAX_CONNECTIONS", "200")),
+            max_keepalive_connections=int(os.getenv("DESIGNA_ASYNC_MAX_KEEPALIVE", "50")),
+        )
+        _async_http_client = httpx.AsyncClient(
+            verify=_ssl_verify(),
+            timeout=httpx.Timeout(_operation_timeout()),
+            limits=limits,
+        )
+    return _async_http_client
+
+
+def _build_async_soap_client(wsdl_env_key: str) -> AsyncClient:
+    wsdl_url = os.getenv(wsdl_env_key)
+    if not wsdl_url:
+        raise ValueError(f"Missing WSDL URL for environment key: {wsdl_env_key}")
+
+    # WSDL documents are still loaded synchronously (once), operations go
+    # through the shared async pool
+    transport = CachedAsyncTransport(
+        client=_get_async_http_client(),
+        wsdl_client=httpx.Client(verify=_ssl_verify(), timeout=30),
+        cache=get_wsdl_cache(),
+        offline=wsdl_offline_mode(),
+    )
+    settings = Settings(strict=False, xml_huge_tree=True)
+    return AsyncClient(wsdl=wsdl_url, transport=transport, settings=settings)
+
+
+def get_async_soap_client(wsdl_env_key: str):
+    """
+    Returns the shared zeep AsyncClient for the given WSDL environment variable key.
+
+    Building the client parses the WSDL synchronously, so call this once from a
+    worker thread at startup (see app.main) rather than from inside a request.
+    """
+    client = _async_clients.get(wsdl_env_key)
+    if client is not None:
+        return client
+
+    with _registry_lock:
+        client = _async_clients.get(wsdl_env_key)
+        if client is None:
+            client = _build_async_soap_client(wsdl_env_key)
+            _async_clients[wsdl_env_key] = client
+            _async_services[wsdl_env_key] = HedgedService(
+                GuardedService(client.service, get_breaker(wsdl_env_key), is_async=True),
+                backend=wsdl_env_key,
+                is_async=True,
+            )
+        return client
+
+
+async def get_async_soap_service(wsdl_env_key: str):
+    """
+    Returns the breaker-guarded async service proxy; operations must be awaited.
+
+    The client is normally built by the startup preload. If that failed
+    (e.g. Designa was down), the first caller builds it in a worker thread
+    so the WSDL download / parse never blocks the event loop.
+    """
+    service = _async_services.get(wsdl_env_key)
+    if service is None:
+        await anyio.to_thread.run_sync(get_async_soap_client, wsdl_env_key)
+        service = _async_services[wsdl_env_key]
+    return service
+
+
+def _drop_async_clients():
+    # Caller holds _registry_lock
+    for client in _async_clients.values():
+        client.transport.wsdl_client.close()
+    _async_clients.clear()
+    _async_services.clear()
+
+
+async def close_async_soap_clients():
+    """Closes the shared async connection pool (FastAPI shutdown)."""
+    global _async_http_client
+    with _registry_lock:
+        _drop_async_clients()
+        http_client, _async_http_client = _async_http_client, None
+    if http_client is not None:
+        await http_client.aclose()
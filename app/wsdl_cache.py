@@ -0,0 +1,176 @@
+# app/wsdl_cache.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from dotenv import load_dotenv
+from zeep.cache import Base
+from zeep.transports import AsyncTransport, Transport
+
+load_dotenv()
+
+logger = logging.getLogger("app.wsdl_cache")
+
+# Bump when the on-disk layout changes; older layouts are simply ignored.
+CACHE_FORMAT_VERSION = "v1"
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("true", "1", "yes")
+
+
+def wsdl_offline_mode() -> bool:
+    """True when workers must start from the disk cache without touching the network."""
+    return _env_bool("DESIGNA_WSDL_OFFLINE", "False")
+
+
+class HashedFileCache(Base):
+    """
+    Content-addressed zeep cache for WSDL/XSD documents, shared by all workers.
+
+    Layout under ``<cache_dir>/<version>/``:
+        objects/<sha256>        raw document bytes
+        index/<sha256(url)>     JSON record {url, sha256, fetched_at}
+
+    Every read re-hashes the document and discards it if the digest does not
+    match the index record, so a truncated or tampered file is never parsed.
+    Writes go through a temp file + os.replace, which keeps concurrent
+    workers from ever seeing a partial document.
+    """
+
+    def __init__(self, cache_dir: str, max_age_seconds: int = 86400):
+        self.root = os.path.join(cache_dir, CACHE_FORMAT_VERSION)
+        self.max_age_seconds = max_age_seconds
+        self._objects = os.path.join(self.root, "objects")
+        self._index = os.path.join(self.root, "index")
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._index, exist_ok=True)
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self._index, self._digest(url.encode("utf-8")) + ".json")
+
+    def _write_atomic(self, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def add(self, url, content):
+        digest = self._digest(content)
+        object_path = os.path.join(self._objects, digest)
+        try:
+            if not os.path.exists(object_path):
+                self._write_atomic(object_path, content)
+            record = {"url": url, "sha256": digest, "fetched_at": time.time()}
+            self._write_atomic(self._index_path(url), json.dumps(record).encode("utf-8"))
+        except OSError as e:
+            # A read-only or full disk must not stop the worker from starting
+            logger.warning("Could not write WSDL cache entry for %s: %s", url, e)
+
+    def get(self, url, allow_stale: bool = False):
+        try:
+            with open(self._index_path(url), "rb") as fh:
+                record = json.loads(fh.read())
+            with open(os.path.join(self._objects, record["sha256"]), "rb") as fh:
+                content = fh.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if self._digest(content) != record["sha256"]:
+            logger.warning("WSDL cache entry for %s failed hash check, discarding", url)
+            try:
+                os.unlink(self._index_path(url))
+            except OSError:
+                pass
+            return None
+
+        if not allow_stale and self.max_age_seconds > 0:
+            if time.time() - record.get("fetched_at", 0) > self.max_age_seconds:
+                return None
+
+        return content
+
+
+class CachedTransport(Transport):
+    """
+    zeep Transport that serves WSDL/XSD documents from a HashedFileCache.
+
+    In offline mode documents are only ever read from disk. Otherwise an
+    expired entry is refreshed from the network, and kept as a fallback if
+    the Designa server cannot be reached.
+    """
+
+    def __init__(self, *args, offline: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offline = offline
+
+    def _load_remote_data(self, url):
+        return load_with_fallback(self, url, super()._load_remote_data)
+
+
+class CachedAsyncTransport(AsyncTransport):
+    """Async counterpart of CachedTransport (WSDL loading itself stays synchronous)."""
+
+    def __init__(self, *args, offline: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offline = offline
+
+    def _load_remote_data(self, url):
+        return load_with_fallback(self, url, super()._load_remote_data)
+
+
+def load_with_fallback(transport, url, fetch):
+    """Shared by the sync and async cached transports."""
+    cache = transport.cache
+    if transport.offline:
+        content = cache.get(url, allow_stale=True) if cache else None
+        if content is None:
+            raise RuntimeError(
+                f"DESIGNA_WSDL_OFFLINE is set but {url} is not in the WSDL cache; "
+                "run `python -m app.wsdl_cache` once with network access to warm it"
+            )
+        return content
+
+    try:
+        return fetch(url)
+    except Exception:
+        stale = cache.get(url, allow_stale=True) if cache else None
+        if stale is None:
+            raise
+        logger.warning("Fetching %s failed, using cached copy", url, exc_info=True)
+        return stale
+
+
+def get_wsdl_cache():
+    """Returns the configured disk cache, or None when DESIGNA_WSDL_CACHE_DIR is empty."""
+    cache_dir = os.getenv("DESIGNA_WSDL_CACHE_DIR", ".wsdl_cache")
+    if not cache_dir:
+        return None
+    max_age = int(os.getenv("DESIGNA_WSDL_CACHE_MAX_AGE_SECONDS", "86400"))
+    return HashedFileCache(cache_dir, max_age_seconds=max_age)
+
+
+# ---------------------------------------------------------------------
+# Cache warm-up entrypoint (run once per deploy / image build)
+# ---------------------------------------------------------------------
+if __name__ == "__main__":
+    from app.utils import get_soap_client
+
+    # Warming always needs the network, whatever the deployment sets
+    os.environ["DESIGNA_WSDL_OFFLINE"] = "False"
+    for key in ("DESIGNA_WSDL_CASHPOINT_URL", "DESIGNA_WSDL_SERVICE_OPERATION_URL"):
+        if os.getenv(key):
+            get_soap_client(key)
+            print(f"Cached WSDL for {key}")
@@ -0,0 +1,178 @@
+# benchmarks/bench_hit_codec.py
+"""
+Build and parse cost per HIT transaction type: the codec in
+app/services/hit_codec.py against the per-function f-strings and
+text-based parsing it replaced.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_hit_codec [--repeat 20000]
+"""
+import argparse
+import html
+import timeit
+import xml.etree.ElementTree as ET
+
+from app.services.hit_codec import TEMPLATES, build_generic, parse_response
+
+CREDENTIALS = {"user": "GatewayPOS", "key": "0123456789abcdef0123456789abcdef"}
+
+REQUESTS = {
+    "Purchase": {**CREDENTIALS, "amount": 12.5, "currency": "NZD", "station": "2040001", "txnRef": "TXN-000123",
+                 "deviceId": "EXIT-01", "posName": "Designa Gateway", "posVersion": "1.0", "vendorId": "DESIGNA",
+                 "mref": "Ticket 0123456789"},
+    "Refund": {**CREDENTIALS, "amount": 12.5, "currency": "NZD", "station": "2040001", "txnRef": "TXN-000124",
+               "dpsTxnRef": "0000000a1b2c3d4e", "deviceId": "EXIT-01", "posName": "Designa Gateway",
+               "vendorId": "DESIGNA", "mref": "Ticket 0123456789"},
+    "Reversal": {**CREDENTIALS, "station": "2040001", "txnRef": "TXN-000123"},
+    "Status": {**CREDENTIALS, "station": "2040001", "txnRef": "TXN-000123"},
+    "Receipt": {**CREDENTIALS, "station": "2040001", "txnRef": "TXN-000123", "receiptType": 2, "duplicateFlag": 0},
+    "EnterData": {**CREDENTIALS, "station": "2040001", "cmdSeq": 1, "promptId": 3, "timeout": 30},
+    "UI": {**CREDENTIALS, "station": "2040001", "name": "B1", "val": "YES", "txnRef": "TXN-000123"},
+    "PinpadDisplay": {**CREDENTIALS, "station": "2040001", "cmdSeq": 1, "promptId": 3,
+                      "param1": "Amount due", "param2": "$12.50", "timeout": 30},
+}
+
+
+def legacy_build(txn_type: str, data: dict) -> str:
+    """The request bodies as the send_hit_* functions used to render them."""
+    e = html.escape
+    head = f'<Scr action="doScrHIT" user="{e(data["user"])}" key="{e(data["key"])}">'
+    if txn_type == "Purchase":
+        return f"""
+{head}
+    <Amount>{data['amount']}</Amount>
+    <Cur>{e(data['currency'])}</Cur>
+    <TxnType>Purchase</TxnType>
+    <Station>{e(data['station'])}</Station>
+    <TxnRef>{e(data['txnRef'])}</TxnRef>
+    <DeviceId>{e(data['deviceId'])}</DeviceId>
+    {f"<PosName>{data['posName']}</PosName>" if data.get("posName") else ""}
+    {f"<PosVersion>{data['posVersion']}</PosVersion>" if data.get("posVersion") else ""}
+    {f"<VendorId>{data['vendorId']}</VendorId>" if data.get("vendorId") else ""}
+    {f"<MRef>{data['mref']}</MRef>" if data.get("mref") else ""}
+</Scr>
+""".strip()
+    if txn_type == "Refund":
+        return f"""
+{head}
+    <Amount>{data['amount']}</Amount>
+    <Cur>{e(data['currency'])}</Cur>
+    <TxnType>Refund</TxnType>
+    <Station>{e(data['station'])}</Station>
+    <TxnRef>{e(data['txnRef'])}</TxnRef>
+    <DpsTxnRef>{e(data['dpsTxnRef'])}</DpsTxnRef>
+    <DeviceId>{e(data['deviceId'])}</DeviceId>
+    <PosName>{e(data['posName'])}</PosName>
+    <VendorId>{e(data['vendorId'])}</VendorId>
+    <MRef>{e(data['mref'])}</MRef>
+</Scr>
+""".strip()
+    if txn_type in ("Reversal", "Status"):
+        return f"""
+{head}
+    <TxnType>{txn_type}</TxnType>
+    <Station>{data['station']}</Station>
+    <TxnRef>{data['txnRef']}</TxnRef>
+</Scr>
+""".strip()
+    if txn_type == "Receipt":
+        return f"""
+{head}
+    <Station>{e(data['station'])}</Station>
+    <TxnType>Receipt</TxnType>
+    <TxnRef>{e(data['txnRef'])}</TxnRef>
+    <ReceiptType>{data['receiptType']}</ReceiptType>
+    <DuplicateFlag>{data.get('duplicateFlag', 0)}</DuplicateFlag>
+</Scr>"""
+    if txn_type == "EnterData":
+        return f"""
+{head}
+    <Station>{e(data['station'])}</Station>
+    <TxnType>EnterData</TxnType>
+    <CmdSeq>{data['cmdSeq']}</CmdSeq>
+    <PromptId>{data['promptId']}</PromptId>
+    <Timeout>{data['timeout']}</Timeout>
+</Scr>
+""".strip()
+    if txn_type == "UI":
+        return f"""
+{head}
+    <Station>{e(data['station'])}</Station>
+    <TxnType>UI</TxnType>
+    <UiType>Bn</UiType>
+    <Name>{e(data['name'])}</Name>
+    <Val>{e(data['val'])}</Val>
+    <TxnRef>{e(data['txnRef'])}</TxnRef>
+</Scr>
+""".strip()
+    body = head
+    for key, value in data.items():
+        if key not in ["user", "key"]:
+            body += f"<{key}>{e(str(value))}</{key}>"
+    return body + f"<TxnType>{txn_type}</TxnType></Scr>"
+
+
+def codec_build(txn_type: str, data: dict) -> str:
+    template = TEMPLATES.get(txn_type)
+    return template.build(data) if template is not None else build_generic(txn_type, data)
+
+
+def sample_response(txn_type: str) -> bytes:
+    """A Windcave-shaped response: the transaction fields plus the common status block."""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<Scr action="doScrHIT">'
+        "<Complete>1</Complete>"
+        f"<TxnType>{txn_type}</TxnType>"
+        "<StatusId>6</StatusId>"
+        "<TxnStatusId>3</TxnStatusId>"
+        "<TxnRef>TXN-000123</TxnRef>"
+        "<DpsTxnRef>0000000a1b2c3d4e</DpsTxnRef>"
+        "<AuthCode>123456</AuthCode>"
+        "<ReCo>00</ReCo>"
+        "<RcptW>40</RcptW>"
+        "<Rcpt>AMOUNT                NZD 12.50\nAPPROVED &amp; COMPLETED</Rcpt>"
+        "<Result><AP>1</AP><RC>00</RC><RT>APPROVED</RT><DT>APPROVED</DT></Result>"
+        "</Scr>"
+    ).encode()
+
+
+def legacy_parse(body: bytes, txn_type: str) -> dict:
+    # What the send_hit_* functions did: decode via httpx Response.text, then parse the str
+    root = ET.fromstring(body.decode("utf-8"))
+    parsed = {child.tag: child.text for child in root}
+    parsed["TxnType"] = txn_type
+    return parsed
+
+
+def bench(label: str, fn, repeat: int):
+    best = min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat
+    print(f"  {label:<44} {best * 1e6:10.2f} us")
+    return best
+
+
+def build_costs(repeat: int):
+    print("Request build, per call")
+    for txn_type, data in REQUESTS.items():
+        before = bench(f"{txn_type}: f-string + html.escape", lambda: legacy_build(txn_type, data), repeat)
+        after = bench(f"{txn_type}: codec", lambda: codec_build(txn_type, data), repeat)
+        print(f"  {'':<44} {before / after:10.1f}x")
+
+
+def parse_costs(repeat: int):
+    print("Response parse, per call")
+    for txn_type in REQUESTS:
+        body = sample_response(txn_type)
+        assert parse_response(body, txn_type).to_dict() == legacy_parse(body, txn_type)
+        before = bench(f"{txn_type}: decode + ET.fromstring(str)", lambda: legacy_parse(body, txn_type), repeat)
+        after = bench(f"{txn_type}: parse_response(bytes)", lambda: parse_response(body, txn_type), repeat)
+        print(f"  {'':<44} {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000, help="calls per timing run")
+    args = parser.parse_args()
+    build_costs(args.repeat)
+    parse_costs(args.repeat)
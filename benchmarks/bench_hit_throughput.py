@@ -0,0 +1,164 @@
+# benchmarks/bench_hit_throughput.py
+"""
+Throughput and tail latency of the gateway's /hit/* routes against the
+local HIT simulator (benchmarks/hit_simulator.py).
+
+By default everything runs in one process: the gateway app and the
+simulator are wired together with httpx.ASGITransport, so no sockets and
+no SOAP backend are involved (the FastAPI lifespan is not run). The load
+generator, gateway and simulator share one event loop, so the numbers are
+the gateway's own overhead on top of the simulated HIT latency.
+
+    python -m benchmarks.bench_hit_throughput [--scenario purchase] [--concurrency 20]
+        [--duration 10] [--latency lognormal:40:0.4] [--card-time lognormal:3000:0.3]
+
+With ``--gateway URL`` the load goes to a running gateway over HTTP
+instead; start the simulator separately and point the gateway's
+HIT_ENDPOINT at it.
+
+Scenarios: ``purchase`` (Purchase, Status polls until complete, Receipt;
+retried after TERMINAL BUSY) or a single route hammered in a loop:
+``status``, ``ping``, ``settlement_summary``.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import time
+
+# Keep sampled HIT payload logs out of the report (before the app reads its config)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from app.auth.jwt_handler import create_access_token
+from benchmarks.hit_simulator import SimulatorConfig, create_app
+
+CREDENTIALS = {"user": "GatewayPOS", "key": "0123456789abcdef0123456789abcdef"}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}     # route -> [seconds]
+        self.errors = {}        # route -> count
+        self.transactions = 0
+        self.busy = 0
+
+    async def post(self, client: httpx.AsyncClient, route: str, body: dict):
+        started = time.perf_counter()
+        try:
+            response = await client.post(route, json=body)
+        except httpx.HTTPError:
+            self.errors[route] = self.errors.get(route, 0) + 1
+            return None
+        self.latencies.setdefault(route, []).append(time.perf_counter() - started)
+        if response.status_code != 200:
+            self.errors[route] = self.errors.get(route, 0) + 1
+            return None
+        return response.json().get("windcave", {})
+
+    def report(self, elapsed: float):
+        print(f"{'route':<28}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for route, samples in sorted(self.latencies.items()):
+            samples.sort()
+
+            def pct(p):
+                return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+            print(f"{route:<28}{len(samples):>10}{self.errors.get(route, 0):>8}{len(samples) / elapsed:>10.1f}"
+                  f"{pct(0.50):>10.1f}{pct(0.95):>10.1f}{pct(0.99):>10.1f}{samples[-1] * 1000:>10.1f}")
+        total = sum(len(samples) for samples in self.latencies.values())
+        print(f"{'total':<28}{total:>10}{sum(self.errors.values()):>8}{total / elapsed:>10.1f}")
+        if self.transactions or self.busy:
+            print(f"completed transactions: {self.transactions} ({self.transactions / elapsed:.1f}/s), "
+                  f"TERMINAL BUSY answers: {self.busy}")
+
+
+async def purchase_flow(client, recorder: Recorder, station: str, refs, poll_seconds: float, deadline: float):
+    while time.monotonic() < deadline:
+        txn_ref = f"{station}-{next(refs)}"
+        started = await recorder.post(client, "/hit/purchase", {
+            **CREDENTIALS, "amount": 12.5, "currency": "NZD", "station": station,
+            "txnRef": txn_ref, "deviceId": station, "mref": txn_ref,
+        })
+        if started is None:
+            continue
+        if started.get("ReCo") == "TB":
+            recorder.busy += 1
+            await asyncio.sleep(poll_seconds)
+            continue
+        status = {}
+        while status.get("Complete") != "1" and time.monotonic() < deadline:
+            await asyncio.sleep(poll_seconds)
+            status = await recorder.post(client, "/hit/status", {**CREDENTIALS, "station": station, "txnRef": txn_ref}) or {}
+        if status.get("Complete") == "1":
+            await recorder.post(client, "/hit/receipt", {
+                **CREDENTIALS, "station": station, "txnRef": txn_ref, "receiptType": 2,
+            })
+            recorder.transactions += 1
+
+
+async def single_route(client, recorder: Recorder, route: str, body: dict, deadline: float):
+    while time.monotonic() < deadline:
+        await recorder.post(client, route, body)
+
+
+async def run(args):
+    headers = {"Authorization": f"Bearer {create_access_token({'tcc_num': 15})}"}
+    if args.gateway:
+        client = httpx.AsyncClient(base_url=args.gateway, headers=headers, timeout=60)
+    else:
+        from app.main import app as gateway
+        from app.services.Hit_Services import close_hit_client, start_hit_client
+
+        simulator = create_app(SimulatorConfig(
+            latency=args.latency,
+            card_time=args.card_time,
+            error_rate=args.error_rate,
+            decline_rate=args.decline_rate,
+            busy_rate=args.busy_rate,
+            seed=1,
+        ))
+        await start_hit_client(transport=httpx.ASGITransport(app=simulator))
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=gateway), base_url="http://gateway",
+                                   headers=headers, timeout=60)
+
+    recorder = Recorder()
+    refs = itertools.count(1)
+    started = time.monotonic()
+    deadline = started + args.duration
+    if args.scenario == "purchase":
+        workers = [
+            purchase_flow(client, recorder, f"SIM{n:03d}", refs, args.poll_ms / 1000, deadline)
+            for n in range(args.concurrency)
+        ]
+    else:
+        route = f"/hit/{args.scenario}"
+        body = {**CREDENTIALS} if args.scenario == "ping" else {**CREDENTIALS, "station": "SIM000"}
+        if args.scenario == "status":
+            body["txnRef"] = "SIM000-0"
+        workers = [single_route(client, recorder, route, body, deadline) for _ in range(args.concurrency)]
+
+    async with client:
+        await asyncio.gather(*workers)
+    elapsed = time.monotonic() - started
+    if not args.gateway:
+        await close_hit_client()
+
+    print(f"scenario={args.scenario} concurrency={args.concurrency} duration={elapsed:.1f}s")
+    recorder.report(elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="purchase", choices=["purchase", "status", "ping", "settlement_summary"])
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients (one station each)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--poll-ms", type=float, default=250, help="Status poll interval in the purchase scenario")
+    parser.add_argument("--gateway", help="base URL of a running gateway instead of the in-process app")
+    parser.add_argument("--latency", default="lognormal:40:0.4", help="simulator response latency spec")
+    parser.add_argument("--card-time", default="lognormal:3000:0.3", help="simulator time until a Purchase completes")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--decline-rate", type=float, default=0.0)
+    parser.add_argument("--busy-rate", type=float, default=0.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,119 @@
+# benchmarks/bench_json_responses.py
+"""
+Per-request serialization cost of the old response path (dict ->
+response_model validation / jsonable_encoder -> stdlib json) against the
+gateway's response layer (app/responses.py).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_json_responses [--rows 500] [--repeat 200]
+"""
+import argparse
+import timeit
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.responses import FastJSONResponse, model_json, trusted_json
+from app.routers.Tickets import AmountDueResponse
+
+
+def card_info_payload(rows: int) -> dict:
+    """Shaped like serialize_object(GetCardInfo): nested OrderedDicts, Decimals, datetimes."""
+    now = datetime(2025, 1, 1, 8, 0, 0)
+    return {
+        "cardInfo": OrderedDict(
+            CardNumber="0123456789012345",
+            CardType=3,
+            EntryTime=now,
+            AmountDue=Decimal("12.50"),
+            Transactions=[
+                OrderedDict(
+                    TransactionNr=i,
+                    DeviceNr=100 + i % 20,
+                    Time=now + timedelta(minutes=i),
+                    Amount=Decimal("1.25"),
+                    Rebates=[OrderedDict(Type=1, Value=Decimal("0.50"), Account=7)],
+                )
+                for i in range(rows)
+            ],
+        )
+    }
+
+
+def counters_payload(rows: int) -> dict:
+    return {
+        "counters": [
+            OrderedDict(CarParkNr=1, CounterNr=i, CurrentLevel=i * 3, MaxLevel=500, Free=500 - i * 3)
+            for i in range(rows)
+        ]
+    }
+
+
+AMOUNT_DUE = {"card_number": "0123456789", "amount_due": "12.50", "quote": "x" * 180, "quote_expires_at": 1735718400}
+
+
+def bench(label: str, fn, repeat: int):
+    best = min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat
+    print(f"  {label:<44} {best * 1e6:10.1f} us")
+    return best
+
+
+def encode_only(rows: int, repeat: int):
+    print(f"Encoding only ({rows} rows)")
+    for name, payload in (("GetCardInfo", card_info_payload(rows)), ("getCarParkCounterExt", counters_payload(rows))):
+        before = bench(f"{name}: jsonable_encoder + json", lambda: JSONResponse(jsonable_encoder(payload)).body, repeat)
+        after = bench(f"{name}: trusted_json (orjson)", lambda: trusted_json(payload).body, repeat)
+        print(f"  {'':<44} {before / after:10.1f}x")
+    before = bench("AmountDueResponse: validate + encoder + json",
+                   lambda: JSONResponse(jsonable_encoder(AmountDueResponse(**AMOUNT_DUE))).body, repeat * 10)
+    after = bench("AmountDueResponse: model_json", lambda: model_json(AmountDueResponse, AMOUNT_DUE).body, repeat * 10)
+    print(f"  {'':<44} {before / after:10.1f}x")
+
+
+def end_to_end(rows: int, repeat: int):
+    print(f"Full request through FastAPI ({rows} rows)")
+    payload = card_info_payload(rows)
+
+    old_app = FastAPI()
+    new_app = FastAPI(default_response_class=FastJSONResponse)
+
+    @old_app.get("/card")
+    def old_card():
+        return payload
+
+    @new_app.get("/card")
+    def new_card():
+        return trusted_json(payload)
+
+    @old_app.get("/amount", response_model=AmountDueResponse)
+    def old_amount():
+        return AMOUNT_DUE
+
+    @new_app.get("/amount", response_model=AmountDueResponse)
+    def new_amount():
+        return model_json(AmountDueResponse, AMOUNT_DUE)
+
+    with TestClient(old_app) as old, TestClient(new_app) as new:
+        assert old.get("/card").json() == new.get("/card").json()
+        assert old.get("/amount").json() == new.get("/amount").json()
+        before = bench("GetCardInfo: before", lambda: old.get("/card"), repeat)
+        after = bench("GetCardInfo: after", lambda: new.get("/card"), repeat)
+        print(f"  {'':<44} {before / after:10.1f}x")
+        before = bench("AmountDueResponse: before", lambda: old.get("/amount"), repeat)
+        after = bench("AmountDueResponse: after", lambda: new.get("/amount"), repeat)
+        print(f"  {'':<44} {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="transactions / counter rows per payload")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per timing run")
+    args = parser.parse_args()
+    encode_only(args.rows, args.repeat)
+    end_to_end(args.rows, max(args.repeat // 4, 10))
@@ -0,0 +1,274 @@
+# benchmarks/hit_simulator.py
+"""
+Local Windcave HIT simulator for load-testing the gateway's /hit/* routes
+without the network.
+
+Implements Purchase, Refund, Reversal, Status, Receipt, EnterData, UI,
+Ping and SettlementSummary (anything else gets a generic acknowledgement)
+with configurable response latency, HTTP errors, malformed bodies,
+declines and terminal "busy" behavior:
+
+- Purchase / Refund start a transaction on the station. The terminal
+  stays busy for the simulated card time; Status polls see
+  ``Complete=0`` until then, then the approved / declined result.
+- A Purchase / Refund on a station that is still busy is answered with
+  ``ReCo=TB`` / ``TERMINAL BUSY`` (``--busy-rate`` adds random ones).
+
+Latency specs (milliseconds): ``fixed:50``, ``uniform:20:80``,
+``lognormal:40:0.4`` (median, sigma) or ``exp:40`` (mean).
+
+Separate process (then set HIT_ENDPOINT=http://127.0.0.1:8766/hit/pos.aspx):
+
+    python -m benchmarks.hit_simulator [--port 8766] [--latency lognormal:40:0.4]
+        [--latency-for Purchase=fixed:150] [--card-time lognormal:3000:0.3]
+        [--error-rate 0.01] [--malformed-rate 0] [--decline-rate 0.05] [--busy-rate 0]
+
+In-process: ``create_app(SimulatorConfig(...))`` and hand the gateway an
+``httpx.ASGITransport`` to it (see benchmarks/bench_hit_throughput.py).
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.services.hit_codec import escape
+
+
+class Latency:
+    """A latency distribution parsed from a ``kind:arg[:arg]`` spec, sampled in seconds."""
+
+    def __init__(self, spec: str):
+        kind, *args = spec.split(":")
+        if kind not in ("fixed", "uniform", "lognormal", "exp") or len(args) < (2 if kind == "uniform" else 1):
+            raise ValueError(f"Unknown latency spec {spec!r}")
+        self.spec = spec
+        self.kind = kind
+        # Times are given in ms; the lognormal sigma is unitless
+        self.args = [float(arg) / 1000 if i == 0 or kind == "uniform" else float(arg) for i, arg in enumerate(args)]
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(self.args[0], self.args[1])
+        if self.kind == "lognormal":
+            median, sigma = self.args[0], (self.args[1] if len(self.args) > 1 else 0.5)
+            return median * rng.lognormvariate(0, sigma)
+        return rng.expovariate(1 / self.args[0]) if self.args[0] > 0 else 0.0
+
+
+@dataclass
+class SimulatorConfig:
+    latency: str = "lognormal:40:0.4"
+    latency_for: dict = field(default_factory=dict)     # TxnType -> latency spec
+    card_time: str = "lognormal:3000:0.3"
+    error_rate: float = 0.0       # HTTP 503, no body
+    malformed_rate: float = 0.0   # HTTP 200, not XML
+    decline_rate: float = 0.0
+    busy_rate: float = 0.0        # random TERMINAL BUSY on Purchase / Refund
+    seed: int = None
+
+
+class HitSimulator:
+    """Terminal and transaction state behind the simulated endpoint."""
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.latency = Latency(config.latency)
+        self.latency_for = {txn_type: Latency(spec) for txn_type, spec in config.latency_for.items()}
+        self.card_time = Latency(config.card_time)
+        self.transactions = {}    # (station, txn ref) -> transaction
+        self.active = {}          # station -> txn ref in progress
+        self.dps_refs = itertools.count(0x0000000A00000000)
+        self.counts = {}
+
+    # -----------------------------------------------------------------
+    # Dispatch
+    # -----------------------------------------------------------------
+    async def handle(self, body: bytes) -> Response:
+        try:
+            root = ET.fromstring(body)
+        except ET.ParseError:
+            return Response("Invalid XML", status_code=400, media_type="text/plain")
+        request = {child.tag: child.text or "" for child in root}
+        txn_type = request.get("TxnType", "")
+        self.counts[txn_type] = self.counts.get(txn_type, 0) + 1
+
+        await asyncio.sleep(self.latency_for.get(txn_type, self.latency).sample(self.rng))
+        if self.rng.random() < self.config.error_rate:
+            self.counts["http_errors"] = self.counts.get("http_errors", 0) + 1
+            return Response(status_code=503)
+        if self.rng.random() < self.config.malformed_rate:
+            self.counts["malformed"] = self.counts.get("malformed", 0) + 1
+            return Response("<html>Gateway Timeout", media_type="text/html")
+
+        handler = getattr(self, f"_{txn_type.lower()}", self._acknowledge)
+        return self._xml(txn_type, handler(request))
+
+    @staticmethod
+    def _xml(txn_type: str, fields: dict) -> Response:
+        body = "".join(f"<{tag}>{escape(value)}</{tag}>" for tag, value in fields.items() if value is not None)
+        return Response(
+            f'<?xml version="1.0" encoding="utf-8"?><Scr action="doScrHIT"><TxnType>{escape(txn_type)}</TxnType>{body}</Scr>',
+            media_type="application/xml",
+        )
+
+    def _release_finished(self, station: str, now: float):
+        txn_ref = self.active.get(station)
+        if txn_ref is not None and self.transactions[(station, txn_ref)]["completes_at"] <= now:
+            del self.active[station]
+
+    # -----------------------------------------------------------------
+    # Transaction types
+    # -----------------------------------------------------------------
+    def _start_transaction(self, request: dict) -> dict:
+        station, txn_ref = request.get("Station", ""), request.get("TxnRef", "")
+        now = time.monotonic()
+        self._release_finished(station, now)
+        if station in self.active or self.rng.random() < self.config.busy_rate:
+            self.counts["busy"] = self.counts.get("busy", 0) + 1
+            return {"Complete": "1", "StatusId": "6", "TxnRef": txn_ref, "ReCo": "TB", "ResponseText": "TERMINAL BUSY"}
+        self.transactions[(station, txn_ref)] = {
+            "amount": request.get("Amount", "0"),
+            "completes_at": now + self.card_time.sample(self.rng),
+            "approved": self.rng.random() >= self.config.decline_rate,
+            "dps_txn_ref": f"{next(self.dps_refs):016x}",
+            "reversed": False,
+        }
+        self.active[station] = txn_ref
+        return {"Complete": "0", "StatusId": "2", "TxnStatusId": "1", "TxnRef": txn_ref}
+
+    def _purchase(self, request: dict) -> dict:
+        return self._start_transaction(request)
+
+    def _refund(self, request: dict) -> dict:
+        return self._start_transaction(request)
+
+    def _status(self, request: dict) -> dict:
+        station, txn_ref = request.get("Station", ""), request.get("TxnRef", "")
+        transaction = self.transactions.get((station, txn_ref))
+        if transaction is None:
+            return {"Complete": "1", "StatusId": "6", "TxnRef": txn_ref, "ReCo": "TN", "ResponseText": "TXN NOT FOUND"}
+        now = time.monotonic()
+        self._release_finished(station, now)
+        if transaction["completes_at"] > now:
+            return {"Complete": "0", "StatusId": "2", "TxnStatusId": "1", "TxnRef": txn_ref, "DL1": "PRESENT CARD"}
+        approved = transaction["approved"] and not transaction["reversed"]
+        return {
+            "Complete": "1",
+            "StatusId": "6",
+            "TxnStatusId": "3",
+            "TxnRef": txn_ref,
+            "DpsTxnRef": transaction["dps_txn_ref"],
+            "Amount": transaction["amount"],
+            "AuthCode": f"{self.rng.randrange(1000000):06d}" if approved else None,
+            "ReCo": "00" if approved else ("RV" if transaction["reversed"] else "05"),
+            "ResponseText": "APPROVED" if approved else ("REVERSED" if transaction["reversed"] else "DECLINED"),
+        }
+
+    def _reversal(self, request: dict) -> dict:
+        station, txn_ref = request.get("Station", ""), request.get("TxnRef", "")
+        transaction = self.transactions.get((station, txn_ref))
+        if transaction is None:
+            return {"Complete": "1", "TxnRef": txn_ref, "ReCo": "TN", "ResponseText": "TXN NOT FOUND"}
+        transaction["reversed"] = True
+        if self.active.get(station) == txn_ref:
+            del self.active[station]
+        return {"Complete": "1", "TxnRef": txn_ref, "ReCo": "00", "ResponseText": "REVERSED"}
+
+    def _receipt(self, request: dict) -> dict:
+        txn_ref = request.get("TxnRef", "")
+        transaction = self.transactions.get((request.get("Station", ""), txn_ref), {})
+        return {
+            "Complete": "1",
+            "TxnRef": txn_ref,
+            "RcptW": "40",
+            "Rcpt": f"AMOUNT{transaction.get('amount', '0.00'):>34}\nREF {txn_ref}\n"
+                    + ("APPROVED" if transaction.get("approved") else "NOT APPROVED"),
+        }
+
+    def _enterdata(self, request: dict) -> dict:
+        return {"Complete": "1", "CmdSeq": request.get("CmdSeq"), "Data": "1234"}
+
+    def _ui(self, request: dict) -> dict:
+        return {"Complete": "1", "TxnRef": request.get("TxnRef"), "Name": request.get("Name"), "Val": request.get("Val")}
+
+    def _ping(self, request: dict) -> dict:
+        return {"Complete": "1", "StatusId": "1", "ReCo": "00", "ResponseText": "PONG"}
+
+    def _settlementsummary(self, request: dict) -> dict:
+        approved = [t for t in self.transactions.values() if t["approved"] and not t["reversed"]]
+        return {
+            "Complete": "1",
+            "ReCo": "00",
+            "Count": str(len(approved)),
+            "Total": f"{sum(float(t['amount']) for t in approved):.2f}",
+        }
+
+    def _acknowledge(self, request: dict) -> dict:
+        return {"Complete": "1", "ReCo": "00"}
+
+    def stats(self) -> dict:
+        return {
+            "requests": dict(self.counts),
+            "transactions": len(self.transactions),
+            "busy_stations": len(self.active),
+        }
+
+
+def create_app(config: SimulatorConfig = None) -> FastAPI:
+    simulator = HitSimulator(config or SimulatorConfig())
+    app = FastAPI(title="Windcave HIT simulator")
+    app.state.simulator = simulator
+
+    @app.get("/stats")
+    async def stats():
+        return JSONResponse(simulator.stats())
+
+    @app.post("/{path:path}")
+    async def hit(path: str, request: Request):
+        return await simulator.handle(await request.body())
+
+    return app
+
+
+def _latency_override(value: str) -> tuple:
+    txn_type, _, spec = value.partition("=")
+    Latency(spec)
+    return txn_type, spec
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", default="lognormal:40:0.4", help="default response latency spec")
+    parser.add_argument("--latency-for", type=_latency_override, action="append", default=[],
+                        metavar="TXNTYPE=SPEC", help="latency spec for one transaction type")
+    parser.add_argument("--card-time", default="lognormal:3000:0.3", help="time until a Purchase / Refund completes")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--decline-rate", type=float, default=0.0)
+    parser.add_argument("--busy-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    config = SimulatorConfig(
+        latency=args.latency,
+        latency_for=dict(args.latency_for),
+        card_time=args.card_time,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        decline_rate=args.decline_rate,
+        busy_rate=args.busy_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
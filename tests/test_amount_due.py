@@ -0,0 +1,66 @@
+# tests/test_amount_due.py
+import asyncio
+
+import pytest
+
+from app import Soap
+from app.auth import quote_token
+from app.auth.quote_token import QuoteLedger, create_quote, redeem_quote
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(quote_token, "quote_ledger", QuoteLedger(str(tmp_path / "quotes.sqlite3"), ttl_seconds=30))
+    Soap._amount_due_cache.clear()
+    reads = []
+
+    async def fetch(tcc_num, card_number):
+        reads.append(card_number)
+        await asyncio.sleep(0.05)
+        return "5.00"
+
+    monkeypatch.setattr(Soap, "_fetch_amount_due_async", fetch)
+    yield reads
+    Soap._amount_due_cache.clear()
+
+
+def test_lookups_are_served_from_the_cache(isolated):
+    async def main():
+        first = await Soap.read_amount_due_async(15, "CARD")
+        second = await Soap.read_amount_due_async(15, "CARD")
+        return first, second
+
+    (amount, read_at), second = asyncio.run(main())
+    assert amount == "5.00"
+    assert second == (amount, read_at)
+    assert isolated == ["CARD"]
+
+
+def test_quote_from_a_joined_read_is_revoked_by_a_write_during_it(isolated):
+    async def main():
+        leader = asyncio.create_task(Soap.read_amount_due_async(15, "CARD"))
+        await asyncio.sleep(0.01)
+        await Soap.invalidate_amount_due_async("CARD")      # settlement through another request
+        joined = await Soap.read_amount_due_async(15, "CARD")
+        return await leader, joined
+
+    leader, (amount, read_at) = asyncio.run(main())
+    assert isolated == ["CARD"]
+    assert read_at == leader[1]                             # stamped with the leader's read time
+    token, _ = create_quote("CARD", 15, amount, read_at)
+    assert redeem_quote(token, "CARD", 15) is None
+
+
+def test_read_overtaken_by_a_write_is_not_cached(isolated):
+    async def main():
+        leader = asyncio.create_task(Soap.read_amount_due_async(15, "CARD"))
+        await asyncio.sleep(0.01)
+        await Soap.invalidate_amount_due_async("CARD")
+        await leader
+        amount, read_at = await Soap.read_amount_due_async(15, "CARD")
+        return amount, read_at
+
+    amount, read_at = asyncio.run(main())
+    assert isolated == ["CARD", "CARD"]
+    token, _ = create_quote("CARD", 15, amount, read_at)
+    assert redeem_quote(token, "CARD", 15) == "5.00"
@@ -0,0 +1,48 @@
+# tests/test_cache.py
+from types import SimpleNamespace
+
+from app.cache import TTLCache
+
+
+def test_set_with_stale_generation_is_dropped():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    generation = cache.generation
+    cache.invalidate("card")            # a write lands while the read is in flight
+    cache.set("card", "old", generation)
+    assert cache.get("card") is None
+
+    cache.set("card", "new", cache.generation)
+    assert cache.get("card") == "new"
+
+
+def test_invalidate_where_drops_matching_keys_only():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set((15, "A"), 1)
+    cache.set((20, "A"), 2)
+    cache.set((15, "B"), 3)
+    generation = cache.generation
+    cache.invalidate_where(lambda key: key[1] == "A")
+    assert cache.generation == generation + 1
+    assert cache.get((15, "A")) is None
+    assert cache.get((20, "A")) is None
+    assert cache.get((15, "B")) == 3
+
+
+def test_lru_eviction_and_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = TTLCache(max_size=2, ttl_seconds=5)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)                   # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] += 5
+    assert cache.get("a") is None
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache(max_size=10, ttl_seconds=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
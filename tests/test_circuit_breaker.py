@@ -0,0 +1,108 @@
+# tests/test_circuit_breaker.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from zeep.exceptions import Fault
+
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, GuardedService
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.circuit_breaker.time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _breaker(**overrides):
+    options = dict(window_size=4, min_calls=4, failure_rate=0.5, slow_call_seconds=5,
+                   slow_call_rate=0.5, open_seconds=10, half_open_probes=2)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def _open(breaker):
+    for failed in (True, True, False, False):
+        breaker.before_call()
+        breaker.record(0.1, failed=failed)
+    assert breaker.state == OPEN
+
+
+def test_opens_on_failure_rate_and_rejects(clock):
+    breaker = _breaker()
+    _open(breaker)
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.status_code == 503
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_opens_on_slow_calls(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.before_call()
+        breaker.record(6.0, failed=False)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probes_close_the_breaker(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock[0] += 10
+    breaker.before_call()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()          # only half_open_probes trial calls
+    breaker.record(0.1, failed=False)
+    assert breaker.state == HALF_OPEN
+    breaker.record(0.1, failed=False)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens(clock):
+    breaker = _breaker()
+    _open(breaker)
+    clock[0] += 10
+    breaker.before_call()
+    breaker.record(0.1, failed=True)
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_cancelled_probe_is_neutral(clock):
+    breaker = _breaker(half_open_probes=1)
+    _open(breaker)
+    clock[0] += 10
+
+    class Slow:
+        async def getAmountDue(self):
+            await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.create_task(GuardedService(Slow(), breaker, is_async=True).getAmountDue())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()              # the probe slot was released
+    breaker.record(0.1, failed=False)
+    assert breaker.state == CLOSED
+
+
+def test_soap_faults_do_not_count_as_failures(clock):
+    breaker = _breaker()
+
+    class Service:
+        def getAmountDue(self):
+            raise Fault("Unknown card")
+
+    guarded = GuardedService(Service(), breaker)
+    for _ in range(4):
+        with pytest.raises(Fault):
+            guarded.getAmountDue()
+    assert breaker.state == CLOSED
@@ -0,0 +1,109 @@
+# tests/test_hedging.py
+import asyncio
+import threading
+import time
+
+import pytest
+from zeep.exceptions import Fault
+
+from app import hedging
+from app.hedging import HedgedService, RetryBudget
+
+
+@pytest.fixture(autouse=True)
+def hedging_enabled(monkeypatch):
+    monkeypatch.setenv("HEDGE_ENABLED", "true")
+    monkeypatch.setenv("HEDGE_MIN_SAMPLES", "1")
+    monkeypatch.setenv("HEDGE_MIN_DELAY_MS", "20")
+    monkeypatch.setenv("READ_RETRY_ATTEMPTS", "0")
+    monkeypatch.setattr(hedging, "_trackers", {})
+    monkeypatch.setattr(hedging, "_hedge_pools", {})
+    monkeypatch.setattr(hedging, "retry_budget", RetryBudget(ratio=1, min_per_second=0, max_tokens=10))
+    yield
+    hedging.shutdown_hedge_pools()
+
+
+class SlowFirstCall:
+    """The second call of getAmountDue (the first one after warm-up) is slow."""
+
+    def __init__(self, slow_seconds=0.5):
+        self.calls = 0
+        self.slow_seconds = slow_seconds
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            self.calls += 1
+            return self.calls
+
+    def getAmountDue(self):
+        call = self._next()
+        if call == 2:
+            time.sleep(self.slow_seconds)
+            return "slow"
+        time.sleep(0.005)
+        return f"fast-{call}"
+
+    def setCardSettlement(self):
+        return self._next()
+
+
+def _stats(operation="getAmountDue"):
+    return hedging.hedging_stats()["operations"][operation]
+
+
+def test_blocking_call_returns_the_first_answer():
+    service = HedgedService(SlowFirstCall(), backend="test")
+    assert service.getAmountDue() == "fast-1"          # warm-up sample
+    started = time.monotonic()
+    assert service.getAmountDue() == "fast-3"          # the hedge wins
+    assert time.monotonic() - started < 0.3
+    assert _stats()["hedges"] == 1
+    assert _stats()["hedge_wins"] == 1
+
+
+def test_blocking_primary_answer_wins_when_it_is_first():
+    service = HedgedService(SlowFirstCall(slow_seconds=0.0), backend="test")
+    service.getAmountDue()
+    assert service.getAmountDue() == "slow"
+    assert _stats()["hedges"] == 0
+
+
+def test_soap_fault_is_not_hedged_or_retried():
+    class Faulting:
+        calls = 0
+
+        def getAmountDue(self):
+            Faulting.calls += 1
+            raise Fault("Unknown card")
+
+    service = HedgedService(Faulting(), backend="test")
+    with pytest.raises(Fault):
+        service.getAmountDue()
+    assert Faulting.calls == 1
+
+
+def test_writes_are_passed_through():
+    inner = SlowFirstCall()
+    service = HedgedService(inner, backend="test")
+    assert service.setCardSettlement == inner.setCardSettlement
+
+
+def test_async_call_returns_the_first_answer():
+    class AsyncService:
+        calls = 0
+
+        async def getAmountDue(self):
+            AsyncService.calls += 1
+            call = AsyncService.calls
+            await asyncio.sleep(0.5 if call == 2 else 0.005)
+            return f"answer-{call}"
+
+    service = HedgedService(AsyncService(), backend="test", is_async=True)
+
+    async def main():
+        await service.getAmountDue()
+        return await service.getAmountDue()
+
+    assert asyncio.run(main()) == "answer-3"
+    assert _stats()["hedge_wins"] == 1
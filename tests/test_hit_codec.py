@@ -0,0 +1,66 @@
+# tests/test_hit_codec.py
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app.services.hit_codec import TEMPLATES, HitResult, build_generic, escape, parse_response
+
+CREDENTIALS = {"user": "Pos&Co", "key": 'k"1'}
+
+
+def _elements(xml: str) -> list:
+    root = ET.fromstring(xml)
+    assert root.tag == "Scr" and root.get("action") == "doScrHIT"
+    return [(child.tag, child.text) for child in root]
+
+
+def test_escape():
+    assert escape("plain") == "plain"
+    assert escape('<a href="x">&</a>') == "&lt;a href=&quot;x&quot;&gt;&amp;&lt;/a&gt;"
+    assert escape(12.5) == "12.5"
+
+
+def test_purchase_round_trip_with_escaping_and_optionals():
+    data = {**CREDENTIALS, "amount": 12.5, "currency": "NZD", "station": "ST<1>", "txnRef": "R&1",
+            "deviceId": "D1", "mref": "M1"}
+    xml = TEMPLATES["Purchase"].build(data)
+    root = ET.fromstring(xml)
+    assert (root.get("user"), root.get("key")) == ("Pos&Co", 'k"1')
+    assert _elements(xml) == [
+        ("Amount", "12.5"), ("Cur", "NZD"), ("TxnType", "Purchase"), ("Station", "ST<1>"),
+        ("TxnRef", "R&1"), ("DeviceId", "D1"), ("MRef", "M1"),
+    ]
+
+
+def test_required_default_and_override():
+    data = {**CREDENTIALS, "station": "S1", "txnRef": "R1", "receiptType": 2}
+    assert ("DuplicateFlag", "0") in _elements(TEMPLATES["Receipt"].build(data))
+    assert ("Action", "Print") in _elements(TEMPLATES["Receipt"].build(data, action="Print"))
+
+
+def test_missing_required_field_raises():
+    with pytest.raises(KeyError):
+        TEMPLATES["Status"].build({**CREDENTIALS, "station": "S1"})
+
+
+def test_generic_request_rejects_bad_element_names():
+    assert _elements(build_generic("Ping", {**CREDENTIALS, "Station": "S1"})) == [("Station", "S1"), ("TxnType", "Ping")]
+    with pytest.raises(ValueError):
+        build_generic("Ping", {**CREDENTIALS, "bad name": "x"})
+
+
+def test_parse_response_fields_and_echo():
+    body = b'<?xml version="1.0" encoding="utf-8"?><Scr><Complete>1</Complete><ReCo>00</ReCo><TxnRef>R1</TxnRef></Scr>'
+    result = parse_response(body, "Status", echo={"Station": "S1"})
+    assert result.complete
+    assert result.txn_ref == "R1"
+    assert result.to_dict() == {"Complete": "1", "ReCo": "00", "TxnRef": "R1", "TxnType": "Status", "Station": "S1"}
+
+
+def test_invalid_body():
+    with pytest.raises(ET.ParseError):
+        parse_response(b"not xml", "Status")
+    result = parse_response(b"not xml", "Status", strict=False)
+    assert not result.parsed
+    assert result.to_dict() == {"raw_response": "not xml", "TxnType": "Status"}
+    assert HitResult("Status").complete is False
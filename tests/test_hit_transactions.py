@@ -0,0 +1,149 @@
+# tests/test_hit_transactions.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import hit_transactions
+from app.services.hit_codec import HitResult
+from app.services.hit_transactions import COMPLETE, PENDING, PURCHASE, TIMED_OUT, HitTransactionEngine
+
+DATA = {"user": "u", "key": "k", "station": "S1", "txnRef": "R1", "amount": 1, "currency": "NZD", "deviceId": "D1"}
+
+
+class FakeTerminal:
+    """Purchase answers after ``start_delay``; Status reports completion from the ``complete_after``-th call on."""
+
+    def __init__(self, start_delay=0.02, complete_after=2):
+        self.start_delay = start_delay
+        self.complete_after = complete_after
+        self.purchases = []
+        self.status_calls = 0
+
+    async def purchase(self, data):
+        self.purchases.append(data["txnRef"])
+        await asyncio.sleep(self.start_delay)
+        return HitResult(PURCHASE, {"Complete": "0", "DL1": "PRESENT CARD"})
+
+    async def status(self, data):
+        self.status_calls += 1
+        complete = "1" if self.status_calls >= self.complete_after else "0"
+        return HitResult("Status", {"Complete": complete, "ReCo": "00" if complete == "1" else ""})
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    terminal = FakeTerminal()
+    monkeypatch.setitem(hit_transactions._STARTERS, PURCHASE, terminal.purchase)
+    monkeypatch.setattr(hit_transactions, "send_hit_status_request", terminal.status)
+    return terminal
+
+
+def _engine(timeout_seconds=5):
+    return HitTransactionEngine(poll_interval=0.01, poll_backoff=1.0, max_poll_interval=0.01,
+                                timeout_seconds=timeout_seconds, retention_seconds=60)
+
+
+def test_concurrent_start_sends_one_purchase(terminal):
+    async def main():
+        engine = _engine()
+        results = await asyncio.gather(engine.start(PURCHASE, DATA), engine.start(PURCHASE, DATA),
+                                       return_exceptions=True)
+        await engine.shutdown()
+        return results
+
+    first, second = asyncio.run(main())
+    assert terminal.purchases == ["R1"]
+    assert first.state == PENDING
+    assert isinstance(second, HTTPException) and second.status_code == 409
+
+
+def test_failed_start_is_unregistered(terminal, monkeypatch):
+    async def unreachable(data):
+        raise ConnectionError("no route")
+
+    monkeypatch.setitem(hit_transactions._STARTERS, PURCHASE, unreachable)
+
+    async def main():
+        engine = _engine()
+        with pytest.raises(ConnectionError):
+            await engine.start(PURCHASE, DATA)
+        return engine.stats()
+
+    assert asyncio.run(main())["tracked"] == 0
+
+
+def test_poller_finishes_the_transaction(terminal):
+    async def main():
+        engine = _engine()
+        transaction = await engine.start(PURCHASE, DATA)
+        await engine.wait(transaction, 2)
+        return transaction, engine.stats()
+
+    transaction, stats = asyncio.run(main())
+    assert transaction.state == COMPLETE
+    assert transaction.result.fields["ReCo"] == "00"
+    assert stats["completed"] == 1 and stats["pending"] == 0
+
+
+def test_poller_times_out(terminal):
+    terminal.complete_after = 10**6
+
+    async def main():
+        engine = _engine(timeout_seconds=0.05)
+        transaction = await engine.start(PURCHASE, DATA)
+        return await engine.wait(transaction, 2)
+
+    assert asyncio.run(main()).state == TIMED_OUT
+
+
+def test_follow_checks_station_and_credentials(terminal):
+    async def main():
+        engine = _engine()
+        await engine.start(PURCHASE, DATA)
+        try:
+            for other in ({**DATA, "key": "other"}, {**DATA, "station": "S2"}):
+                with pytest.raises(HTTPException) as raised:
+                    await engine.follow(other)
+                assert raised.value.status_code == 404
+        finally:
+            await engine.shutdown()
+
+    asyncio.run(main())
+
+
+def test_other_worker_adopts_without_a_poller(terminal):
+    terminal.complete_after = 3
+
+    async def main():
+        engine = _engine()                       # a worker that did not start R1
+        transaction = await engine.follow(DATA)
+        assert transaction.adopted and transaction.task is None
+        assert transaction.state == PENDING
+        await asyncio.sleep(0.05)
+        assert terminal.status_calls == 1        # nothing polls while nobody follows
+        await engine.wait(await engine.follow(DATA), 2)
+        return transaction, engine.stats()
+
+    transaction, stats = asyncio.run(main())
+    assert transaction.state == COMPLETE
+    assert stats["adopted"] == 1 and stats["started"] == 0
+
+
+def test_status_does_not_overtake_a_starting_transaction(terminal):
+    terminal.start_delay = 0.05
+    terminal.complete_after = 1
+
+    async def main():
+        engine = _engine()
+        start = asyncio.create_task(engine.start(PURCHASE, DATA))
+        await asyncio.sleep(0.01)
+        status = await engine.status(DATA)       # answered upstream, not applied
+        transaction = await start
+        state = transaction.state
+        await engine.shutdown()
+        return status, state
+
+    status, state = asyncio.run(main())
+    assert status.complete
+    assert state == PENDING
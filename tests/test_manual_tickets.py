@@ -0,0 +1,40 @@
+# tests/test_manual_tickets.py
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.routers import Manual_Tickets
+from app.routers.Manual_Tickets import ManualTicketRequest, create_manual_ticket_quotes
+from app.tariff_engine import TariffEngine
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = TariffEngine.from_file("tariffs.example.yaml")
+    monkeypatch.setattr(Manual_Tickets, "get_tariff_engine", lambda: engine)
+
+    async def no_shadow_check(engine, local, *args):
+        return local
+
+    monkeypatch.setattr(Manual_Tickets, "shadow_check_async", no_shadow_check)
+    return engine
+
+
+def _stay(engine, entry, exit):
+    carpark_nr, card_type, tariff_id = next(iter(engine.tables))
+    return ManualTicketRequest(carpark_nr=carpark_nr, card_type=card_type, tariff_id=tariff_id,
+                               time_entry=entry, time_exit=exit)
+
+
+def test_mixed_timezone_item_fails_alone(engine):
+    utc = timezone.utc
+    requests = [
+        _stay(engine, datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 12, tzinfo=utc)),
+        _stay(engine, datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 12)),
+        _stay(engine, datetime(2026, 1, 1, 10, tzinfo=utc), datetime(2026, 1, 1, 12, tzinfo=utc)),
+    ]
+    results = asyncio.run(create_manual_ticket_quotes(requests))["results"]
+    assert [r["status"] for r in results] == ["error", "ok", "ok"]
+    assert results[0]["status_code"] == 400
+    assert results[1]["result"] == results[2]["result"]
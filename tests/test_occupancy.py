@@ -0,0 +1,64 @@
+# tests/test_occupancy.py
+from app.occupancy import OccupancyHistory, RingSeries
+
+KEY = "CounterNr=2,CarParkNr=1"
+
+
+def _snapshot(level):
+    return {"Counters": [{"CarParkNr": 1, "CounterNr": 2, "CurrentLevel": level}]}
+
+
+def test_downsample_buckets_min_max_mean():
+    series = RingSeries(capacity=100)
+    for second, value in enumerate([1, 3, 2, 10, 20, 30]):
+        series.append(1000 + second, value)
+    result = series.downsample(1000, 1006, step=3)
+    assert result["t"] == [1000, 1003]
+    assert result["min"] == [1, 10]
+    assert result["max"] == [3, 30]
+    assert result["mean"] == [2.0, 20.0]
+    assert result["samples"] == [3, 3]
+
+
+def test_downsample_skips_empty_buckets_and_window_edges():
+    series = RingSeries(capacity=100)
+    for timestamp, value in ((1000, 1), (1001, 2), (1010, 5), (1020, 9)):
+        series.append(timestamp, value)
+    result = series.downsample(1001, 1020, step=5)
+    assert result["t"] == [1001, 1006]
+    assert result["samples"] == [1, 1]
+    assert series.downsample(2000, 3000, step=60)["t"] == []
+
+
+def test_ring_keeps_the_newest_samples_in_order():
+    series = RingSeries(capacity=3)
+    for second in range(5):
+        series.append(1000 + second, second)
+    assert series.count == 3
+    result = series.downsample(0, 2000, step=1)
+    assert result["t"] == [1002, 1003, 1004]
+    assert result["mean"] == [2.0, 3.0, 4.0]
+
+
+def test_memory_history_records_and_queries():
+    history = OccupancyHistory(capacity=10, value_fields=["CurrentLevel"])
+    history.record(_snapshot(5), timestamp=1000)
+    history.record(_snapshot(7), timestamp=1001)
+    assert history.series_keys() == {KEY: 2}
+    result = history.query(KEY, 1000, 1002, step_seconds=2)
+    assert result["mean"] == [6.0]
+    assert result["step_seconds"] == 2
+    assert history.query("unknown", 0, 1) is None
+
+
+def test_only_one_worker_writes_shared_files(tmp_path):
+    writer = OccupancyHistory(capacity=10, value_fields=["CurrentLevel"], spill_dir=str(tmp_path))
+    reader = OccupancyHistory(capacity=10, value_fields=["CurrentLevel"], spill_dir=str(tmp_path))
+    assert writer.is_writer()
+    assert not reader.is_writer()
+
+    for history in (writer, reader):      # both workers see the same poll
+        history.record(_snapshot(5), timestamp=1000)
+    writer.flush()
+    assert reader.series_keys() == {KEY: 1}
+    assert reader.query(KEY, 1000, 1001, step_seconds=1)["samples"] == [1]
@@ -0,0 +1,57 @@
+# tests/test_plate_index.py
+from app.plate_index import PlateIndex, lpr_key, normalize_plate
+
+
+def _index():
+    return PlateIndex(max_entries=100, ttl_seconds=3600, max_distance=1)
+
+
+def test_normalize_and_lpr_key():
+    assert normalize_plate(" ab-123 c ") == "AB123C"
+    assert lpr_key("OIB") == "018"
+    # S / 5 are not folded: they are different plates, not an LPR misread
+    assert lpr_key("SB123") != lpr_key("5B123")
+
+
+def test_lookalike_plates_keep_their_own_entries():
+    index = _index()
+    index.add("SB123", card_number="CARD-S")
+    index.add("5B123", card_number="CARD-5")
+    matches = index.lookup("SB123")
+    assert matches[0]["exact"] is True
+    assert matches[0]["card_number"] == "CARD-S"
+    assert [m["card_number"] for m in matches if m["exact"]] == ["CARD-S"]
+
+
+def test_folded_lookalike_is_a_candidate_not_an_exact_match():
+    index = _index()
+    index.add("AB1O23", card_number="CARD-1")
+    matches = index.lookup("AB1023")
+    assert len(matches) == 1
+    assert matches[0]["exact"] is False
+    assert matches[0]["distance"] == 0
+
+
+def test_one_edit_is_a_candidate_and_two_are_not():
+    index = _index()
+    index.add("AB1234", card_number="CARD-1")
+    assert [m["exact"] for m in index.lookup("AB1235")] == [False]
+    assert index.lookup("AB1235")[0]["distance"] == 1
+    assert index.lookup("XY1235") == []
+
+
+def test_exact_match_sorts_first():
+    index = _index()
+    index.add("AB1235", card_number="CARD-NEAR")
+    index.add("AB1234", card_number="CARD-EXACT")
+    matches = index.lookup("ab 1234")
+    assert matches[0]["card_number"] == "CARD-EXACT" and matches[0]["exact"]
+    assert matches[1]["card_number"] == "CARD-NEAR" and not matches[1]["exact"]
+
+
+def test_eviction_removes_delete_variants():
+    index = PlateIndex(max_entries=1, ttl_seconds=3600, max_distance=1)
+    index.add("AB1234", card_number="CARD-1")
+    index.add("XY9876", card_number="CARD-2")
+    assert index.lookup("AB1234") == []
+    assert index.stats()["entries"] == 1
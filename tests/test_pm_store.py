@@ -0,0 +1,35 @@
+# tests/test_pm_store.py
+from app.pm_store import PMStringStore, credentials_hash
+
+ALICE = credentials_hash("alice", "secret")
+MALLORY = credentials_hash("mallory", "guess")
+
+
+def test_entries_are_scoped_to_credentials(tmp_path):
+    store = PMStringStore(str(tmp_path / "pm.sqlite3"), lru_size=10)
+    store.put("S1", ALICE, "PM-1")
+    assert store.get("S1", ALICE) == "PM-1"
+    assert store.get("S1", MALLORY) is None
+    assert store.get("S1", credentials_hash(None, None)) is None
+
+
+def test_other_workers_read_the_shared_file(tmp_path):
+    path = str(tmp_path / "pm.sqlite3")
+    PMStringStore(path, lru_size=10).put("S1", ALICE, {"PM": "1"})
+    other_worker = PMStringStore(path, lru_size=10)
+    assert other_worker.get("S1", ALICE) == {"PM": "1"}
+    assert other_worker.stats()["store_hits"] == 1
+
+
+def test_file_is_created_on_first_use_only(tmp_path):
+    path = tmp_path / "store" / "pm.sqlite3"
+    store = PMStringStore(str(path), lru_size=10)
+    assert not path.parent.exists()
+    store.get("S1", ALICE)
+    assert path.exists()
+
+
+def test_error_strings_are_not_stored(tmp_path):
+    store = PMStringStore(str(tmp_path / "pm.sqlite3"), lru_size=10)
+    store.put("S1", ALICE, "Error: unknown card")
+    assert store.get("S1", ALICE) is None
@@ -0,0 +1,96 @@
+# tests/test_quote_token.py
+import time
+
+import pytest
+
+from app.auth import quote_token
+from app.auth.quote_token import QuoteLedger, create_quote, redeem_quote, revoke_quotes, verify_quote
+
+
+@pytest.fixture(autouse=True)
+def ledger(tmp_path, monkeypatch):
+    ledger = QuoteLedger(str(tmp_path / "quotes.sqlite3"), ttl_seconds=30)
+    monkeypatch.setattr(quote_token, "quote_ledger", ledger)
+    return ledger
+
+
+def _quote(card_number="CARD-A", tcc_num=15, amount="10.00", read_at=None):
+    token, _ = create_quote(card_number, tcc_num, amount, time.time() if read_at is None else read_at)
+    return token
+
+
+def test_valid_quote_is_redeemed_once():
+    token = _quote()
+    assert redeem_quote(token, "CARD-A", 15) == "10.00"
+    assert redeem_quote(token, "CARD-A", 15) is None
+
+
+def test_tampered_quote_is_rejected():
+    payload, signature = _quote().split(".")
+    forged = quote_token._b64encode(quote_token._b64decode(payload).replace(b"10.00", b"99.00"))
+    assert redeem_quote(f"{forged}.{signature}", "CARD-A", 15) is None
+    assert redeem_quote(f"{payload}.{signature[:-2]}AA", "CARD-A", 15) is None
+    assert redeem_quote("not-a-token", "CARD-A", 15) is None
+
+
+def test_quote_for_other_card_or_tcc_is_rejected():
+    token = _quote()
+    assert redeem_quote(token, "CARD-B", 15) is None
+    assert redeem_quote(token, "CARD-A", 20) is None
+
+
+def test_expired_quote_is_rejected(monkeypatch):
+    token = _quote()
+    monkeypatch.setattr(quote_token.time, "time", lambda: time.monotonic() + 10 ** 10)
+    assert verify_quote(token, "CARD-A", 15) is None
+    assert redeem_quote(token, "CARD-A", 15) is None
+
+
+def test_write_after_the_read_revokes_the_quote():
+    token = _quote(read_at=time.time() - 1)
+    revoke_quotes("CARD-A")
+    assert redeem_quote(token, "CARD-A", 15) is None
+    # Quotes read after the write are fine
+    assert redeem_quote(_quote(), "CARD-A", 15) == "10.00"
+
+
+def test_revocation_and_redemption_are_shared_between_workers(ledger):
+    other_worker = QuoteLedger(ledger.path, ttl_seconds=30)
+    token = _quote(read_at=time.time() - 1)
+    other_worker.record_write("CARD-A")
+    assert redeem_quote(token, "CARD-A", 15) is None
+
+    token = _quote()
+    claims = verify_quote(token, "CARD-A", 15)
+    assert other_worker.redeem(claims["n"], "CARD-A", claims["iat"], claims["exp"])
+    assert redeem_quote(token, "CARD-A", 15) is None
+
+
+def test_unavailable_ledger_rejects_quotes(tmp_path, monkeypatch):
+    monkeypatch.setattr(quote_token, "quote_ledger", QuoteLedger(str(tmp_path), ttl_seconds=30))
+    assert redeem_quote(_quote(), "CARD-A", 15) is None
+
+
+def test_settlement_with_a_replayed_quote_reads_the_amount_due(monkeypatch):
+    from app import Soap
+
+    calls = []
+
+    class Service:
+        def getAmountDue(self, **kwargs):
+            calls.append("getAmountDue")
+            return "0.00"
+
+        def setCardSettlement(self, **kwargs):
+            calls.append("setCardSettlement")
+            return True
+
+    monkeypatch.setattr(Soap, "get_soap_service", lambda wsdl_env_key: Service())
+    token = _quote()
+    assert Soap.set_card_settlement(15, "CARD-A", 5.0, token)["amount_due_before_payment"] == 10.0
+    assert calls == ["setCardSettlement"]
+
+    with pytest.raises(Soap.HTTPException) as error:
+        Soap.set_card_settlement(15, "CARD-A", 5.0, token)
+    assert error.value.status_code == 400
+    assert calls == ["setCardSettlement", "getAmountDue"]
@@ -0,0 +1,53 @@
+# tests/test_sessions.py
+import pytest
+from zeep.exceptions import Fault
+
+from app import Soap
+from app.sessions import is_session_fault
+
+
+@pytest.mark.parametrize("message", ["Not logged in", "not logged in.", "LOGIN REQUIRED", "Session expired"])
+def test_session_expiry_faults(message):
+    assert is_session_fault(Fault(message))
+
+
+@pytest.mark.parametrize("message", ["Invalid session id for card 123", "Card not found", "session limit reached"])
+def test_other_faults_mentioning_sessions(message):
+    assert not is_session_fault(Fault(message))
+
+
+def test_markers_are_configurable(monkeypatch):
+    monkeypatch.setenv("DESIGNA_SESSION_FAULT_MARKERS", "Sitzung abgelaufen")
+    assert is_session_fault(Fault("Sitzung abgelaufen"))
+    assert not is_session_fault(Fault("Not logged in"))
+
+
+@pytest.fixture
+def relogins(monkeypatch):
+    calls = []
+    monkeypatch.setattr(Soap.session_manager, "relogin", lambda tcc_num, stale_since=None: calls.append(tcc_num))
+    return calls
+
+
+def _expiring_call():
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            raise Fault("Not logged in")
+        return "ok"
+    return call, calls
+
+
+def test_read_is_replayed_after_relogin(relogins):
+    call, calls = _expiring_call()
+    assert Soap._with_session(15, call) == "ok"
+    assert relogins == [15] and len(calls) == 2
+
+
+def test_write_is_not_replayed(relogins):
+    call, calls = _expiring_call()
+    with pytest.raises(Fault):
+        Soap._with_session(15, call, replay=False)
+    assert relogins == [15] and len(calls) == 1
@@ -0,0 +1,76 @@
+# tests/test_singleflight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+    release = threading.Event()
+
+    def fetch(key):
+        calls.append(key)
+        release.wait(2)
+        return f"value-{key}"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fetch, "k"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 5:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["k"]
+    assert results == ["value-k"] * 5
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_error_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight("test")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do_async("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.stats()["upstream_calls"] == 1
+
+        async def ok():
+            return "ok"
+        # The failed call is gone: the next caller runs a new one
+        assert await flight.do_async("k", ok) == "ok"
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        first = asyncio.create_task(flight.do_async("k", fetch))
+        second = asyncio.create_task(flight.do_async("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "value"
+        assert calls == [1]
+
+    asyncio.run(main())